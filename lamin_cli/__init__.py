@@ -4,17 +4,36 @@ This is the command line interface for interacting with LaminDB & LaminHub.
 
 The interface is defined in `__main__.py`.
 The root API here is used by LaminR to replicate the CLI functionality.
+
+The root API is resolved lazily so that `import lamin_cli` does not import
+`lamindb_setup`.
 """
 
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING
+
 __version__ = "1.19.1"
 
-from lamindb_setup import logout
-from lamindb_setup._init_instance import init
-from lamindb_setup._setup_user import login
+if TYPE_CHECKING:
+    from lamindb_setup import logout
+    from lamindb_setup._init_instance import init
+    from lamindb_setup._setup_user import login
+
+    from ._connect import connect, disconnect
+    from ._delete import delete
+    from ._save import save
 
-from ._connect import connect, disconnect
-from ._delete import delete
-from ._save import save
+_LAZY_ATTRS = {
+    "save": "lamin_cli._save",
+    "init": "lamindb_setup._init_instance",
+    "connect": "lamin_cli._connect",
+    "delete": "lamin_cli._delete",
+    "login": "lamindb_setup._setup_user",
+    "logout": "lamindb_setup",
+    "disconnect": "lamin_cli._connect",
+}
 
 __all__ = [
     "save",
@@ -25,3 +44,15 @@ __all__ = [
     "logout",
     "disconnect",
 ]
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_ATTRS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
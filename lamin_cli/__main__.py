@@ -7,25 +7,12 @@ import sys
 import warnings
 from collections import OrderedDict
 from functools import wraps
+from importlib import import_module
 from importlib.metadata import PackageNotFoundError, version
 from pathlib import Path
 from typing import TYPE_CHECKING, Literal
 
-import lamindb_setup as ln_setup
 from lamin_utils import logger
-from lamindb_setup._init_instance import (
-    DOC_DB,
-    DOC_INSTANCE_NAME,
-    DOC_MODULES,
-    DOC_STORAGE_ARG,
-)
-
-from lamin_cli import connect as connect_
-from lamin_cli import disconnect as disconnect_
-from lamin_cli import init as init_
-from lamin_cli import login as login_
-from lamin_cli import logout as logout_
-from lamin_cli import save as save_
 
 from .urls import decompose_url
 
@@ -67,18 +54,73 @@ COMMAND_GROUPS = {
         },
         {
             "name": "Experimental",
-            "commands": ["run", "hub"],
+            "commands": ["run", "hub", "daemon", "mirror"],
         },
     ]
 }
 
+# command groups that live in their own modules, imported only once resolved
+LAZY_SUBCOMMANDS = {
+    "settings": "lamin_cli._settings.settings",
+    "migrate": "lamin_cli._migration.migrate",
+    "io": "lamin_cli._io.io",
+    "hub": "lamin_cli.hub.hub",
+    "daemon": "lamin_cli._daemon.daemon",
+    "mirror": "lamin_cli._mirror.mirror",
+}
+
+
+def _setup_errors() -> tuple[type[Exception], ...]:
+    # these errors can only have been raised if lamindb_setup was imported
+    errors = sys.modules.get("lamindb_setup.errors")
+    if errors is None:
+        return ()
+    return (errors.CurrentInstanceNotConfigured, errors.NoWriteAccess)
+
+
+class LazyGroupMixin:
+    """Resolves subcommands registered by import path when they're first needed."""
+
+    def __init__(
+        self, *args, lazy_subcommands: Mapping[str, str] | None = None, **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = dict(lazy_subcommands or {})
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        commands = list(super().list_commands(ctx))
+        return commands + [
+            name for name in self.lazy_subcommands if name not in commands
+        ]
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        if cmd_name not in self.commands and cmd_name in self.lazy_subcommands:
+            module_name, attr = self.lazy_subcommands[cmd_name].rsplit(".", 1)
+            self.add_command(getattr(import_module(module_name), attr), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+
+class DaemonForwardingMixin:
+    """Hands commands to a running `lamin daemon` if `LAMIN_DAEMON` is set."""
+
+    def main(self, args=None, *pargs, standalone_mode: bool = True, **kwargs):
+        if standalone_mode and os.environ.get("LAMIN_DAEMON"):
+            from ._daemon_client import forward
+
+            exit_code = forward(sys.argv[1:] if args is None else list(args))
+            if exit_code is not None:
+                sys.exit(exit_code)
+        return super().main(args, *pargs, standalone_mode=standalone_mode, **kwargs)
+
+
 # https://github.com/ewels/rich-click/issues/19
 # Otherwise rich-click takes over the formatting.
 if os.environ.get("NO_RICH"):
     import click as click
-    from lamindb_setup.errors import CurrentInstanceNotConfigured, NoWriteAccess
 
-    class OrderedExceptionHandlingGroup(click.Group):
+    class OrderedExceptionHandlingGroup(
+        DaemonForwardingMixin, LazyGroupMixin, click.Group
+    ):
         """Overwrites list_commands to return commands in order of definition."""
 
         def __init__(
@@ -93,23 +135,29 @@ if os.environ.get("NO_RICH"):
         def invoke(self, ctx: click.Context):
             try:
                 return super().invoke(ctx)
-            except (CurrentInstanceNotConfigured, NoWriteAccess) as e:
+            except _setup_errors() as e:
                 raise click.ClickException(str(e)) from None
 
-        def list_commands(self, ctx: click.Context) -> Mapping[str, click.Command]:
-            return self.commands
+        def list_commands(self, ctx: click.Context) -> list[str]:
+            return [
+                *self.commands,
+                *(name for name in self.lazy_subcommands if name not in self.commands),
+            ]
 
-    lamin_group_decorator = click.group(cls=OrderedExceptionHandlingGroup)
+    lamin_group_decorator = click.group(
+        cls=OrderedExceptionHandlingGroup, lazy_subcommands=LAZY_SUBCOMMANDS
+    )
 
 else:
     import rich_click as click
-    from lamindb_setup.errors import CurrentInstanceNotConfigured, NoWriteAccess
 
-    class OrderedRichExceptionHandlingGroup(click.RichGroup):
+    class OrderedRichExceptionHandlingGroup(
+        DaemonForwardingMixin, LazyGroupMixin, click.RichGroup
+    ):
         def invoke(self, ctx: click.Context):
             try:
                 return super().invoke(ctx)
-            except (CurrentInstanceNotConfigured, NoWriteAccess) as e:
+            except _setup_errors() as e:
                 raise click.ClickException(str(e)) from None
 
     def lamin_group_decorator(f):
@@ -119,7 +167,9 @@ else:
                 style_commands_table_column_width_ratio=(1, 10),
             )
         )
-        @click.group(cls=OrderedRichExceptionHandlingGroup)
+        @click.group(
+            cls=OrderedRichExceptionHandlingGroup, lazy_subcommands=LAZY_SUBCOMMANDS
+        )
         @wraps(f)
         def wrapper(*args, **kwargs):
             return f(*args, **kwargs)
@@ -127,12 +177,23 @@ else:
         return wrapper
 
 
-from lamindb_setup._silence_loggers import silence_loggers
+class SetupDocOption(getattr(click, "RichOption", click.Option)):
+    """Reads its help text from `lamindb_setup._init_instance` when rendered."""
+
+    def __init__(self, *args, setup_doc: str, **kwargs):
+        self.setup_doc = setup_doc
+        super().__init__(*args, **kwargs)
+
+    @property
+    def help(self) -> str:
+        from lamindb_setup import _init_instance
+
+        return getattr(_init_instance, self.setup_doc)
+
+    @help.setter
+    def help(self, value: str | None) -> None:
+        pass  # resolved from setup_doc
 
-from lamin_cli._io import io
-from lamin_cli._migration import migrate
-from lamin_cli._settings import settings
-from lamin_cli.hub import hub
 
 if TYPE_CHECKING:
     from click import Command, Context
@@ -145,9 +206,24 @@ except PackageNotFoundError:
 
 @lamin_group_decorator
 @click.version_option(version=lamindb_version, prog_name="lamindb-core")
-def main():
+@click.option(
+    "--offline",
+    is_flag=True,
+    default=False,
+    help="Answer describe, get, list, and hub reads from the metadata mirror of `lamin mirror sync`.",
+)
+@click.pass_context
+def main(ctx: click.Context, offline: bool):
     """Manage data with LaminDB instances."""
-    silence_loggers()
+    if offline:
+        # an environment variable also reaches lazily imported subcommands
+        os.environ["LAMIN_OFFLINE"] = "1"
+    # the hub client silences loggers itself so that hub commands can be parsed
+    # without importing lamindb_setup
+    if ctx.invoked_subcommand != "hub":
+        from lamindb_setup._silence_loggers import silence_loggers
+
+        silence_loggers()
 
 
 @main.command()
@@ -165,12 +241,16 @@ def login(user: str, key: str | None):
 
     → Python/R alternative: {func}`~lamindb.setup.login`
     """
+    from lamin_cli import login as login_
+
     return login_(user, key=key)
 
 
 @main.command()
 def logout():
     """Log out of LaminHub."""
+    from lamin_cli import logout as logout_
+
     return logout_()
 
 
@@ -187,10 +267,10 @@ def schema_to_modules_callback(ctx, param, value):
 
 # fmt: off
 @main.command()
-@click.option("--storage", type=str, default = ".", help=DOC_STORAGE_ARG)
-@click.option("--name", type=str, default=None, help=DOC_INSTANCE_NAME)
-@click.option("--db", type=str, default=None, help=DOC_DB)
-@click.option("--modules", type=str, default=None, help=DOC_MODULES)
+@click.option("--storage", type=str, default = ".", cls=SetupDocOption, setup_doc="DOC_STORAGE_ARG")
+@click.option("--name", type=str, default=None, cls=SetupDocOption, setup_doc="DOC_INSTANCE_NAME")
+@click.option("--db", type=str, default=None, cls=SetupDocOption, setup_doc="DOC_DB")
+@click.option("--modules", type=str, default=None, cls=SetupDocOption, setup_doc="DOC_MODULES")
 # fmt: on
 def init(
     storage: str,
@@ -212,6 +292,8 @@ def init(
 
     → Python/R alternative: {func}`~lamindb.setup.init`
     """
+    from lamin_cli import init as init_
+
     return init_(storage=storage, db=db, modules=modules, name=name)
 
 
@@ -239,6 +321,8 @@ def connect(instance: str, here: bool):
 
     → Python/R alternative: create a database object via {class}`~lamindb.DB` or set the default database of your Python/R session via {func}`~lamindb.connect`
     """
+    from lamin_cli import connect as connect_
+
     return connect_(instance, here=here)
 
 
@@ -260,6 +344,8 @@ def disconnect(here: bool):
 
     → Python/R alternative: {func}`~lamindb.setup.disconnect`
     """
+    from lamin_cli import disconnect as disconnect_
+
     return disconnect_(here=here)
 
 
@@ -298,6 +384,8 @@ def create(
             stacklevel=2,
         )
 
+    import lamindb_setup as ln_setup
+
     if registry == "branch":
         if ln_setup.settings.instance.is_managed_by_hub:
             from lamin_cli.hub import create_branch
@@ -341,8 +429,18 @@ def list_(registry: Literal["branch", "space"], limit: int):
 
     → Python/R alternative: {meth}`~lamindb.Branch.to_dataframe()`
     """
+    import lamindb_setup as ln_setup
+
     assert registry in {"branch", "space"}, "Currently only supports listing branches and spaces."
 
+    from ._mirror import is_offline
+
+    if is_offline():
+        from ._mirror import list_offline
+
+        list_offline(registry, limit=limit)
+        return
+
     if registry == "branch":
         if ln_setup.settings.instance.is_managed_by_hub:
             from lamin_cli.hub import list_branches
@@ -407,6 +505,8 @@ def switch(
 
     → Python/R alternative: {attr}`~lamindb.setup.core.SetupSettings.branch` and {attr}`~lamindb.setup.core.SetupSettings.space`
     """
+    import lamindb_setup as ln_setup
+
     def _switch_target(target_name: str | None, *, switch_space: bool) -> None:
         if not switch_space and ln_setup.settings.instance.is_managed_by_hub:
             from lamin_cli.hub import switch_branch
@@ -527,12 +627,16 @@ def delete(entity: str, name: str | None = None, uid: str | None = None, key: st
 @main.command()
 # entity can be a registry or an object in the registry
 @click.argument("entity", type=str, required=False)
-@click.option("--uid", help="The uid for the entity.")
-@click.option("--key", help="The key for the entity.")
+@click.option("--uid", multiple=True, help="The uid for the entity. Repeat to load several artifacts.")
+@click.option("--key", multiple=True, help="The key for the entity. Repeat to load several artifacts.")
 @click.option(
     "--with-env", is_flag=True, help="Also return the environment for a tranform."
 )
-def load(entity: str | None = None, uid: str | None = None, key: str | None = None, with_env: bool = False):
+@click.option("--key-prefix", type=str, default=None, help="Load all artifacts whose key starts with this prefix.")
+@click.option("--manifest", type=click.Path(exists=True, dir_okay=False), default=None, help="A TSV or JSONL file with a uid or key column of artifacts to load.")
+@click.option("--max-workers", type=click.IntRange(min=1), default=8, help="Threads for downloading several artifacts.")
+@click.option("--path-manifest", type=str, default=None, help="Write a TSV of uid, key and cache path of loaded artifacts to this file, '-' for stdout.")
+def load(entity: str | None = None, uid: tuple[str, ...] = (), key: tuple[str, ...] = (), with_env: bool = False, key_prefix: str | None = None, manifest: str | None = None, max_workers: int = 8, path_manifest: str | None = None):
     """Sync a file/folder into a local cache (artifacts) or development directory (transforms).
 
     Pass an entity or a `--key`. For example:
@@ -552,10 +656,36 @@ def load(entity: str | None = None, uid: str | None = None, key: str | None = No
     lamin load transform --uid Vul4JbfsEYAy5
     ```
 
+    Load **many artifacts** into the cache by repeating `--uid` or `--key`, passing a
+    `--key-prefix`, or a `--manifest` with a `uid` or `key` column.
+    Artifacts are resolved in one query and downloaded concurrently:
+
+    ```
+    lamin load --key-prefix sequencing/run42/ --max-workers 16 --path-manifest paths.tsv
+    lamin load --uid e2G7k9EVul4JbfsE --uid KBW89Mf7IGcekja2
+    ```
+
     → Python/R alternative: {func}`~lamindb.Artifact.load`, no equivalent for transforms
     """
     from lamin_cli._load import load as load_
+    from lamin_cli._load import load_many, read_load_manifest
     from lamin_cli._notes import parse_note_target
+
+    if len(uid) > 1 or len(key) > 1 or key_prefix is not None or manifest is not None or path_manifest is not None:
+        if entity not in {None, "artifact"} or with_env:
+            raise click.UsageError("Loading several entities only supports artifacts.")
+        uids, keys = read_load_manifest(manifest) if manifest is not None else ([], [])
+        if load_many(
+            uids=[*uid, *uids],
+            keys=[*key, *keys],
+            key_prefix=key_prefix,
+            max_workers=max_workers,
+            path_manifest=path_manifest,
+        ) is not None:
+            sys.exit(1)
+        return
+    uid = uid[0] if uid else None
+    key = key[0] if key else None
     if entity is not None:
         if uid is None and key is None and entity == "README.md":
             return load_(entity=None, uid=uid, key="README.md", with_env=with_env)
@@ -606,6 +736,8 @@ def _describe(
     name: str | None = None,
     include: str | None = None,
 ):
+    import lamindb_setup as ln_setup
+
     if entity.startswith("https://") and "lamin" in entity:
         url = entity
         instance, entity, uid = decompose_url(url)
@@ -617,6 +749,15 @@ def _describe(
     else:
         instance = ln_setup.settings.instance.slug
 
+    from ._mirror import is_offline
+
+    if is_offline():
+        # the mirror is of the current instance
+        from ._mirror import describe_offline
+
+        describe_offline(entity, uid=uid, key=key, name=name)
+        return
+
     ln_setup.connect(instance)
     import lamindb as ln
 
@@ -771,6 +912,8 @@ def get(
     lamin get artifact --key my_file.parquet --description
     ```
     """
+    from ._mirror import is_offline, read_field_offline
+
     if status_field and description_field:
         raise click.ClickException("Pass only one of --status or --description.")
     if include is not None and (status_field or description_field):
@@ -785,6 +928,9 @@ def get(
             )
         if entity not in STATUS_FIELD_ENTITIES:
             raise click.ClickException("--status is only supported for entity 'branch'.")
+        if is_offline():
+            click.echo(read_field_offline(entity, "status", uid=uid, key=key, name=name))
+            return
         branch = _resolve_entity_for_get_update(entity, uid=uid, key=key, name=name)
         click.echo(branch.status)
         return
@@ -798,6 +944,9 @@ def get(
             raise click.ClickException(
                 "--description is only supported for: artifact, transform, collection, project."
             )
+        if is_offline():
+            click.echo(read_field_offline(entity, "description", uid=uid, key=key, name=name))
+            return
         record = _resolve_entity_for_get_update(entity, uid=uid, key=key, name=name)
         click.echo(record.description)
         return
@@ -870,8 +1019,8 @@ def update(
 
 
 @main.command()
-@click.argument("path", type=str)
-@click.option("--key", type=str, default=None, help="The key of the artifact or transform.")
+@click.argument("path", type=str, nargs=-1)
+@click.option("--key", type=str, default=None, help="The key of the artifact or transform. A key prefix if saving several files.")
 @click.option("--description", type=str, default=None, help="A description of the artifact or transform.")
 @click.option("--kind", type=str, default=None, help="Artifact kind (e.g. 'plan', 'dataset', 'model'). Overrides auto-inferred kind for plan files.")
 @click.option("--stem-uid", type=str, default=None, help="The stem uid of the artifact or transform.")
@@ -884,8 +1033,11 @@ def update(
     default=None,
     help="Either 'artifact', 'transform', or 'record'. If not passed, chooses based on path suffix.",
 )
+@click.option("--manifest", type=click.Path(exists=True, dir_okay=False), default=None, help="A TSV or JSONL file with columns path, key, description.")
+@click.option("--max-workers", type=click.IntRange(min=1), default=8, help="Threads for hashing and uploading when saving several files.")
+@click.option("--summary", type=str, default=None, help="Write a JSON summary of a batch save to this file, '-' for stdout.")
 def save(
-    path: str,
+    path: tuple[str, ...],
     key: str,
     description: str,
     kind: str,
@@ -894,6 +1046,9 @@ def save(
     space: str,
     branch: str,
     registry: Literal["artifact", "transform", "record"] | None,
+    manifest: str | None,
+    max_workers: int,
+    summary: str | None,
 ):
     """Save a file or folder as an `artifact`, `transform`, or `record`.
 
@@ -953,10 +1108,55 @@ def save(
 
     Also see: {ref}`sync-code-with-git`
 
+    Save **many files** as artifacts in one process by passing several paths, glob
+    patterns, or a manifest. With several files, `--key` is a key prefix: matches of a
+    glob are keyed by their path below the glob's base directory, other files by name.
+
+    ```
+    lamin save "run42/**/*.fastq.gz" --key sequencing/run42 --summary summary.json
+    lamin save --manifest files.tsv --project my_project --max-workers 16
+    ```
+
+    A manifest is a TSV with a header or a JSONL file with fields `path`, `key`, and
+    `description`. Shared records are resolved once, files are hashed on a thread pool
+    and new artifacts are written in bulk; uploads run concurrently on Postgres instances.
+
     → Python/R alternative: {class}`~lamindb.Artifact` and {class}`~lamindb.Transform`
     """
+    from lamin_cli._save import expand_paths, has_glob, read_manifest, save_many
+
+    if not path and manifest is None:
+        raise click.UsageError("Pass a path or --manifest.")
+    if manifest is not None or len(path) > 1 or has_glob(path[0]):
+        if registry not in {None, "artifact"} or stem_uid is not None:
+            raise click.UsageError(
+                "Saving several files only supports artifacts without --stem-uid."
+            )
+        entries = read_manifest(manifest) if manifest is not None else []
+        for file_path, relative_key in expand_paths(path):
+            entries.append(
+                {
+                    "path": file_path,
+                    "key": None if key is None else f"{key.rstrip('/')}/{relative_key}",
+                    "description": description,
+                }
+            )
+        if save_many(
+            entries,
+            kind=kind,
+            project=project,
+            space=space,
+            branch=branch,
+            max_workers=max_workers,
+            summary=summary,
+        ) is not None:
+            sys.exit(1)
+        return
+
+    from lamin_cli import save as save_
+
     if save_(
-        path=path,
+        path=path[0],
         key=key,
         description=description,
         kind=kind,
@@ -998,6 +1198,18 @@ def track(ctx: click.Context):
     lamin track finish
     ```
 
+    The report of the session is rendered when it finishes. To render it as the session goes, add a hook that checkpoints the transcript after every turn to `.claude/settings.json`:
+
+    ```
+    {
+      "hooks": {
+        "Stop": [
+          {"hooks": [{"type": "command", "command": "lamin track claude --checkpoint"}]}
+        ]
+      }
+    }
+    ```
+
     → Python/R alternative: {func}`~lamindb.track` and {func}`~lamindb.finish` for (non-shell) scripts or notebooks
     """
     if ctx.invoked_subcommand is not None:
@@ -1013,14 +1225,57 @@ def track(ctx: click.Context):
     default=None,
     help="One-sentence name for this agent session.",
 )
-def track_claude_command(name: str | None) -> None:
+@click.option(
+    "--checkpoint",
+    is_flag=True,
+    default=False,
+    help="Render the transcript of the current session up to now.",
+)
+@click.option(
+    "--report-format",
+    type=click.Choice(["inline", "paged"]),
+    default="inline",
+    help="'paged' also saves the untruncated steps to a gzipped side artifact.",
+)
+@click.option(
+    "--report-url",
+    "report_url_run_uid",
+    metavar="RUN_UID",
+    type=str,
+    default=None,
+    help="Print a signed URL of the paged report of a finished session.",
+)
+def track_claude_command(
+    name: str | None,
+    checkpoint: bool,
+    report_format: str,
+    report_url_run_uid: str | None,
+) -> None:
     """Start tracking a Claude Code session in LaminDB.
 
     Creates a new Claude Code run. Writes the run UID and trace path to
     `.claude/` so that `lamin track finish` can close it.
+
+    With `--checkpoint`, renders the transcript lines appended since the last
+    checkpoint of the current session into a partial report in `.claude/`, for
+    instance from a `Stop` hook, see `lamin track --help`. `lamin track finish`
+    then only renders the rest.
+
+    With `--report-format paged`, the report only inlines a short summary of
+    each step, and the untruncated steps are saved as a gzipped JSONL artifact.
+    `--report-url RUN_UID` prints a signed URL of the report that carries a
+    signed URL of that artifact, so that the report fetches a step when it's
+    clicked. Signed URLs need cloud storage and expire after a week.
     """
+    if report_url_run_uid is not None:
+        from lamin_cli.agents.claude import claudecode_report_url
+        click.echo(claudecode_report_url(report_url_run_uid))
+        return None
+    if checkpoint:
+        from lamin_cli.agents.claude import checkpoint_claudecode_session
+        return checkpoint_claudecode_session()
     from lamin_cli.agents.claude import track_claudecode_session
-    return track_claudecode_session(name=name)
+    return track_claudecode_session(name=name, report_format=report_format)
 
 
 @track.command("finish")
@@ -1098,6 +1353,8 @@ def annotate(entity: str | None, key: str, uid: str, name: str, project: str, ul
 
     → Python/R alternative: `artifact.features.add_values()` via {meth}`~lamindb.models.FeatureManager.add_values`, `artifact.projects.add()`, `artifact.ulabels.add()`, `artifact.records.add()`, ... via {meth}`~lamindb.models.RelatedManager.add`, and `artifact.version_tag = \"1.0\"; artifact.save()` for version tags.
     """
+    import lamindb_setup as ln_setup
+
     from lamin_cli._annotate import (
         ANNOTATE_REGISTRIES,
         REGISTRIES_WITH_FEATURES,
@@ -1257,11 +1514,6 @@ def run(filepath: str, project: str, image_url: str, packages: str, cpu: int, gp
     runner.run(filepath_in_mount_dir)
 
 
-main.add_command(settings)
-main.add_command(migrate)
-main.add_command(io)
-
-
 def _deprecated_cache_set(cache_dir: str) -> None:
     logger.warning("'lamin cache' is deprecated. Use 'lamin settings cache-dir' instead.")
     from lamindb_setup._cache import set_cache_dir
@@ -1306,8 +1558,6 @@ def _deprecated_cache_clear_cmd() -> None:
 def _deprecated_cache_get_cmd() -> None:
     _deprecated_cache_get()
 
-main.add_command(hub)
-
 # https://stackoverflow.com/questions/57810659/automatically-generate-all-help-documentation-for-click-commands
 # https://claude.ai/chat/73c28487-bec3-4073-8110-50d1a2dd6b84
 def _generate_help() -> dict[str, dict[str, str | None]]:
@@ -1331,10 +1581,12 @@ def _generate_help() -> dict[str, dict[str, str | None]]:
             "docstring": docstring,
         }
 
-        for sub in getattr(cmd, "commands", {}).values():
-            if getattr(sub, "hidden", False):
-                continue
-            recursive_help(sub, ctx, name=name)
+        if isinstance(cmd, click.Group):
+            for sub_name in cmd.list_commands(ctx):
+                sub = cmd.get_command(ctx, sub_name)
+                if sub is None or getattr(sub, "hidden", False):
+                    continue
+                recursive_help(sub, ctx, name=name)
 
     recursive_help(main)
     return out
@@ -0,0 +1,281 @@
+"""A warm, connected `lamin` process per instance behind a local Unix socket.
+
+The thin client in `lamin_cli._daemon_client` sends argv, cwd and env together
+with its stdin, stdout and stderr file descriptors to the daemon, which forks a
+child per request that runs the command on the passed descriptors and reports
+the exit code. Each request is logged to the log file of the daemon.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import TYPE_CHECKING
+
+from ._daemon_client import (
+    DAEMON_ENV_VAR,
+    _daemon_dir,
+    _peer_uid,
+    _private_dir_error,
+    _recv_line,
+    _socket_path,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+if os.environ.get("NO_RICH"):
+    import click as click
+else:
+    import rich_click as click
+
+_START_TIMEOUT = 60.0
+
+
+def _pid_path(slug: str) -> Path:
+    return _socket_path(slug).with_suffix(".pid")
+
+
+def _log_path(slug: str) -> Path:
+    return _socket_path(slug).with_suffix(".log")
+
+
+def _read_pid(slug: str) -> int | None:
+    try:
+        pid = int(_pid_path(slug).read_text().strip())
+    except (OSError, ValueError):
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        pass
+    return pid
+
+
+# -----------------------------------------------------------------------------
+# server
+# -----------------------------------------------------------------------------
+
+
+def _run_request(conn: socket.socket, request: dict, fds: list[int]) -> None:
+    """Run one forwarded command in a forked child, never returns."""
+    exit_code = 1
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for target_fd, fd in enumerate(fds):
+            os.dup2(fd, target_fd)
+            os.close(fd)
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        # commands spawned from here run in-process
+        os.environ.pop(DAEMON_ENV_VAR, None)
+        from lamin_cli.__main__ import main
+
+        try:
+            main.main(args=request["argv"], prog_name="lamin")
+            exit_code = 0
+        except SystemExit as e:
+            if e.code is None:
+                exit_code = 0
+            elif isinstance(e.code, int):
+                exit_code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+    except BaseException:
+        import traceback
+
+        traceback.print_exc()
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        try:
+            conn.sendall(json.dumps({"exit_code": exit_code}).encode() + b"\n")
+        finally:
+            os._exit(0)
+
+
+def serve(slug: str) -> None:
+    """Connect to `slug` and answer forwarded commands until SIGTERM."""
+    import lamindb_setup as ln_setup
+
+    ln_setup.connect(slug)
+    # pay for lamindb, Django and the CLI once
+    import lamindb
+    from django.db import connections
+
+    import lamin_cli.__main__
+
+    socket_path = _socket_path(slug)
+    if (error := _private_dir_error(socket_path.parent)) is not None:
+        raise SystemExit(f"refusing to serve: {error}")
+    socket_path.unlink(missing_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(socket_path))
+    socket_path.chmod(0o600)
+    server.listen()
+    _pid_path(slug).write_text(str(os.getpid()))
+
+    def shutdown(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    # children report their exit codes over the socket, don't keep zombies
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    n_requests = 0
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                # only the user who started the daemon may run commands in it
+                if _peer_uid(conn) != os.getuid():
+                    continue
+                try:
+                    data, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+                    request = json.loads(_recv_line(conn, data))
+                except (OSError, ValueError):
+                    continue
+                if len(fds) != 3:
+                    for fd in fds:
+                        os.close(fd)
+                    continue
+                # a forked child must not share the parent's database connections
+                connections.close_all()
+                # logged before the reply, only the subcommand as the arguments
+                # may hold paths and secrets
+                n_requests += 1
+                command = " ".join(request.get("argv", [])[:1])
+                timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+                print(f"{timestamp} request {n_requests}: lamin {command}", flush=True)
+                if os.fork() == 0:
+                    server.close()
+                    _run_request(conn, request, fds)
+                for fd in fds:
+                    os.close(fd)
+    finally:
+        server.close()
+        socket_path.unlink(missing_ok=True)
+        _pid_path(slug).unlink(missing_ok=True)
+
+
+# -----------------------------------------------------------------------------
+# commands
+# -----------------------------------------------------------------------------
+
+
+def _resolve_slug(instance: str | None) -> str:
+    if instance is not None:
+        return instance
+    import lamindb_setup as ln_setup
+
+    if not ln_setup.settings.is_configured:
+        raise click.ClickException(
+            "Not connected to an instance. Please run: lamin connect account/name"
+        )
+    return ln_setup.settings.instance.slug
+
+
+def _check_platform() -> None:
+    if not hasattr(socket, "AF_UNIX") or not hasattr(os, "fork"):
+        raise click.ClickException("lamin daemon requires a Unix platform.")
+
+
+@click.group()
+def daemon():
+    """Keep a warm, connected process per instance (experimental).
+
+    Chained `lamin` calls otherwise pay for importing lamindb and connecting to the
+    instance each time. Start a daemon and opt into forwarding via `LAMIN_DAEMON`:
+
+    ```
+    lamin daemon start
+    export LAMIN_DAEMON=account/name
+    lamin save my_table.csv --key my_tables/my_table.csv  # runs in the daemon
+    lamin daemon status
+    lamin daemon stop
+    ```
+
+    Forwarded commands are `annotate`, `describe`, `get`, `load`, `save`, and `update`.
+    If no daemon runs for the instance in `LAMIN_DAEMON`, commands run in-process.
+    """
+
+
+@daemon.command("start")
+@click.argument("instance", type=str, required=False)
+@click.option(
+    "--foreground", is_flag=True, default=False, help="Serve in this process."
+)
+def start(instance: str | None, foreground: bool):
+    """Start a daemon for the current or the passed instance."""
+    _check_platform()
+    slug = _resolve_slug(instance)
+    _daemon_dir().mkdir(mode=0o700, parents=True, exist_ok=True)
+    # another user may have created the directory in a shared temporary directory
+    if (error := _private_dir_error(_daemon_dir())) is not None:
+        raise click.ClickException(f"Can't start the daemon: {error}.")
+    if (pid := _read_pid(slug)) is not None:
+        click.echo(f"daemon for {slug} is already running (pid {pid})")
+        return
+    if foreground:
+        serve(slug)
+        return
+    with _log_path(slug).open("a") as log:
+        subprocess.Popen(
+            [sys.executable, "-m", "lamin_cli._daemon", slug],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+    deadline = time.monotonic() + _START_TIMEOUT
+    while _read_pid(slug) is None:
+        if time.monotonic() > deadline:
+            raise click.ClickException(
+                f"daemon for {slug} did not start, see {_log_path(slug)}"
+            )
+        time.sleep(0.1)
+    click.echo(f"started daemon for {slug} (pid {_read_pid(slug)})")
+    click.echo(f"forward commands via: export {DAEMON_ENV_VAR}={slug}")
+
+
+@daemon.command("stop")
+@click.argument("instance", type=str, required=False)
+def stop(instance: str | None):
+    """Stop the daemon for the current or the passed instance."""
+    slug = _resolve_slug(instance)
+    pid = _read_pid(slug)
+    if pid is None:
+        click.echo(f"no daemon running for {slug}")
+        return
+    os.kill(pid, signal.SIGTERM)
+    click.echo(f"stopped daemon for {slug} (pid {pid})")
+
+
+@daemon.command("status")
+def status():
+    """List running daemons."""
+    running = False
+    for pid_file in sorted(_daemon_dir().glob("*.pid")):
+        slug = pid_file.stem.replace("--", "/")
+        pid = _read_pid(slug)
+        if pid is None:
+            continue
+        running = True
+        click.echo(f"{slug}: pid {pid}, socket {_socket_path(slug)}")
+    if not running:
+        click.echo("no daemon running")
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1])
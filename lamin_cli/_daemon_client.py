@@ -0,0 +1,119 @@
+"""The client of `lamin daemon`, see `lamin_cli._daemon`.
+
+`forward()` is imported on every `lamin` call that sets `LAMIN_DAEMON` and
+hence only depends on the standard library. It sends argv, cwd and env together
+with its stdin, stdout and stderr file descriptors to the daemon of the instance.
+
+Requests carry the environment of the caller, so both ends only talk to processes
+of the same user: the socket lives in a directory only the user can access, and
+the uid of the peer of every connection is checked.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+DAEMON_ENV_VAR = "LAMIN_DAEMON"
+# commands that only read or write records of the connected instance
+FORWARDED_COMMANDS = {"annotate", "describe", "get", "load", "save", "update"}
+_MAX_MESSAGE_SIZE = 1 << 20
+
+
+def _daemon_dir() -> Path:
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(runtime_dir) / f"lamin-daemon-{os.getuid()}"
+
+
+def _private_dir_error(path: Path) -> str | None:
+    """Why `path` can't hold daemon sockets, `None` if only the user can access it."""
+    try:
+        st = path.lstat()
+    except FileNotFoundError:
+        return f"{path} does not exist"
+    if not stat.S_ISDIR(st.st_mode):
+        return f"{path} is not a directory"
+    if st.st_uid != os.getuid():
+        return f"{path} is owned by another user"
+    if st.st_mode & 0o077:
+        return f"{path} is accessible by other users"
+    return None
+
+
+def _peer_uid(conn: socket.socket) -> int | None:
+    """The uid of the process at the other end of `conn`, if the platform tells."""
+    if hasattr(socket, "SO_PEERCRED"):
+        # Linux: struct ucred {pid, uid, gid}
+        creds = conn.getsockopt(
+            socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+        )
+        return struct.unpack("3i", creds)[1]
+    if hasattr(socket, "LOCAL_PEERCRED"):
+        # macOS and BSDs: struct xucred {version, uid, ngroups, groups[16]} at
+        # level SOL_LOCAL
+        creds = conn.getsockopt(0, socket.LOCAL_PEERCRED, struct.calcsize("IIh16I"))
+        return struct.unpack("II", creds[:8])[1]
+    return None
+
+
+def _socket_path(slug: str) -> Path:
+    return _daemon_dir() / f"{slug.replace('/', '--')}.sock"
+
+
+def _recv_line(conn: socket.socket, data: bytes = b"") -> bytes:
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > _MAX_MESSAGE_SIZE:
+            raise ValueError("daemon message too large")
+    return data
+
+
+def forward(argv: list[str]) -> int | None:
+    """Run `lamin <argv>` in the daemon named by `LAMIN_DAEMON`.
+
+    Returns the exit code, or `None` if the command should run in-process.
+    """
+    slug = os.environ.get(DAEMON_ENV_VAR)
+    if not slug or not argv or argv[0] not in FORWARDED_COMMANDS:
+        return None
+    if not hasattr(socket, "AF_UNIX") or not hasattr(os, "fork"):
+        return None
+    path = _socket_path(slug)
+    if not path.exists():
+        return None
+    # the request carries the environment, with its tokens and credentials
+    error = _private_dir_error(path.parent)
+    if error is None and path.lstat().st_uid != os.getuid():
+        error = f"{path} is owned by another user"
+    if error is not None:
+        print(f"lamin: not forwarding to the daemon, {error}", file=sys.stderr)
+        return None
+    request = {"argv": argv, "cwd": str(Path.cwd()), "env": dict(os.environ)}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        try:
+            conn.connect(str(path))
+        except OSError:
+            # stale socket of a daemon that was killed
+            return None
+        if _peer_uid(conn) != os.getuid():
+            print(
+                f"lamin: not forwarding to the daemon, {path} is served by another user",
+                file=sys.stderr,
+            )
+            return None
+        for stream in (sys.stdout, sys.stderr):
+            stream.flush()
+        socket.send_fds(conn, [json.dumps(request).encode() + b"\n"], [0, 1, 2])
+        response = _recv_line(conn)
+    if not response:
+        return 1
+    return int(json.loads(response)["exit_code"])
@@ -1,18 +1,11 @@
 from __future__ import annotations
 
-import json
 import os
 import subprocess
 import sys
 import tempfile
 from pathlib import Path
 
-import lamindb_setup as ln_setup
-
-from lamin_cli.clone._clone_verification import (
-    _count_instance_records,
-)
-
 if os.environ.get("NO_RICH"):
     import click as click
 else:
@@ -28,77 +21,192 @@ def io():
 @io.command("snapshot")
 @click.option("--upload/--no-upload", is_flag=True, help="Whether to upload the snapshot.", default=True)
 @click.option("--track/--no-track", is_flag=True, help="Whether to track snapshot generation.", default=True)
+@click.option("--incremental", is_flag=True, default=False, help="Only export rows changed since the previous snapshot and apply them to its clone.")
+@click.option("--max-workers", type=int, default=4, help="Number of tables read in parallel.")
+@click.option("--compression", type=click.Choice(["gzip", "zstd"]), default="gzip", help="Upload a gzip file, or zstd frames that are uploaded in parallel and skipped if unchanged.")
 # fmt: on
-def snapshot(upload: bool, track: bool) -> None:
-    """Create a SQLite snapshot of the connected instance."""
-    from lamindb_setup.io import export_db
+def snapshot(upload: bool, track: bool, incremental: bool, max_workers: int, compression: str) -> None:
+    """Create a SQLite snapshot of the connected instance.
+
+    With `--incremental`, rows created or updated since the previous snapshot in the
+    working directory are upserted into its clone, rows deleted since are removed,
+    and the clone is only uploaded if anything changed. Without a previous
+    snapshot of the same instance and modules, a full snapshot is created.
+
+    Tables are read in parallel in the order of their foreign keys and streamed
+    into the clone, which reports the slowest tables when it is done. The clone
+    is verified against checksums of id ranges of every table, and differing ids
+    are reported. An incremental snapshot only verifies the id ranges of the rows
+    it changed and the row counts of the other tables.
+
+    With `--compression zstd`, the clone is uploaded to `lamin.db.zst/` as
+    independently compressed frames with a manifest, which allows resuming an
+    interrupted upload and reading byte ranges without downloading everything.
+    """
+    import lamindb_setup as ln_setup
     if not ln_setup.settings.is_configured:
         raise click.ClickException(
             "Not connected to an instance. Please run: lamin connect account/name"
         )
+    if upload and compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as error:
+            raise click.ClickException(
+                "Compressing snapshots with zstd requires zstandard: "
+                "pip install zstandard"
+            ) from error
 
     instance_owner = ln_setup.settings.instance.owner
     instance_name = ln_setup.settings.instance.name
+    instance_slug = f"{instance_owner}/{instance_name}"
 
-    ln_setup.connect(f"{instance_owner}/{instance_name}", use_root_db_user=True)
+    ln_setup.connect(instance_slug, use_root_db_user=True)
 
     import lamindb as ln
 
-    original_counts = _count_instance_records()
+    from lamin_cli.clone._clone_verification import verify_clone
+    from lamin_cli.clone._incremental import (
+        _read_snapshot_state,
+        _snapshot_models,
+        _snapshot_state_path,
+        _table_watermarks,
+        _write_snapshot_state,
+        apply_incremental_snapshot,
+    )
+    from lamin_cli.clone._stream import send_tables
 
     modules_without_lamindb = ln_setup.settings.instance.modules
     modules_complete = modules_without_lamindb.copy()
     modules_complete.add("lamindb")
 
+    clone_db = Path(f"{instance_name}-clone/.lamindb/lamin.db")
+    state_path = _snapshot_state_path(clone_db)
+    state = None
+    if incremental:
+        state = _read_snapshot_state(state_path, instance_slug, modules_complete)
+        if state is None:
+            click.echo("No previous snapshot to update, creating a full snapshot.")
+
+    models = _snapshot_models(modules_complete)
+    # marks are taken before exporting, rows changed meanwhile are exported again
+    watermarks = _table_watermarks(models)
+
+    if state is not None:
+        import sqlite3
 
-    with tempfile.TemporaryDirectory() as export_dir:
         if track:
             ln.track("o39ljgTzvFew", key="__lamin_io_snapshot__.py")
-        export_db(module_names=modules_complete, output_dir=export_dir)
+        try:
+            changes = apply_incremental_snapshot(
+                clone_db, models, state["tables"], watermarks
+            )
+        except sqlite3.OperationalError as error:
+            raise click.ClickException(
+                f"Could not update the previous snapshot at {clone_db}: {error}\n"
+                "The instance schema might have changed, run `lamin io snapshot` "
+                "without --incremental."
+            ) from None
         if track:
             ln.finish()
-
-        script_path = (
-            Path(__file__).parent / "clone" / "create_sqlite_clone_and_import_db.py"
+        # only the rows changed since the previous snapshot are compared
+        changed_keys = {
+            table: upserted | deleted for table, (upserted, deleted) in changes.items()
+        }
+        _raise_differences(
+            verify_clone(models, clone_db, watermarks, changed_keys=changed_keys)
         )
-        result = subprocess.run(
+        for table, (upserted, deleted) in sorted(changes.items()):
+            click.echo(
+                f"{table}: {len(upserted)} rows upserted, {len(deleted)} rows deleted"
+            )
+        _write_snapshot_state(state_path, instance_slug, modules_complete, watermarks)
+        if not changes:
+            click.echo("Snapshot is up to date.")
+        elif upload:
+            _upload_clone(clone_db, compression)
+        ln_setup.disconnect()
+        return
+
+    script_path = (
+        Path(__file__).parent / "clone" / "create_sqlite_clone_and_import_db.py"
+    )
+    # tables are streamed into the subprocess that creates the clone, the pipe
+    # blocks while it initializes the clone or falls behind
+    with tempfile.TemporaryFile("w+") as stderr:
+        process = subprocess.Popen(
             [
                 sys.executable,
                 str(script_path),
                 "--instance-name",
                 instance_name,
-                "--export-dir",
-                export_dir,
                 "--modules",
                 ",".join(modules_without_lamindb),
-                "--original-counts",
-                json.dumps(original_counts),
             ],
-            check=False,
-            stderr=subprocess.PIPE,
-            text=True,
+            stdin=subprocess.PIPE,
+            stderr=stderr,
             cwd=Path.cwd(),
         )
-        if result.returncode != 0:
+        if track:
+            ln.track("o39ljgTzvFew", key="__lamin_io_snapshot__.py")
+        try:
+            send_tables(models, process.stdin, max_workers=max_workers)
+        except BrokenPipeError:
+            # the subprocess failed, its error is reported below
+            pass
+        finally:
             try:
-                mismatches = json.loads(result.stderr.strip())
-                error_msg = "Record count mismatch detected:\n" + "\n".join(
-                    [f"  {table}: original={orig}, clone={clone}"
-                    for table, (orig, clone) in mismatches.items()]
-                )
-                raise click.ClickException(error_msg)
-            except (json.JSONDecodeError, AttributeError, ValueError, TypeError):
-                raise click.ClickException(f"Clone verification failed:\n{result.stderr}") from None
-
-
-        ln_setup.connect(f"{instance_owner}/{instance_name}", use_root_db_user=True)
-        if upload:
-            ln_setup.core._clone.upload_sqlite_clone(
-                local_sqlite_path=f"{instance_name}-clone/.lamindb/lamin.db",
-                compress=True,
-            )
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+        if track:
+            ln.finish()
+        returncode = process.wait()
+        stderr.seek(0)
+        error_output = stderr.read()
+    if returncode != 0:
+        raise click.ClickException(f"Creating the clone failed:\n{error_output}")
+    _raise_differences(verify_clone(models, clone_db, watermarks))
 
-        ln_setup.disconnect()
+    _write_snapshot_state(state_path, instance_slug, modules_complete, watermarks)
+
+    ln_setup.connect(instance_slug, use_root_db_user=True)
+    if upload:
+        _upload_clone(clone_db, compression)
+
+    ln_setup.disconnect()
+
+
+def _upload_clone(clone_db: Path, compression: str) -> None:
+    import lamindb_setup as ln_setup
+
+    if compression == "gzip":
+        ln_setup.core._clone.upload_sqlite_clone(
+            local_sqlite_path=clone_db, compress=True
+        )
+        return
+
+    from lamindb_setup.core.upath import create_path
+
+    from lamin_cli.clone._package import upload_snapshot
+
+    destination = create_path(f"{ln_setup.settings.instance._sqlite_file}.zst")
+    stats = upload_snapshot(clone_db, destination)
+    click.echo(
+        f"uploaded {stats['uploaded']} of {stats['frames']} frames "
+        f"({stats['uploaded_bytes'] / 1e6:.1f} MB) to {destination}"
+    )
+
+
+def _raise_differences(differences: dict[str, list[str]]) -> None:
+    if differences:
+        raise click.ClickException(
+            "The clone differs from the instance:\n"
+            + "\n".join(
+                f"  {table}: {'; '.join(details)}"
+                for table, details in sorted(differences.items())
+            )
+        )
 
 
 # fmt: off
@@ -107,32 +215,84 @@ def snapshot(upload: bool, track: bool) -> None:
 @click.option("--output-dir", type=str, help="Output directory for exported parquet files.")
 @click.option("--max-workers", type=int, default=8, help="Number of parallel workers.")
 @click.option("--chunk-size", type=int, default=500_000, help="Number of rows per chunk for large tables.")
+@click.option("--include", type=str, default=None, help="Comma-separated patterns of tables or registries to export (e.g., 'bionty.*,lamindb_artifact').")
+@click.option("--exclude", type=str, default=None, help="Comma-separated patterns of tables or registries not to export.")
+@click.option("--since", type=str, default=None, help="Directory of a previous export; only rows created or updated after it are exported.")
 # fmt: on
-def exportdb(modules: str | None, output_dir: str, max_workers: int, chunk_size: int):
-    """Export registry tables to parquet files."""
-    from lamindb_setup.io import export_db
+def exportdb(
+    modules: str | None,
+    output_dir: str,
+    max_workers: int,
+    chunk_size: int,
+    include: str | None,
+    exclude: str | None,
+    since: str | None,
+):
+    """Export registry tables to parquet files.
+
+    Every table is written as a `<table>.parquet` directory with one file per
+    chunk, and `manifest.json` records the chunks with their row counts and
+    hashes. Rerunning an interrupted export with the same arguments skips the
+    chunks that are already written. The ids and uids of tables that exported
+    rows reference are written to `ids/`, for `lamin io importdb --if-exists
+    upsert`.
+    """
+    import lamindb_setup as ln_setup
     if not ln_setup.settings.is_configured:
         raise click.ClickException(
             "Not connected to an instance. Please run: lamin connect account/name"
         )
+    try:
+        import pyarrow
+    except ImportError as error:
+        raise click.ClickException(
+            "Exporting requires pyarrow: pip install pyarrow"
+        ) from error
 
-    module_list = modules.split(",") if modules else None
-    export_db(
-        module_names=module_list,
-        output_dir=output_dir,
-        max_workers=max_workers,
-        chunk_size=chunk_size,
-    )
+    # loads the registries of all modules of the instance
+    import lamindb
+
+    from lamin_cli.clone._export import export_tables, since_watermarks
+
+    if output_dir is None:
+        output_dir = f"./{ln_setup.settings.instance.name}_export/"
+    module_list = modules.split(",") if modules else ["lamindb"]
+
+    def report(table: str, entry: dict) -> None:
+        rows = sum(chunk["rows"] for chunk in entry["chunks"])
+        click.echo(f"{table}: {rows} rows in {len(entry['chunks'])} chunks")
+
+    try:
+        export_tables(
+            module_list,
+            Path(output_dir),
+            include=include.split(",") if include else None,
+            exclude=exclude.split(",") if exclude else None,
+            since=since_watermarks(Path(since)) if since else None,
+            chunk_size=chunk_size,
+            max_workers=max_workers,
+            on_table=report,
+        )
+    except ValueError as error:
+        raise click.ClickException(str(error)) from None
 
 
 # fmt: off
 @io.command("importdb")
 @click.option("--modules", type=str, default=None, help="Comma-separated list of modules to import (e.g., 'lamindb,bionty').")
 @click.option("--input-dir", type=str, help="Input directory containing exported parquet files.")
-@click.option("--if-exists", type=click.Choice(["fail", "replace", "append"]), default="replace", help="How to handle existing data.")
+@click.option("--if-exists", type=click.Choice(["fail", "replace", "append", "upsert"]), default="replace", help="How to handle existing data; 'upsert' updates rows with the same uid and adds the others.")
+@click.option("--chunk-size", type=int, default=100_000, help="Number of rows merged at a time with 'upsert'.")
 # fmt: on
-def importdb(modules: str | None, input_dir: str, if_exists: str):
-    """Import registry tables from parquet files."""
+def importdb(modules: str | None, input_dir: str, if_exists: str, chunk_size: int):
+    """Import registry tables from parquet files.
+
+    With `--if-exists upsert`, rows are matched on their `uid`, and link tables on
+    their unique columns, so that an export can be merged into an instance with
+    other primary keys. Foreign keys are remapped to the rows with the same uid;
+    rows that reference rows missing from this instance abort the import.
+    """
+    import lamindb_setup as ln_setup
     from lamindb_setup.io import import_db
     if not ln_setup.settings.is_configured:
         raise click.ClickException(
@@ -140,8 +300,56 @@ def importdb(modules: str | None, input_dir: str, if_exists: str):
         )
 
     module_list = modules.split(",") if modules else None
+    if if_exists == "upsert":
+        _upsert_db(module_list, Path(input_dir or "./lamindb_export/"), chunk_size)
+        return
     import_db(
         module_names=module_list,
         input_dir=input_dir,
         if_exists=if_exists,
     )
+
+
+def _upsert_db(modules: list[str] | None, input_dir: Path, chunk_size: int) -> None:
+    try:
+        import pyarrow
+    except ImportError as error:
+        raise click.ClickException(
+            "Upserting requires pyarrow: pip install pyarrow"
+        ) from error
+    # loads the registries of all modules of the instance
+    import lamindb
+    from django.db import IntegrityError
+
+    from lamin_cli.clone._export import ExportManifest
+    from lamin_cli.clone._incremental import _snapshot_models
+    from lamin_cli.clone._upsert import upsert_tables
+
+    if not input_dir.exists():
+        raise click.ClickException(f"Directory does not exist: {input_dir}")
+    if modules is None:
+        manifest = ExportManifest.load(input_dir)
+        if manifest is not None:
+            modules = manifest.data["parameters"]["modules"]
+        else:
+            # like import_db, detect the modules from the table names
+            modules = sorted(
+                {path.name.split("_")[0] for path in input_dir.glob("*_*.parquet")}
+            )
+
+    def report(table: str, merged: tuple[int, int] | None) -> None:
+        if merged is None:
+            click.echo(f"{table}: skipped, rows can't be matched without a uid")
+        else:
+            click.echo(f"{table}: {merged[0]} rows upserted in {merged[1]} chunks")
+
+    try:
+        upsert_tables(
+            _snapshot_models(modules), input_dir, chunk_size=chunk_size, on_table=report
+        )
+    except ValueError as error:
+        raise click.ClickException(str(error)) from None
+    except IntegrityError as error:
+        raise click.ClickException(
+            f"Upserting failed and nothing was imported: {error}"
+        ) from None
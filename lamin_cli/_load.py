@@ -12,6 +12,9 @@ from ._notes import is_path_within, parse_note_target, resolve_note_record
 from ._save import infer_registry_from_path, parse_title_r_notebook
 from .urls import decompose_url
 
+# a 16-character stem shared by all versions and a 4-character version suffix
+_ARTIFACT_UID_LENGTH = 20
+
 
 def load(
     entity: str | None = None,
@@ -301,3 +304,157 @@ def load(
                 logger.important(f"{entity} is here: {cache_path}")
         case _:
             raise AssertionError(f"unknown entity {entity}")
+
+
+def read_load_manifest(manifest: Path | str) -> tuple[list[str], list[str]]:
+    """Read the uids and keys to load from a TSV with a header or a JSONL file."""
+    import csv
+    import json
+
+    manifest = Path(manifest)
+    if manifest.suffix in {".jsonl", ".ndjson"}:
+        with manifest.open() as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        with manifest.open(newline="") as f:
+            rows = list(csv.DictReader(f, delimiter="\t"))
+    uids, keys = [], []
+    for i, row in enumerate(rows, start=1):
+        if row.get("uid"):
+            uids.append(row["uid"])
+        elif row.get("key"):
+            keys.append(row["key"])
+        else:
+            raise click.BadParameter(
+                f"Row {i} has neither 'uid' nor 'key'", param_hint="--manifest"
+            )
+    return uids, keys
+
+
+def load_many(
+    uids: list[str] | tuple[str, ...] = (),
+    keys: list[str] | tuple[str, ...] = (),
+    key_prefix: str | None = None,
+    max_workers: int = 8,
+    path_manifest: Path | str | None = None,
+) -> str | None:
+    """Load many artifacts into the cache.
+
+    All artifacts are resolved in one query and downloaded on a thread pool.
+    As for a single artifact, uids may be prefixes and the latest version wins.
+
+    Args:
+        uids: Artifact uids or uid prefixes.
+        keys: Artifact keys.
+        key_prefix: Load all artifacts whose key starts with this prefix.
+        max_workers: The number of download threads.
+        path_manifest: Write a TSV with `uid`, `key` and the cache `path` of each
+            artifact to this path, `"-"` writes it to stdout.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from functools import reduce
+    from operator import or_
+
+    import lamindb as ln
+
+    current_run = None
+    if get_current_run_file().exists():
+        current_run = ln.Run.get(uid=get_current_run_file().read_text().strip())
+    ln.settings.track_run_inputs = False
+
+    # full uids are matched exactly, only shorter ones as prefixes
+    full_uids = [uid for uid in uids if len(uid) == _ARTIFACT_UID_LENGTH]
+    uid_prefixes = sorted({uid for uid in uids if len(uid) != _ARTIFACT_UID_LENGTH})
+    conditions = [ln.Q(uid__startswith=prefix) for prefix in uid_prefixes]
+    if full_uids:
+        conditions.append(ln.Q(uid__in=full_uids))
+    if keys:
+        conditions.append(ln.Q(key__in=keys))
+    if key_prefix is not None:
+        conditions.append(ln.Q(key__startswith=key_prefix))
+    if not conditions:
+        raise click.UsageError("Pass uids, keys, a key prefix, or a manifest.")
+    # we use `.objects` here because we don't want to exclude kind = __lamindb_run__ artifacts
+    candidates = ln.Artifact.objects.filter(reduce(or_, conditions)).order_by(
+        "-created_at"
+    )
+
+    # like for a single artifact, the latest match of each uid prefix and key wins
+    prefix_lengths = {len(prefix) for prefix in uid_prefixes}
+    by_uid: dict[str, ln.Artifact] = {}
+    by_key: dict[str, ln.Artifact] = {}
+    for artifact in candidates:
+        by_uid.setdefault(artifact.uid, artifact)
+        for length in prefix_lengths:
+            by_uid.setdefault(artifact.uid[:length], artifact)
+        if artifact.key is not None:
+            by_key.setdefault(artifact.key, artifact)
+    selected: dict[int, ln.Artifact] = {}
+    missing = []
+    for uid in uids:
+        if uid in by_uid:
+            selected.setdefault(by_uid[uid].id, by_uid[uid])
+        else:
+            missing.append(f"uid={uid}")
+    for key in keys:
+        if key in by_key:
+            selected.setdefault(by_key[key].id, by_key[key])
+        else:
+            missing.append(f"key={key}")
+    if key_prefix is not None:
+        matches = [a for k, a in by_key.items() if k.startswith(key_prefix)]
+        if not matches:
+            missing.append(f"key prefix {key_prefix}")
+        for artifact in matches:
+            selected.setdefault(artifact.id, artifact)
+    if missing:
+        shown = ", ".join(missing[:10])
+        more = f" and {len(missing) - 10} more" if len(missing) > 10 else ""
+        raise click.ClickException(f"Artifacts with {shown}{more} do not exist.")
+
+    artifacts = list(selected.values())
+    n_artifacts = len(artifacts)
+    logger.important(f"loading {n_artifacts} artifacts with {max_workers} workers")
+    paths: dict[int, Path] = {}
+    errors: dict[int, str] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(artifact.cache, is_run_input=False): artifact
+            for artifact in artifacts
+        }
+        for i, future in enumerate(as_completed(futures), start=1):
+            artifact = futures[future]
+            try:
+                paths[artifact.id] = future.result()
+            except Exception as e:
+                errors[artifact.id] = str(e)
+                logger.error(f"  [{i}/{n_artifacts}] {artifact.uid}: {e}")
+            else:
+                logger.important(f"  [{i}/{n_artifacts}] {paths[artifact.id]}")
+
+    if current_run is not None:
+        # link inputs in bulk rather than from the download threads
+        current_run.input_artifacts.add(
+            *(
+                artifact
+                for artifact in artifacts
+                if artifact.id in paths and artifact.run_id != current_run.id
+            )
+        )
+
+    if path_manifest is not None:
+        lines = ["uid\tkey\tpath"] + [
+            f"{artifact.uid}\t{artifact.key or ''}\t{paths[artifact.id]}"
+            for artifact in artifacts
+            if artifact.id in paths
+        ]
+        content = "\n".join(lines) + "\n"
+        if str(path_manifest) == "-":
+            click.echo(content, nl=False)
+        else:
+            Path(path_manifest).write_text(content)
+            logger.important(f"path manifest is here: {path_manifest}")
+    if errors:
+        logger.error(f"could not load {len(errors)} of {n_artifacts} artifacts")
+        return "batch-load-failed"
+    return None
@@ -0,0 +1,539 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.parse import unquote
+
+if os.environ.get("NO_RICH"):
+    import click as click
+else:
+    import rich_click as click
+
+if TYPE_CHECKING:
+    import sqlite3
+    from collections.abc import Iterable, Mapping
+
+OFFLINE_ENV_VAR = "LAMIN_OFFLINE"
+MIRROR_DIR_ENV_VAR = "LAMIN_MIRROR_DIR"
+# registries synced by default, modules stand for all their models
+DEFAULT_SYNC_REGISTRIES = ("core",)
+FIELD_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+COMPARISONS = {"eq": "=", "ne": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def is_offline() -> bool:
+    return os.environ.get(OFFLINE_ENV_VAR, "").lower() in {"1", "true"}
+
+
+def mirror_path(instance_id: str) -> Path:
+    from lamin_cli.hub._schema.utils import _default_cache_root, _safe_cache_part
+
+    directory = os.environ.get(MIRROR_DIR_ENV_VAR)
+    root = Path(directory).expanduser() if directory else _default_cache_root()
+    return root / "mirror" / f"{_safe_cache_part(instance_id)}.sqlite3"
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _json_field(name: str) -> str:
+    if not FIELD_PATTERN.fullmatch(name):
+        raise click.ClickException(
+            f"Offline queries only support fields of the queried model, not '{name}'"
+        )
+    return f"json_extract(record, '$.{name}')"
+
+
+class Mirror:
+    """SQLite mirror of the registries of one instance.
+
+    Each registry `module.model` is a table holding `id`, `uid`, `updated_at`, and
+    the row as JSON. `watermarks` records the latest `updated_at` synced per
+    registry and `meta` the instance schema.
+    """
+
+    def __init__(self, path: Path, *, create: bool = False):
+        import sqlite3
+
+        if not create and not path.exists():
+            raise click.ClickException(
+                "No offline mirror of the current instance, run `lamin mirror sync`"
+                " while online"
+            )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.connection: sqlite3.Connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+            "CREATE TABLE IF NOT EXISTS watermarks ("
+            "registry TEXT PRIMARY KEY, updated_at TEXT, synced_at REAL);"
+        )
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def schema(self) -> dict[str, Any]:
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = 'schema'"
+        ).fetchone()
+        if row is None:
+            raise click.ClickException("The offline mirror has no schema yet")
+        return json.loads(row[0])
+
+    def set_schema(self, schema: Mapping[str, Any]) -> None:
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('schema', ?)",
+                (json.dumps(schema, default=str),),
+            )
+
+    def registries(self) -> list[str]:
+        rows = self.connection.execute("SELECT registry FROM watermarks ORDER BY 1")
+        return [registry for (registry,) in rows]
+
+    def watermark(self, registry: str) -> str | None:
+        row = self.connection.execute(
+            "SELECT updated_at FROM watermarks WHERE registry = ?", (registry,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def reset(self, registry: str) -> None:
+        with self.connection:
+            self.connection.execute(f"DROP TABLE IF EXISTS {_quote(registry)}")
+            self.connection.execute(
+                "DELETE FROM watermarks WHERE registry = ?", (registry,)
+            )
+
+    def upsert(self, registry: str, rows: list[dict[str, Any]]) -> None:
+        """Store rows sorted by `updated_at` and advance the watermark past them."""
+        table = _quote(registry)
+        with self.connection:
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY,"
+                " uid TEXT, updated_at TEXT, record TEXT NOT NULL)"
+            )
+            self.connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {_quote(registry + '.uid')}"
+                f" ON {table} (uid)"
+            )
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        row["id"],
+                        row.get("uid"),
+                        row.get("updated_at"),
+                        json.dumps(row, default=str),
+                    )
+                    for row in rows
+                ],
+            )
+            watermark = rows[-1].get("updated_at") if rows else None
+            self.connection.execute(
+                "INSERT INTO watermarks VALUES (?, ?, ?) ON CONFLICT (registry) DO"
+                " UPDATE SET updated_at = coalesce(excluded.updated_at, updated_at),"
+                " synced_at = excluded.synced_at",
+                (registry, watermark, time.time()),
+            )
+
+    def count(self, registry: str) -> int:
+        if registry not in self.registries():
+            return 0
+        return self.connection.execute(
+            f"SELECT count(*) FROM {_quote(registry)}"
+        ).fetchone()[0]
+
+    def status(self) -> list[dict[str, Any]]:
+        rows = self.connection.execute(
+            "SELECT registry, updated_at, synced_at FROM watermarks ORDER BY 1"
+        ).fetchall()
+        return [
+            {
+                "registry": registry,
+                "rows": self.count(registry),
+                "updated_at": updated_at,
+                "synced_at": synced_at,
+            }
+            for registry, updated_at, synced_at in rows
+        ]
+
+    def query(
+        self,
+        registry: str,
+        *,
+        filter_: dict[str, Any] | None = None,
+        order_by: list[dict[str, Any]] | None = None,
+        search: str | None = None,
+        search_in: list[str] | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> list[dict[str, Any]]:
+        if registry not in self.registries():
+            raise click.ClickException(
+                f"{registry} isn't in the offline mirror, run `lamin mirror sync"
+                f" --registry {registry}` while online"
+            )
+        args: list[Any] = []
+        clauses = []
+        if filter_:
+            clauses.append(_where(filter_, args))
+        if search:
+            pattern = f"%{search}%"
+            if search_in:
+                clauses.append(
+                    "("
+                    + " OR ".join(f"{_json_field(f)} LIKE ?" for f in search_in)
+                    + ")"
+                )
+                args.extend(pattern for _ in search_in)
+            else:
+                clauses.append("record LIKE ?")
+                args.append(pattern)
+        sql = f"SELECT record FROM {_quote(registry)}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        # NULLs sort as on Postgres, which keyset paging relies on
+        order = [
+            f"{_json_field(item['field'])}"
+            f" {'DESC NULLS FIRST' if item.get('descending') else 'ASC NULLS LAST'}"
+            for item in order_by or []
+        ]
+        sql += " ORDER BY " + ", ".join([*order, "id"])
+        sql += " LIMIT ? OFFSET ?"
+        args.extend([-1 if limit is None else limit, offset])
+        return [json.loads(record) for (record,) in self.connection.execute(sql, args)]
+
+
+def _where(filter_: dict[str, Any], args: list[Any]) -> str:
+    """Translate a REST filter object into an SQL condition over the JSON rows."""
+    if len(filter_) != 1:
+        return (
+            "(" + " AND ".join(_where({k: v}, args) for k, v in filter_.items()) + ")"
+        )
+    ((key, value),) = filter_.items()
+    if key in {"and", "or"}:
+        joined = f" {key.upper()} ".join(_where(clause, args) for clause in value)
+        return f"({joined})"
+    if key == "not":
+        return f"NOT {_where(value, args)}"
+    field = _json_field(key)
+    conditions = value if isinstance(value, dict) else {"eq": value}
+    sql = []
+    for operator, operand in conditions.items():
+        if operator in {"eq", "ne"} and operand is None:
+            sql.append(f"{field} IS {'NOT ' if operator == 'ne' else ''}NULL")
+        elif operator in COMPARISONS:
+            sql.append(f"{field} {COMPARISONS[operator]} ?")
+            args.append(operand)
+        elif operator == "in":
+            sql.append(f"{field} IN ({', '.join('?' for _ in operand)})")
+            args.extend(operand)
+        elif operator in {"contains", "icontains"}:
+            sql.append(f"{field} LIKE ?")
+            args.append(f"%{operand}%")
+        elif operator in {"startswith", "istartswith"}:
+            sql.append(f"{field} LIKE ?")
+            args.append(f"{operand}%")
+        else:
+            raise click.ClickException(
+                f"Filter operator '{operator}' isn't supported offline"
+            )
+    return "(" + " AND ".join(sql) + ")"
+
+
+def _select(row: dict[str, Any], select: list[str] | None) -> dict[str, Any]:
+    if not select:
+        return row
+    for field in select:
+        _json_field(field)
+    return {field: row.get(field) for field in select}
+
+
+def current_mirror(*, create: bool = False) -> Mirror:
+    from lamin_cli.hub._client import _current_instance
+
+    instance_id, _ = _current_instance()
+    return Mirror(mirror_path(instance_id), create=create)
+
+
+def _registry(schema: dict[str, Any], module: str, model: str) -> tuple[str, dict]:
+    from lamin_cli.hub._schema.utils import resolve_model_metadata
+
+    model_key, metadata = resolve_model_metadata(schema, module, model)
+    return f"{module}.{model_key}", metadata
+
+
+def request_json_offline(
+    method: str,
+    path: str,
+    *,
+    params: dict[str, Any] | None = None,
+    body: Any | None = None,
+) -> Any:
+    """Answer a read request of the hub REST API from the mirror."""
+    params = params or {}
+    body = body or {}
+    parts = [unquote(part) for part in path.split("/")]
+    with closing(current_mirror()) as mirror:
+        if (method, path) == ("get", "schema"):
+            return mirror.schema()
+        if (method, path) == ("get", "statistics"):
+            return {"counts": _offline_counts(mirror, params.get("q"))}
+        if method == "post" and parts[0] == "modules" and len(parts) == 3:
+            registry, _ = _registry(mirror.schema(), parts[1], parts[2])
+            rows = mirror.query(
+                registry,
+                filter_=body.get("filter"),
+                order_by=body.get("order_by"),
+                search=body.get("search"),
+                search_in=body.get("search_in"),
+                limit=params.get("limit"),
+                offset=params.get("offset") or 0,
+            )
+            return [_select(row, body.get("select")) for row in rows]
+        if (
+            method == "post"
+            and parts[0] == "modules"
+            and len(parts) == 4
+            and parts[3] != "batch-delete"
+        ):
+            registry, _ = _registry(mirror.schema(), parts[1], parts[2])
+            field = "id" if parts[3].isdigit() else "uid"
+            value = int(parts[3]) if field == "id" else parts[3]
+            rows = mirror.query(registry, filter_={field: {"eq": value}}, limit=1)
+            if not rows:
+                raise click.ClickException(
+                    f"{registry} {parts[3]} isn't in the offline mirror"
+                )
+            return _select(rows[0], body.get("select"))
+    raise click.ClickException(f"{method.upper()} {path} isn't available offline")
+
+
+def _offline_counts(mirror: Mirror, models: list[str] | None) -> dict[str, Any]:
+    schema = mirror.schema()
+    registries = mirror.registries()
+    if models:
+        registries = [
+            _registry(schema, *model.split(".", 1))[0]
+            for model in models
+            if "." in model
+        ]
+    counts: dict[str, dict[str, int]] = {}
+    for registry in registries:
+        module, model_key = registry.split(".", 1)
+        class_name = schema.get(module, {}).get(model_key, {}).get("class_name")
+        counts.setdefault(module, {})[class_name or model_key] = mirror.count(registry)
+    return counts
+
+
+def _find_offline(
+    entity: str, *, uid: str | None, key: str | None, name: str | None
+) -> dict[str, Any]:
+    if uid is not None:
+        filter_: dict[str, Any] = {"uid": {"startswith": uid}}
+    elif key is not None:
+        filter_ = {"key": {"eq": key}}
+    elif name is not None:
+        filter_ = {"name": {"eq": name}}
+    else:
+        raise click.ClickException(
+            f"Pass --uid, --key, or --name to find the {entity} offline"
+        )
+    with closing(current_mirror()) as mirror:
+        # the latest version matches first
+        rows = mirror.query(
+            f"core.{entity}",
+            filter_=filter_,
+            order_by=[{"field": "id", "descending": True}],
+            limit=1,
+        )
+    if not rows:
+        raise click.ClickException(f"No {entity} found in the offline mirror")
+    return rows[0]
+
+
+def describe_offline(
+    entity: str, *, uid: str | None, key: str | None, name: str | None
+) -> None:
+    """Print the mirrored fields of an object."""
+    record = _find_offline(entity, uid=uid, key=key, name=name)
+    click.echo(f"{entity.capitalize()}: {record.get('uid')} (offline mirror)")
+    for field, value in record.items():
+        if value is not None and field not in {"id", "uid"}:
+            click.echo(f"  {field}: {value}")
+
+
+def read_field_offline(
+    entity: str,
+    field: str,
+    *,
+    uid: str | None,
+    key: str | None,
+    name: str | None,
+) -> Any:
+    record = _find_offline(entity, uid=uid, key=key, name=name)
+    if field == "status":
+        from lamin_cli.hub.branches import BRANCH_CODE_TO_STATUS
+
+        return BRANCH_CODE_TO_STATUS.get(record.get("_status_code"), "standalone")
+    return record.get(field)
+
+
+def list_offline(registry: str, *, limit: int) -> None:
+    from lamin_cli.hub._utils import _pretty_print_json_list
+
+    with closing(current_mirror()) as mirror:
+        rows = mirror.query(
+            f"core.{registry}",
+            order_by=[{"field": "id", "descending": True}],
+            limit=limit,
+        )
+    _pretty_print_json_list(
+        [
+            {field: row.get(field) for field in ("name", "uid", "created_at")}
+            for row in rows
+        ]
+    )
+
+
+def _sync_targets(schema: Mapping[str, Any], registries: Iterable[str]) -> list[str]:
+    from lamin_cli.hub._schema.utils import is_hidden_model, module_schema
+
+    targets = []
+    for registry in registries:
+        if "." in registry:
+            target, metadata = _registry(schema, *registry.split(".", 1))
+            if "updated_at" not in metadata.get("fields", {}):
+                raise click.ClickException(
+                    f"{target} has no updated_at field and can't be mirrored"
+                )
+            targets.append(target)
+            continue
+        for model_key, metadata in module_schema(schema, registry).items():
+            fields = metadata.get("fields", {}) if isinstance(metadata, dict) else {}
+            if (
+                "id" in fields
+                and "updated_at" in fields
+                and not is_hidden_model(model_key, metadata)
+            ):
+                targets.append(f"{registry}.{model_key}")
+    return targets
+
+
+def sync(
+    registries: Iterable[str], *, full: bool, page_size: int
+) -> list[dict[str, Any]]:
+    """Pull rows updated since the last sync into the mirror of the current instance.
+
+    Rows are requested in `updated_at` order and stored page by page together
+    with the watermark, so an interrupted sync resumes where it stopped. A sync
+    requests the rows updated at the watermark again: rows of the same bulk
+    update can be split across pages, and rows committed later can share the
+    timestamp. Storing them again is idempotent. Rows deleted on the instance stay
+    in the mirror until a `full` sync.
+    """
+    from lamin_cli.hub._client import module_model_path
+    from lamin_cli.hub._query import _iter_rows
+    from lamin_cli.hub._schema.utils import IndexedSchema, load_schema
+    from lamin_cli.hub._utils import _query_params
+
+    schema = load_schema(refresh=False)
+    if isinstance(schema, IndexedSchema):
+        schema = schema.to_dict()
+    reports = []
+    with closing(current_mirror(create=True)) as mirror:
+        mirror.set_schema(schema)
+        for registry in _sync_targets(schema, registries):
+            start = time.perf_counter()
+            if full:
+                mirror.reset(registry)
+            watermark = mirror.watermark(registry)
+            body: dict[str, Any] = {"order_by": [{"field": "updated_at"}]}
+            if watermark is not None:
+                body["filter"] = {"updated_at": {"gte": watermark}}
+            rows = _iter_rows(
+                module_model_path(*registry.split(".", 1)),
+                _query_params(limit_to_many=0, include_foreign_keys=True),
+                body,
+                page_size=page_size,
+            )
+            n_rows = 0
+            page: list[dict[str, Any]] = []
+            for row in rows:
+                page.append(row)
+                if len(page) == page_size:
+                    mirror.upsert(registry, page)
+                    n_rows += len(page)
+                    page = []
+            mirror.upsert(registry, page)
+            n_rows += len(page)
+            reports.append(
+                {
+                    "registry": registry,
+                    "synced_rows": n_rows,
+                    "rows": mirror.count(registry),
+                    "seconds": round(time.perf_counter() - start, 3),
+                }
+            )
+    return reports
+
+
+@click.group()
+def mirror():
+    """Mirror instance metadata into a local SQLite file for offline reads.
+
+    Pass `lamin --offline` or set `LAMIN_OFFLINE=1` to answer `describe`, `get`,
+    `list`, and `hub list|get|statistics|schema` from the mirror.
+    """
+
+
+# fmt: off
+@mirror.command("sync")
+@click.option("--registry", "registries", multiple=True, help="Registry as module.model, or a module for all its registries. Repeat for several. Defaults to core.")
+@click.option("--full", is_flag=True, default=False, help="Drop the mirrored rows and resync from scratch, also removing deleted rows.")
+@click.option("--page-size", type=click.IntRange(min=1), default=1000, show_default=True, help="Rows per request and per transaction.")
+# fmt: on
+def sync_command(registries: tuple[str, ...], full: bool, page_size: int):
+    """Pull rows updated since the last sync into the mirror.
+
+    Rows deleted on the instance aren't detected and stay in the mirror until a
+    sync with `--full`.
+
+    Examples:
+
+    ```
+    lamin mirror sync
+    lamin mirror sync --registry core --registry bionty.gene
+    lamin mirror sync --registry core.artifact --full
+    ```
+    """
+    reports = sync(
+        registries or DEFAULT_SYNC_REGISTRIES, full=full, page_size=page_size
+    )
+    for report in reports:
+        click.echo(
+            f"{report['registry']}: {report['synced_rows']} rows synced,"
+            f" {report['rows']} rows mirrored in {report['seconds']}s"
+        )
+
+
+@mirror.command("status")
+def status_command():
+    """Show mirrored registries, their row counts, and watermarks."""
+    with closing(current_mirror()) as mirror_:
+        click.echo(f"mirror: {mirror_.path}")
+        for entry in mirror_.status():
+            synced_at = time.strftime(
+                "%Y-%m-%d %H:%M:%S", time.localtime(entry["synced_at"])
+            )
+            click.echo(
+                f"{entry['registry']}: {entry['rows']} rows, updated until"
+                f" {entry['updated_at']}, synced {synced_at}"
+            )
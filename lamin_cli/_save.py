@@ -203,6 +203,42 @@ def _save_readme_block(
     logger.important("saved README block")
 
 
+def _resolve_save_targets(
+    project: str | None, space: str | None, branch: str | None
+) -> tuple:
+    """Resolve the project, space and branch records passed by name or uid."""
+    import lamindb as ln
+
+    project_record = None
+    if project is not None:
+        project_record = ln.Project.filter(
+            ln.Q(name=project) | ln.Q(uid=project)
+        ).one_or_none()
+        if project_record is None:
+            raise click.ClickException(
+                f"Project '{project}' not found, either create it with `ln.Project(name='...').save()` or fix typos."
+            )
+    space_record = None
+    if space is not None:
+        space_record = ln.Space.filter(ln.Q(name=space) | ln.Q(uid=space)).one_or_none()
+        if space_record is None:
+            raise click.ClickException(
+                f"Space '{space}' not found, either create it on LaminHub or fix typos."
+            )
+    branch_record = None
+    if branch is not None:
+        branch_record = ln.Branch.filter(
+            ln.Q(name=branch) | ln.Q(uid=branch)
+        ).one_or_none()
+        if branch_record is None:
+            raise click.ClickException(
+                f"Branch '{branch}' not found, either create it with `ln.Branch(name='...').save()` or fix typos."
+            )
+    if branch_record is None:
+        branch_record = ln_setup.settings.branch
+    return project_record, space_record, branch_record
+
+
 def save(
     path: Path | str,
     key: str | None = None,
@@ -259,32 +295,9 @@ def save(
                 plan_tmp_path = f.name
             ppath = Path(plan_tmp_path)
 
-    if project is not None:
-        project_record = ln.Project.filter(
-            ln.Q(name=project) | ln.Q(uid=project)
-        ).one_or_none()
-        if project_record is None:
-            raise click.ClickException(
-                f"Project '{project}' not found, either create it with `ln.Project(name='...').save()` or fix typos."
-            )
-    space_record = None
-    if space is not None:
-        space_record = ln.Space.filter(ln.Q(name=space) | ln.Q(uid=space)).one_or_none()
-        if space_record is None:
-            raise click.ClickException(
-                f"Space '{space}' not found, either create it on LaminHub or fix typos."
-            )
-    branch_record = None
-    if branch is not None:
-        branch_record = ln.Branch.filter(
-            ln.Q(name=branch) | ln.Q(uid=branch)
-        ).one_or_none()
-        if branch_record is None:
-            raise click.ClickException(
-                f"Branch '{branch}' not found, either create it with `ln.Branch(name='...').save()` or fix typos."
-            )
-    if branch_record is None:
-        branch_record = ln_setup.settings.branch
+    project_record, space_record, branch_record = _resolve_save_targets(
+        project, space, branch
+    )
 
     is_cloud_path = not isinstance(ppath, LocalPathClasses)
     if (
@@ -561,3 +574,203 @@ def save(
         raise click.ClickException(
             "Allowed values for '--registry' are: 'artifact', 'transform', 'record'"
         )
+
+
+def has_glob(pattern: str) -> bool:
+    # existing paths like `results[1].csv` are taken literally
+    return any(char in pattern for char in "*?[") and not Path(pattern).exists()
+
+
+def expand_paths(patterns: tuple[str, ...] | list[str]) -> list[tuple[str, str]]:
+    """Expand paths and glob patterns into `(path, relative key)` pairs.
+
+    Glob matches are keyed by their path below the pattern's base directory,
+    plain paths by their name. Glob patterns only match files. Paths that
+    exist are never expanded, even if they contain glob characters.
+    """
+    entries = []
+    for pattern in patterns:
+        if not has_glob(pattern):
+            entries.append((pattern, Path(pattern).name))
+            continue
+        parts = Path(pattern).parts
+        n_static = next(
+            i for i in range(len(parts)) if has_glob(str(Path(*parts[: i + 1])))
+        )
+        root = Path(*parts[:n_static]) if n_static > 0 else Path()
+        matches = sorted(
+            match
+            for match in root.glob(Path(*parts[n_static:]).as_posix())
+            if match.is_file()
+        )
+        if not matches:
+            raise click.BadParameter(f"No files match '{pattern}'", param_hint="path")
+        entries += [
+            (match.as_posix(), match.relative_to(root).as_posix()) for match in matches
+        ]
+    return entries
+
+
+def read_manifest(manifest: Path | str) -> list[dict[str, str | None]]:
+    """Read a manifest of `path`, `key`, `description` from TSV or JSONL.
+
+    Relative paths are resolved against the manifest's directory.
+    """
+    import csv
+    import json
+
+    manifest = Path(manifest)
+    if manifest.suffix in {".jsonl", ".ndjson"}:
+        with manifest.open() as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        with manifest.open(newline="") as f:
+            rows = list(csv.DictReader(f, delimiter="\t"))
+    entries = []
+    for i, row in enumerate(rows, start=1):
+        if not row.get("path"):
+            raise click.BadParameter(f"Row {i} has no 'path'", param_hint="--manifest")
+        path = row["path"]
+        if "://" not in path and not Path(path).is_absolute():
+            path = (manifest.parent / path).as_posix()
+        entries.append(
+            {
+                "path": path,
+                "key": row.get("key") or None,
+                "description": row.get("description") or None,
+            }
+        )
+    return entries
+
+
+def save_many(
+    entries: list[dict[str, str | None]],
+    kind: str | None = None,
+    project: str | None = None,
+    space: str | None = None,
+    branch: str | None = None,
+    max_workers: int = 8,
+    summary: Path | str | None = None,
+) -> str | None:
+    """Save many files as artifacts in one process.
+
+    Shared records are resolved once, artifacts are constructed (and hence hashed)
+    on a thread pool, and new artifacts are written in bulk via `ln.save()` in
+    chunks. For Postgres instances chunks are saved, i.e., uploaded, concurrently.
+
+    Args:
+        entries: Dictionaries with `path`, `key` and `description`.
+        kind: The artifact kind for all files.
+        project: A project name or uid to label all artifacts with.
+        space: A space name or uid.
+        branch: A branch name or uid.
+        max_workers: The number of threads for hashing and uploading.
+        summary: Write a JSON summary with one result per file to this path,
+            `"-"` writes it to stdout.
+    """
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+
+    import lamindb as ln
+
+    current_run = None
+    if get_current_run_file().exists():
+        current_run = ln.Run.get(uid=get_current_run_file().read_text().strip())
+    project_record, space_record, branch_record = _resolve_save_targets(
+        project, space, branch
+    )
+    ln.settings.creation.artifact_silence_missing_run_warning = True
+
+    results = [
+        {
+            "path": entry["path"],
+            "key": entry["key"],
+            "status": None,
+            "uid": None,
+            "error": None,
+        }
+        for entry in entries
+    ]
+
+    def build(i: int):
+        entry = entries[i]
+        if entry["key"] is None and entry["description"] is None:
+            results[i]["status"] = "failed"
+            results[i]["error"] = "missing-key-or-description"
+            return None
+        try:
+            return ln.Artifact(
+                entry["path"],
+                key=entry["key"],
+                description=entry["description"],
+                kind=kind,
+                branch=branch_record,
+                space=space_record,
+                run=current_run,
+            )
+        except Exception as e:
+            results[i]["status"] = "failed"
+            results[i]["error"] = str(e)
+            return None
+
+    def save_chunk(chunk: list[int]) -> None:
+        try:
+            ln.save([artifacts[i] for i in chunk])
+        except Exception:
+            # attribute the failure to individual files
+            for i in chunk:
+                if not artifacts[i]._state.adding:
+                    continue
+                try:
+                    artifacts[i].save()
+                except Exception as e:
+                    results[i]["status"] = "failed"
+                    results[i]["error"] = str(e)
+        for i in chunk:
+            if results[i]["status"] is None:
+                results[i]["status"] = "saved"
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        artifacts = list(executor.map(build, range(len(entries))))
+        new = []
+        for i, artifact in enumerate(artifacts):
+            if artifact is None:
+                continue
+            results[i]["uid"] = artifact.uid
+            if artifact._state.adding:
+                new.append(i)
+            else:
+                results[i]["status"] = "existing"
+        # sqlite serializes writes, concurrent chunks would only contend for the lock
+        n_chunks = 1 if ln_setup.settings.instance.dialect == "sqlite" else max_workers
+        chunk_size = max(1, -(-len(new) // n_chunks))
+        chunks = [new[i : i + chunk_size] for i in range(0, len(new), chunk_size)]
+        list(executor.map(save_chunk, chunks))
+
+    if project_record is not None:
+        labeled = [
+            artifacts[i]
+            for i, result in enumerate(results)
+            if result["status"] in {"saved", "existing"}
+        ]
+        project_record.artifacts.add(*labeled)
+        logger.important(f"labeled with project: {project_record.name}")
+
+    counts = {
+        status: sum(result["status"] == status for result in results)
+        for status in ("saved", "existing", "failed")
+    }
+    for result in results:
+        if result["status"] == "failed":
+            logger.error(f"could not save {result['path']}: {result['error']}")
+    logger.important(
+        f"saved {counts['saved']} artifacts, {counts['existing']} already existed,"
+        f" {counts['failed']} failed"
+    )
+    if summary is not None:
+        content = json.dumps({**counts, "files": results}, indent=2)
+        if str(summary) == "-":
+            click.echo(content)
+        else:
+            Path(summary).write_text(content)
+    return "batch-save-failed" if counts["failed"] else None
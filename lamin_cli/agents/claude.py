@@ -1,16 +1,25 @@
 from __future__ import annotations
 
+import contextlib
+import functools
+import gzip
 import html
 import json
 import os
 import re
-import tempfile
+import sys
 import traceback
+import urllib.parse
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 import click
 
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+    from typing import BinaryIO, TextIO
+
 # --- constants ---
 
 _CLAUDE_DIR = Path(".claude")
@@ -18,6 +27,10 @@ _TRANSFORM_KEY = "__claudecode__"
 _TRANSFORM_UID = "SnfuhjObaAKR0000"
 _SKILL_MARKER = "Base directory for this skill:"
 _BLOCK_TRUNCATE = 4000
+# paged reports only inline the beginning of a step and load the rest on click
+_SUMMARY_TRUNCATE = 300
+# the longest expiration of presigned S3 URLs
+_SIGNED_URL_EXPIRATION = 7 * 24 * 3600
 
 _SUFFIX_TO_KIND: dict[str, str] = {
     ".ipynb": "notebook",
@@ -61,63 +74,110 @@ details[open] summary::before{{content:'▼ '}}
 <body><ul>
 {steps}
 </ul></body></html>"""
+# steps are streamed between the head and the tail of the template
+_HTML_HEAD, _HTML_TAIL = _HTML_TEMPLATE.format(steps="\x00").split("\x00")
+
+# Loads the full body of a step of a paged report when it's clicked. Storage
+# buckets are private, so bodies are only fetched from the signed URL in the
+# `bodies` fragment parameter that `lamin track claude --report-url` appends to
+# the report URL; otherwise the report names the artifact that holds them. A
+# fragment, unlike a query parameter, leaves the signature of the report valid.
+_BODIES_LOADER = """\
+<style>body.bodies li.more>.bd::after{content:'Show all';display:block;color:#2472c8;font-size:.8rem;cursor:pointer}.note{color:#888;font-size:.8rem}</style>
+<script>
+const BODIES = __BODIES__;
+const BODIES_URL = new URLSearchParams(location.hash.slice(1)).get("bodies");
+if (BODIES_URL) document.body.classList.add("bodies");
+else document.body.insertAdjacentHTML("beforeend",
+  `<p class="note">Untruncated steps are saved in artifact ${BODIES.uid}; ` +
+  "<code>lamin track claude --report-url</code> prints a link that loads them.</p>");
+document.addEventListener("click", async (event) => {
+  const step = event.target.closest("li.more");
+  if (!step || !BODIES_URL) return;
+  const [start, length] = step.dataset.body.split(":").map(Number);
+  const range = `bytes=${start}-${start + length - 1}`;
+  const response = await fetch(BODIES_URL, {headers: {Range: range}});
+  if (!response.ok) {
+    step.classList.remove("more");
+    step.insertAdjacentHTML("beforeend",
+      `<p class="note">Could not load the untruncated step (${response.status}).</p>`);
+    return;
+  }
+  let data = await response.arrayBuffer();
+  // servers that ignore the range send the whole file
+  if (response.status !== 206) data = data.slice(start, start + length);
+  const body = new Blob([data]).stream().pipeThrough(new DecompressionStream("gzip"));
+  step.outerHTML = JSON.parse(await new Response(body).text()).html;
+});
+</script>
+"""
 
 _ANSI_SGR = re.compile(r"\x1b\[([0-9;]*)m")
 _ANSI_BASE_COLORS = ["#000","#cd3131","#0dbc79","#e5e510","#2472c8","#bc3fbc","#11a8cd","#e5e5e5"]
 _ANSI_BRIGHT_COLORS = ["#666","#f14c4c","#23d18b","#f5f543","#3b8eea","#d670d6","#29b8db","#fff"]
 
 
+# style state: (foreground, background, bold)
+_AnsiStyle = tuple[str | None, str | None, bool]
+_ANSI_RESET: _AnsiStyle = (None, None, False)
+
+
+@functools.cache
+def _ansi_span(style: _AnsiStyle) -> str:
+    """Opening span tag of a style, empty for the default style."""
+    fg, bg, bold = style
+    parts = []
+    if fg:
+        parts.append(f"color:{fg}")
+    if bg:
+        parts.append(f"background:{bg}")
+    if bold:
+        parts.append("font-weight:700")
+    return f'<span style="{";".join(parts)}">' if parts else ""
+
+
+@functools.lru_cache(maxsize=4096)
+def _ansi_transition(style: _AnsiStyle, params: str) -> tuple[_AnsiStyle, str]:
+    """Apply the parameters of an SGR sequence to a style.
+
+    Returns the new style and the tags that replace the sequence.
+    """
+    fg, bg, bold = style
+    codes = [int(c) for c in params.split(";") if c] if params else [0]
+    for c in codes:
+        if c == 0:
+            fg, bg, bold = _ANSI_RESET
+        elif c == 1:
+            bold = True
+        elif 30 <= c <= 37:
+            fg = _ANSI_BASE_COLORS[c - 30]
+        elif 90 <= c <= 97:
+            fg = _ANSI_BRIGHT_COLORS[c - 90]
+        elif 40 <= c <= 47:
+            bg = _ANSI_BASE_COLORS[c - 40]
+        elif c == 39:
+            fg = None
+        elif c == 49:
+            bg = None
+    new_style = (fg, bg, bold)
+    close = "</span>" if _ansi_span(style) else ""
+    return new_style, close + _ansi_span(new_style)
+
+
 def _ansi_to_html(text: str) -> str:
     """Convert ANSI SGR color codes to HTML spans; HTML-escape all other text."""
-    result: list[str] = []
-    style: dict[str, str] = {}
-    span_open = False
-    cursor = 0
-
-    def css(s: dict[str, str]) -> str:
-        parts = []
-        if "fg" in s:
-            parts.append(f"color:{s['fg']}")
-        if "bg" in s:
-            parts.append(f"background:{s['bg']}")
-        if s.get("bold"):
-            parts.append("font-weight:700")
-        return ";".join(parts)
-
-    for m in _ANSI_SGR.finditer(text):
-        result.append(html.escape(text[cursor:m.start()]))
-        cursor = m.end()
-        codes = [int(c) for c in m.group(1).split(";") if c] if m.group(1) else [0]
-        i = 0
-        while i < len(codes):
-            c = codes[i]
-            if c == 0:
-                style = {}
-            elif c == 1:
-                style["bold"] = "1"
-            elif 30 <= c <= 37:
-                style["fg"] = _ANSI_BASE_COLORS[c - 30]
-            elif 90 <= c <= 97:
-                style["fg"] = _ANSI_BRIGHT_COLORS[c - 90]
-            elif 40 <= c <= 47:
-                style["bg"] = _ANSI_BASE_COLORS[c - 40]
-            elif c == 39:
-                style.pop("fg", None)
-            elif c == 49:
-                style.pop("bg", None)
-            i += 1
-        new_css = css(style)
-        if span_open:
-            result.append("</span>")
-            span_open = False
-        if new_css:
-            result.append(f'<span style="{new_css}">')
-            span_open = True
-
-    result.append(html.escape(text[cursor:]))
-    if span_open:
-        result.append("</span>")
-    return "".join(result)
+    # escaping leaves the escape sequences intact, so the text is escaped at once
+    escaped = html.escape(text)
+    if "\x1b" not in text:
+        return escaped
+    # the text between sequences alternates with the parameters of a sequence
+    parts = _ANSI_SGR.split(escaped)
+    style = _ANSI_RESET
+    for i in range(1, len(parts), 2):
+        style, parts[i] = _ansi_transition(style, parts[i])
+    if _ansi_span(style):
+        parts.append("</span>")
+    return "".join(parts)
 
 
 # --- output helpers ---
@@ -146,6 +206,62 @@ def _transcript_path_file() -> Path:
     return _CLAUDE_DIR / f".lamindb_transcript_path_{_session_id()}"
 
 
+def _checkpoint_file() -> Path:
+    return _CLAUDE_DIR / f".lamindb_checkpoint_{_session_id()}.json"
+
+
+def _lock_file() -> Path:
+    return _CLAUDE_DIR / f".lamindb_checkpoint_{_session_id()}.lock"
+
+
+@contextlib.contextmanager
+def _report_lock():
+    """Serialize report updates of concurrent checkpoint and finish hooks.
+
+    The checkpoint file itself is replaced on every update, so the lock is held
+    on a separate file that stays in place.
+    """
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        yield
+        return
+    with _lock_file().open("a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _report_file() -> Path:
+    return _CLAUDE_DIR / f".lamindb_report_{_session_id()}.html"
+
+
+def _bodies_file() -> Path:
+    return _CLAUDE_DIR / f".lamindb_report_bodies_{_session_id()}.jsonl.gz"
+
+
+def _report_format_file() -> Path:
+    return _CLAUDE_DIR / f".lamindb_report_format_{_session_id()}"
+
+
+def _report_format() -> str:
+    path = _report_format_file()
+    return path.read_text().strip() if path.exists() else "inline"
+
+
+def _remove_report_files() -> None:
+    for path in (
+        _checkpoint_file(),
+        _report_file(),
+        _bodies_file(),
+        _report_format_file(),
+        _lock_file(),
+    ):
+        path.unlink(missing_ok=True)
+
+
 def _get_transcript_path() -> Path:
     session_id = os.environ.get("CLAUDE_CODE_SESSION_ID", "")
     projects_dir = Path.home() / ".claude" / "projects"
@@ -173,7 +289,9 @@ def _instance_connected(ln: object) -> bool:
 # --- session start ---
 
 
-def track_claudecode_session(name: str | None = None) -> None:
+def track_claudecode_session(
+    name: str | None = None, report_format: str = "inline"
+) -> None:
     try:
         import lamindb as ln
     except Exception as e:
@@ -201,6 +319,7 @@ def track_claudecode_session(name: str | None = None) -> None:
         _CLAUDE_DIR.mkdir(exist_ok=True)
         _run_uid_file().write_text(run.uid)
         _transcript_path_file().write_text(str(_get_transcript_path()))
+        _report_format_file().write_text(report_format)
         _info(f"started tracking Claude Code session: {run.uid}")
     except Exception as e:
         _warn(f"lamindb session tracking failed, continuing without tracking: {e}")
@@ -231,51 +350,75 @@ def _is_bookkeeping_bash_cmd(cmd: str) -> bool:
     )
 
 
-def _parse_transcript(transcript_path: Path) -> list[dict]:
-    entries: list[dict] = []
-    with transcript_path.open() as f:
+def _iter_transcript_lines(
+    transcript_path: Path, offset: int = 0, *, final: bool = True
+) -> Iterator[tuple[bytes, int]]:
+    """Yield the lines of a transcript after byte `offset`, with the offset after each.
+
+    Unless `final`, a last line without newline is left out, because the agent is
+    still writing it.
+    """
+    with transcript_path.open("rb") as f:
+        f.seek(offset)
         for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                entry = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-            msg = entry.get("message")
-            if msg and msg.get("role") in ("user", "assistant"):
-                entries.append(msg)
-    return entries
+            if not final and not line.endswith(b"\n"):
+                return
+            offset += len(line)
+            yield line, offset
+
+
+def _transcript_message(line: bytes) -> dict | None:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        entry = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    msg = entry.get("message")
+    if msg and msg.get("role") in ("user", "assistant"):
+        return msg
+    return None
+
+
+def _iter_transcript(transcript_path: Path) -> Iterator[dict]:
+    """Yield the user and assistant messages of a transcript, line by line."""
+    for line, _ in _iter_transcript_lines(transcript_path):
+        msg = _transcript_message(line)
+        if msg is not None:
+            yield msg
 
 
 # --- HTML rendering ---
 
 
-def _render_thinking(thinking: str) -> str:
+def _render_thinking(thinking: str, limit: int | None = _BLOCK_TRUNCATE) -> str:
     return (
         '<li class="step"><div class="dot dy"></div><div class="bd">'
         f'<details><summary>Thinking</summary>'
-        f'<div class="thk">{html.escape(thinking[:_BLOCK_TRUNCATE])}</div>'
+        f'<div class="thk">{html.escape(thinking[:limit])}</div>'
         "</details></div></li>"
     )
 
 
-def _render_text(text: str) -> str:
+def _render_text(text: str, limit: int | None = _BLOCK_TRUNCATE) -> str:
     return (
         '<li class="step"><div class="dot dg"></div>'
-        f'<div class="bd"><div class="tx">{_ansi_to_html(text[:_BLOCK_TRUNCATE])}</div></div></li>'
+        f'<div class="bd"><div class="tx">{_ansi_to_html(text[:limit])}</div></div></li>'
     )
 
 
-def _render_user_text(text: str) -> str:
+def _render_user_text(text: str, limit: int | None = _BLOCK_TRUNCATE) -> str:
     return (
         '<li class="step"><div class="dot db"></div>'
         '<div class="bd"><div class="user-msg"><div class="tt">User</div>'
-        f'<div class="tx">{_ansi_to_html(text[:_BLOCK_TRUNCATE])}</div></div></div></li>'
+        f'<div class="tx">{_ansi_to_html(text[:limit])}</div></div></div></li>'
     )
 
 
-def _render_tool(tool_use: dict, tool_result: dict | None) -> str:
+def _render_tool(
+    tool_use: dict, tool_result: dict | None, limit: int | None = _BLOCK_TRUNCATE
+) -> str:
     name = tool_use.get("name", "tool")
     inp = tool_use.get("input", {})
 
@@ -292,14 +435,14 @@ def _render_tool(tool_use: dict, tool_result: dict | None) -> str:
             )
             out_html = (
                 '<div class="iotag">OUT</div>'
-                f'<div class="iopre">{_ansi_to_html(out[:_BLOCK_TRUNCATE])}</div>'
+                f'<div class="iopre">{_ansi_to_html(out[:limit])}</div>'
             )
         return (
             '<li class="step"><div class="dot dg"></div><div class="bd">'
             f'<div class="tt">Bash<span class="lb">{html.escape(label)}</span></div>'
             '<div class="io">'
             '<div class="iotag">IN</div>'
-            f'<div class="iopre">{html.escape(cmd[:_BLOCK_TRUNCATE])}</div>'
+            f'<div class="iopre">{html.escape(cmd[:limit])}</div>'
             f"{out_html}"
             "</div></div></li>"
         )
@@ -307,7 +450,7 @@ def _render_tool(tool_use: dict, tool_result: dict | None) -> str:
     if name == "TodoWrite":
         todos = inp.get("todos", [])
         items = []
-        for todo in todos[:30]:
+        for todo in todos[:30] if limit is not None else todos:
             done = todo.get("status") == "completed"
             check = "☑" if done else "☐"
             cls = "todo done" if done else "todo"
@@ -330,126 +473,345 @@ def _render_tool(tool_use: dict, tool_result: dict | None) -> str:
     )
 
 
-def _render_transcript_html(entries: list[dict]) -> str:
-    filtered = [
-        msg
-        for msg in entries
-        if not _content_has_marker(msg.get("content"), _SKILL_MARKER)
-    ]
-
-    bookkeeping_ids: set[str] = {
-        block.get("id", "")
-        for msg in filtered
-        for block in (msg.get("content") or [])
-        if isinstance(block, dict)
-        and block.get("type") == "tool_use"
-        and block.get("name") == "Bash"
-        and _is_bookkeeping_bash_cmd(block.get("input", {}).get("command", ""))
-    }
-
-    tool_use_map: dict[str, dict] = {
-        block.get("id", ""): block
-        for msg in filtered
-        for block in (msg.get("content") or [])
-        if isinstance(block, dict) and block.get("type") == "tool_use" and block.get("id")
-    }
-
-    paired_ids: set[str] = set()
-    steps: list[str] = []
-
-    for msg in filtered:
+# a tag, a character reference, or a run of text
+_HTML_TOKEN = re.compile(
+    r"<(/?)([a-zA-Z][a-zA-Z0-9]*)[^>]*>|&[#a-zA-Z0-9]+;|[^<&]+|[<&]"
+)
+
+
+def _truncate_html(markup: str, limit: int) -> str:
+    """Cut `markup` after `limit` characters of text and close the open elements."""
+    parts: list[str] = []
+    open_tags: list[str] = []
+    n_chars = 0
+    for match in _HTML_TOKEN.finditer(markup):
+        token, closing, tag = match.group(0), match.group(1), match.group(2)
+        if tag:
+            if closing:
+                if open_tags:
+                    open_tags.pop()
+            else:
+                open_tags.append(tag)
+            parts.append(token)
+            continue
+        n_token = 1 if token.startswith("&") else len(token)
+        if n_chars + n_token > limit:
+            if not token.startswith("&"):
+                parts.append(token[: limit - n_chars])
+            parts.extend(f"</{tag}>" for tag in reversed(open_tags))
+            return "".join(parts)
+        n_chars += n_token
+        parts.append(token)
+    return markup
+
+
+class _TranscriptRenderer:
+    """Render transcript messages into an HTML report in a single pass.
+
+    Steps are written to `out` as messages are fed. A tool_use is held back only
+    until its tool_result arrives, so memory is bounded by the tool calls in
+    flight rather than by the length of the session.
+
+    A renderer created from the `state` of another continues its report.
+
+    Given a `bodies` file, each step is rendered once in full and only a short
+    summary goes into the report, and the full HTML of truncated steps is appended to `bodies`. Each body is a separate gzip member holding
+    one JSON line, so the file as a whole is gzipped JSONL, and the step records
+    its byte range in the file so that the report can fetch it on demand.
+    """
+
+    def __init__(
+        self, out: TextIO, state: dict | None = None, bodies: BinaryIO | None = None
+    ):
+        self._out = out
+        self._bodies = bodies
+        if state is None:
+            state = {"pending": {}, "bookkeeping_ids": [], "n_steps": 0}
+            state["script_paths"] = []
+            out.write(_HTML_HEAD)
+        self._pending: dict[str, dict] = state["pending"]
+        self._bookkeeping_ids: set[str] = set(state["bookkeeping_ids"])
+        self._n_steps: int = state["n_steps"]
+        self.script_paths = [Path(p) for p in state["script_paths"]]
+        self._seen_paths = {str(p) for p in self.script_paths}
+
+    def state(self) -> dict:
+        """JSON-serializable state to continue the report later."""
+        return {
+            "pending": self._pending,
+            "bookkeeping_ids": sorted(self._bookkeeping_ids),
+            "n_steps": self._n_steps,
+            "script_paths": [str(p) for p in self.script_paths],
+        }
+
+    def _write(self, step: str, full: str | None = None) -> None:
+        if full is not None and full != step:
+            data = gzip.compress(json.dumps({"html": full}).encode() + b"\n", mtime=0)
+            offset = self._bodies.tell()
+            self._bodies.write(data)
+            step = step.replace(
+                '<li class="step"',
+                f'<li class="step more" data-body="{offset}:{len(data)}"',
+                1,
+            )
+        if self._n_steps:
+            self._out.write("\n")
+        self._out.write(step)
+        self._n_steps += 1
+
+    def _step(self, render: Callable[..., str], *args: Any) -> None:
+        if self._bodies is None:
+            self._write(render(*args))
+        else:
+            full = render(*args, limit=None)
+            self._write(_truncate_html(full, _SUMMARY_TRUNCATE), full)
+
+    def _collect_script_path(self, block: dict) -> None:
+        if block.get("name") not in _SCRIPT_TOOL_NAMES:
+            return
+        inp = block.get("input", {})
+        file_path = next((inp.get(k) for k in _SCRIPT_PATH_KEYS if inp.get(k)), None)
+        if not isinstance(file_path, str):
+            return
+        p = Path(file_path)
+        if p.suffix in _SUFFIX_TO_KIND and str(p) not in self._seen_paths:
+            self._seen_paths.add(str(p))
+            self.script_paths.append(p)
+
+    def feed(self, msg: dict) -> None:
         role = msg.get("role", "")
         content = msg.get("content")
+        if isinstance(content, list):
+            # skill messages are hidden from the report, but still write scripts
+            for block in content:
+                if block.get("type") == "tool_use":
+                    self._collect_script_path(block)
+        if _content_has_marker(content, _SKILL_MARKER):
+            return
         if isinstance(content, str):
             content = [{"type": "text", "text": content}]
         if not isinstance(content, list):
-            continue
+            return
         for block in content:
             btype = block.get("type")
             if btype == "tool_use":
-                continue  # rendered when paired tool_result is seen
-            if btype == "tool_result":
+                use_id = block.get("id")
+                if not use_id:
+                    continue
+                if block.get("name") == "Bash" and _is_bookkeeping_bash_cmd(
+                    block.get("input", {}).get("command", "")
+                ):
+                    self._bookkeeping_ids.add(use_id)
+                else:
+                    # rendered when the paired tool_result is seen
+                    self._pending[use_id] = block
+            elif btype == "tool_result":
                 use_id = block.get("tool_use_id", "")
-                if use_id in bookkeeping_ids:
+                if use_id in self._bookkeeping_ids:
                     continue
-                tool_use = tool_use_map.get(use_id, {})
-                paired_ids.add(use_id)
-                steps.append(_render_tool(tool_use, block))
+                self._step(_render_tool, self._pending.pop(use_id, {}), block)
             elif btype == "thinking" and role == "assistant":
                 thinking = block.get("thinking", "").strip()
                 if thinking:
-                    steps.append(_render_thinking(thinking))
+                    self._step(_render_thinking, thinking)
             elif btype == "text" and role == "assistant":
                 text = block.get("text", "").strip()
                 if text:
-                    steps.append(_render_text(text))
+                    self._step(_render_text, text)
             elif btype == "text" and role == "user":
                 text = block.get("text", "").strip()
                 if text:
-                    steps.append(_render_user_text(text))
-
-    # render any tool_use blocks that never got a result (session interrupted)
-    for uid, tool_use in tool_use_map.items():
-        if uid not in paired_ids and uid not in bookkeeping_ids:
-            steps.append(_render_tool(tool_use, None))
-
-    return _HTML_TEMPLATE.format(steps="\n".join(steps))
+                    self._step(_render_user_text, text)
+
+    def flush_pending(self) -> None:
+        # render any tool_use blocks that never got a result (session interrupted)
+        for tool_use in self._pending.values():
+            self._step(_render_tool, tool_use, None)
+        self._pending.clear()
+
+    def write_tail(self, bodies_ref: dict | None = None) -> None:
+        """End the report; `bodies_ref` locates the bodies for the loader."""
+        if bodies_ref is None:
+            self._out.write(_HTML_TAIL)
+            return
+        # "</" can't occur in a script element
+        ref = json.dumps(bodies_ref).replace("</", "<\\/")
+        loader = _BODIES_LOADER.replace("__BODIES__", ref)
+        self._out.write(_HTML_TAIL.replace("</body>", loader + "</body>"))
+
+    def close(self) -> None:
+        self.flush_pending()
+        self.write_tail()
+
+
+def _update_report(
+    transcript_path: Path,
+    *,
+    final: bool = False,
+    save_bodies: Callable[[Path], dict] | None = None,
+) -> list[Path]:
+    """Append the steps of the transcript lines added since the last checkpoint.
+
+    The partial report, the step bodies of a paged report, and the checkpoint
+    with the transcript offset and the renderer state live next to the run UID
+    file. With `final`, the report is completed and no new checkpoint is
+    written; `save_bodies` then saves the bodies of a paged report and returns
+    the reference its loader uses. Callers hold `_report_lock()`.
+
+    Returns the script paths written during the session so far.
+    """
+    checkpoint_file = _checkpoint_file()
+    report_file = _report_file()
+    bodies_file = _bodies_file() if _report_format() == "paged" else None
+    checkpoint = None
+    if checkpoint_file.exists() and report_file.exists():
+        checkpoint = json.loads(checkpoint_file.read_text())
+        # a transcript that shrank was replaced, start over
+        if checkpoint["transcript_offset"] > transcript_path.stat().st_size:
+            checkpoint = None
+        if bodies_file is not None and not bodies_file.exists():
+            checkpoint = None
+    if checkpoint is not None:
+        # drop steps written after the checkpoint by an interrupted update
+        os.truncate(report_file, checkpoint["report_size"])
+        if bodies_file is not None:
+            os.truncate(bodies_file, checkpoint["bodies_size"])
+    offset = checkpoint["transcript_offset"] if checkpoint else 0
+    mode = "a" if checkpoint else "w"
+
+    with contextlib.ExitStack() as stack:
+        out = stack.enter_context(report_file.open(mode, encoding="utf-8"))
+        bodies = None
+        if bodies_file is not None:
+            bodies = stack.enter_context(bodies_file.open(f"{mode}b"))
+        renderer = _TranscriptRenderer(
+            out, state=checkpoint["renderer"] if checkpoint else None, bodies=bodies
+        )
+        lines = _iter_transcript_lines(transcript_path, offset, final=final)
+        for line, end in lines:
+            offset = end
+            msg = _transcript_message(line)
+            if msg is not None:
+                renderer.feed(msg)
+        if final:
+            renderer.flush_pending()
+            bodies_ref = None
+            if bodies is not None:
+                bodies.close()
+                bodies_ref = save_bodies(bodies_file) if save_bodies else {}
+            renderer.write_tail(bodies_ref)
+
+    if not final:
+        tmp_path = checkpoint_file.with_suffix(".json.tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    "transcript_offset": offset,
+                    "report_size": report_file.stat().st_size,
+                    "bodies_size": bodies_file.stat().st_size if bodies_file else 0,
+                    "renderer": renderer.state(),
+                }
+            )
+        )
+        tmp_path.replace(checkpoint_file)
+    return renderer.script_paths
 
 
 # --- transform stamping ---
 
 
-def _extract_written_script_paths(entries: list[dict]) -> list[Path]:
-    paths: list[Path] = []
-    seen: set[str] = set()
-    for msg in entries:
-        content = msg.get("content")
-        if not isinstance(content, list):
-            continue
-        for block in content:
-            if (
-                block.get("type") != "tool_use"
-                or block.get("name") not in _SCRIPT_TOOL_NAMES
-            ):
-                continue
-            inp = block.get("input", {})
-            file_path = next(
-                (inp.get(k) for k in _SCRIPT_PATH_KEYS if inp.get(k)), None
-            )
-            if not isinstance(file_path, str):
-                continue
-            p = Path(file_path)
-            if p.suffix not in _SUFFIX_TO_KIND:
-                continue
-            key = str(p)
-            if key not in seen:
-                seen.add(key)
-                paths.append(p)
-    return paths
-
-
-def _stamp_transforms(run: object, entries: list[dict], ln: object) -> None:
+def _stamp_transforms(run: object, script_paths: list[Path], ln: object) -> None:
     # Primary path: scripts run with LAMIN_INITIATED_BY_RUN_UID create child runs
-    already_stamped: set[str] = set()
-    for child_run in run.initiated_runs.all():  # type: ignore[attr-defined]
-        t = child_run.transform
-        already_stamped.add(t.key)
-        if t.run_id is None:
-            t.run = run
-            t.save()
-
-    for path in _extract_written_script_paths(entries):
-        if not path.exists() or path.name in already_stamped:
-            continue
-        kind = _SUFFIX_TO_KIND[path.suffix]
-        transform = ln.Transform.filter(key=path.name).one_or_none()  # type: ignore[attr-defined]
+    child_transforms = list(
+        ln.Transform.objects.filter(runs__initiated_by_run=run).distinct()  # type: ignore[attr-defined]
+    )
+    already_stamped = {t.key for t in child_transforms}
+    unstamped = [t for t in child_transforms if t.run_id is None]
+
+    kinds: dict[str, str] = {}
+    for path in script_paths:
+        if path.exists() and path.name not in already_stamped:
+            kinds.setdefault(path.name, _SUFFIX_TO_KIND[path.suffix])
+    existing: dict[str, object] = {}
+    if kinds:
+        # one query for all keys; of several versions, the latest is stamped
+        transforms = ln.Transform.filter(  # type: ignore[attr-defined]
+            key__in=list(kinds), is_latest=True
+        ).order_by("-created_at")
+        for transform in transforms:
+            existing.setdefault(transform.key, transform)
+
+    new_transforms = []
+    registered = []
+    for key, kind in kinds.items():
+        transform = existing.get(key)
         if transform is None:
-            transform = ln.Transform(key=path.name, kind=kind)  # type: ignore[attr-defined]
-            transform.save()
-        if transform.run_id is None:
+            transform = ln.Transform(key=key, kind=kind)  # type: ignore[attr-defined]
+        if transform.run_id is not None:
+            continue
+        registered.append(key)
+        if transform._state.adding:
             transform.run = run
-            transform.save()
-            _info(f"registered transform: {path.name}")
+            new_transforms.append(transform)
+        else:
+            unstamped.append(transform)
+
+    if new_transforms:
+        ln.save(new_transforms)  # type: ignore[attr-defined]
+    if unstamped:
+        ln.Transform.objects.filter(pk__in=[t.pk for t in unstamped]).update(run=run)  # type: ignore[attr-defined]
+    for key in registered:
+        _info(f"registered transform: {key}")
+
+
+# --- session checkpoint ---
+
+
+def _session_transcript_path() -> Path:
+    transcript_path = Path(_transcript_path_file().read_text().strip())
+    # The path stored at session start can be stale if it was derived from a
+    # cwd that differs from Claude Code's launch dir; re-resolve as a fallback.
+    if not transcript_path.exists():
+        transcript_path = _get_transcript_path()
+    return transcript_path
+
+
+def _read_hook_session_id() -> None:
+    """Take the session ID from the JSON input of a hook if the env lacks it."""
+    if "CLAUDE_CODE_SESSION_ID" in os.environ or sys.stdin is None:
+        return
+    if sys.stdin.isatty():
+        return
+    try:
+        session_id = json.load(sys.stdin).get("session_id")
+    except (ValueError, AttributeError):
+        return
+    if isinstance(session_id, str) and session_id:
+        os.environ["CLAUDE_CODE_SESSION_ID"] = session_id
+
+
+def checkpoint_claudecode_session() -> None:
+    """Render the transcript lines appended since the last checkpoint.
+
+    Doesn't need an instance connection, so that it's cheap to call from hooks.
+    """
+    try:
+        _read_hook_session_id()
+        if not _run_uid_file().exists():
+            _warn("no active Claude Code session found, skipping checkpoint")
+            return
+        transcript_path = _session_transcript_path()
+        if not transcript_path.exists():
+            _warn(f"transcript file not found: {transcript_path}, skipping checkpoint")
+            return
+        with _report_lock():
+            # a finish that held the lock closed the session meanwhile
+            if not _run_uid_file().exists():
+                return
+            _update_report(transcript_path)
+        _info("checkpointed Claude Code session transcript")
+    except Exception as e:
+        _warn(f"session checkpoint failed, continuing: {e}")
 
 
 # --- session finish ---
@@ -467,58 +829,103 @@ def finish_claudecode_session() -> None:
             _warn("no lamindb instance connected, skipping session finish")
             return
 
-        run_uid_file = _run_uid_file()
-        if not run_uid_file.exists():
-            _warn("no active Claude Code session found, skipping session finish")
-            return
-
-        uid = run_uid_file.read_text().strip()
-        run = ln.Run.get(uid=uid)
-        transcript_path = Path(_transcript_path_file().read_text().strip())
+        # a concurrent checkpoint would otherwise append to the uploaded report
+        with _report_lock():
+            run_uid_file = _run_uid_file()
+            if not run_uid_file.exists():
+                _warn("no active Claude Code session found, skipping session finish")
+                return
+
+            uid = run_uid_file.read_text().strip()
+            run = ln.Run.get(uid=uid)
+            transcript_path = _session_transcript_path()
+
+            if not transcript_path.exists():
+                _warn(
+                    f"transcript file not found: {transcript_path} — "
+                    "closing run without report (is CLAUDE_CODE_SESSION_ID set?)"
+                )
+                run._status_code = 0  # completed
+                run.finished_at = datetime.now(timezone.utc)
+                run.save()
+                run_uid_file.unlink()
+                _transcript_path_file().unlink()
+                _remove_report_files()
+                return
+
+            def save_bodies(path: Path) -> dict:
+                bodies = ln.Artifact(
+                    path,
+                    description="Claude Code session transcript (step bodies)",
+                    run=False,
+                ).save()
+                return {"uid": bodies.uid}
+
+            # only the lines appended since the last checkpoint are left to render
+            script_paths = _update_report(
+                transcript_path, final=True, save_bodies=save_bodies
+            )
+            artifact = ln.Artifact(
+                _report_file(),
+                description="Claude Code session transcript (rendered)",
+                run=False,
+            ).save()
 
-        # The path stored at session start can be stale if it was derived from a
-        # cwd that differs from Claude Code's launch dir; re-resolve as a fallback.
-        if not transcript_path.exists():
-            transcript_path = _get_transcript_path()
+            run.report = artifact
+            _stamp_transforms(run, script_paths, ln)
 
-        if not transcript_path.exists():
-            _warn(
-                f"transcript file not found: {transcript_path} — "
-                "closing run without report (is CLAUDE_CODE_SESSION_ID set?)"
-            )
             run._status_code = 0  # completed
             run.finished_at = datetime.now(timezone.utc)
             run.save()
+
             run_uid_file.unlink()
             _transcript_path_file().unlink()
-            return
+            _remove_report_files()
+            _info(f"finished tracking Claude Code session: {run.uid}")
+    except Exception as e:
+        _warn(f"lamindb session finish failed, continuing: {e}")
+        _warn(traceback.format_exc())
 
-        entries = _parse_transcript(transcript_path)
-        html_doc = _render_transcript_html(entries)
 
-        tmp = tempfile.NamedTemporaryFile(mode="w", suffix=".html", delete=False)
-        tmp_path = Path(tmp.name)
-        try:
-            tmp.write(html_doc)
-            tmp.close()
-            artifact = ln.Artifact(
-                tmp.name,
-                description="Claude Code session transcript (rendered)",
-                run=False,
-            ).save()
-        finally:
-            tmp_path.unlink(missing_ok=True)
+# --- report URLs ---
 
-        run.report = artifact
-        _stamp_transforms(run, entries, ln)
+# parameters that make storage serve a signed report as a web page
+_HTML_SIGN_KWARGS = {
+    "s3": {"ResponseContentType": "text/html"},
+    "gs": {"response_type": "text/html"},
+}
 
-        run._status_code = 0  # completed
-        run.finished_at = datetime.now(timezone.utc)
-        run.save()
 
-        run_uid_file.unlink()
-        _transcript_path_file().unlink()
-        _info(f"finished tracking Claude Code session: {run.uid}")
-    except Exception as e:
-        _warn(f"lamindb session finish failed, continuing: {e}")
-        _warn(traceback.format_exc())
+def _signed_url(artifact: Any, *, html_page: bool = False) -> str:
+    path = artifact.path
+    protocol = getattr(path, "protocol", "")
+    protocol = protocol[0] if isinstance(protocol, tuple) else protocol
+    if protocol in ("", "file", "local"):
+        raise click.ClickException(
+            f"artifact {artifact.uid} is in local storage and has no URL"
+        )
+    kwargs = _HTML_SIGN_KWARGS.get(protocol, {}) if html_page else {}
+    try:
+        return path.fs.sign(
+            path.as_posix(), expiration=_SIGNED_URL_EXPIRATION, **kwargs
+        )
+    except NotImplementedError:
+        raise click.ClickException(f"can't sign URLs of {protocol} storage") from None
+
+
+def claudecode_report_url(run_uid: str) -> str:
+    """Signed URL of the report of a run whose paged steps load on click."""
+    import lamindb as ln
+
+    run = ln.Run.filter(uid=run_uid).one_or_none()
+    if run is None or run.report is None:
+        raise click.ClickException(f"run {run_uid} has no report")
+    html_doc = run.report.cache().read_text(encoding="utf-8")
+    match = re.search(r"const BODIES = (.*);", html_doc)
+    if match is None:
+        raise click.ClickException(
+            f"the report of run {run_uid} isn't paged, open it directly"
+        )
+    bodies = ln.Artifact.get(uid=json.loads(match.group(1))["uid"])
+    bodies_url = urllib.parse.quote(_signed_url(bodies), safe="")
+    return f"{_signed_url(run.report, html_page=True)}#bodies={bodies_url}"
@@ -1,8 +1,20 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import struct
 from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any
+from uuid import UUID
 
 from django.db import OperationalError, ProgrammingError
 from lamin_utils import logger
 
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
 
 def _count_instance_records() -> dict[str, int]:
     """Count all records across SQLRecord registries in parallel.
@@ -54,3 +66,532 @@ def _compare_record_counts(
             mismatches[table] = (orig_count, clone_count)
 
     return mismatches
+
+
+# ids per checksum bucket
+CHECKSUM_BUCKET_SIZE = 10_000
+# tables checksummed at the same time
+CHECKSUM_WORKERS = 4
+
+
+def _utc_text(value: datetime) -> str:
+    # SQLite stores naive UTC datetimes
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="microseconds")
+
+
+def _jsonb_text(value: Any) -> str:
+    """Text of a JSON value as Postgres prints `jsonb`."""
+    if isinstance(value, dict):
+        # jsonb orders keys by their length first
+        keys = sorted(value, key=lambda key: (len(key.encode()), key.encode()))
+        items = (f"{_jsonb_text(key)}: {_jsonb_text(value[key])}" for key in keys)
+        return "{" + ", ".join(items) + "}"
+    if isinstance(value, list):
+        return "[" + ", ".join(_jsonb_text(item) for item in value) + "]"
+    if value is None or isinstance(value, (bool, str)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, float):
+        value = Decimal(repr(value))
+    if isinstance(value, Decimal):
+        # numbers are printed as numeric, without exponent and negative zero
+        return format(abs(value) if value == 0 else value, "f")
+    return str(value)
+
+
+def _decimal_text(value: Any) -> str:
+    value = Decimal(str(value))
+    if not value.is_finite():
+        return str(value)
+    return "0" if value == 0 else format(value.normalize(), "f")
+
+
+def _float_text(value: Any) -> str:
+    return struct.pack(">d", float(value)).hex()
+
+
+# canonical text of fields read by Django from the instance, by internal type
+_SOURCE_TEXT: dict[str, Callable[[Any], str]] = {
+    "DateTimeField": _utc_text,
+    "DateField": lambda value: value.isoformat(),
+    "TimeField": lambda value: value.isoformat(timespec="microseconds"),
+    "JSONField": _jsonb_text,
+    "UUIDField": lambda value: value.hex,
+    "DecimalField": _decimal_text,
+    "BooleanField": lambda value: "1" if value else "0",
+    "FloatField": _float_text,
+    "BinaryField": lambda value: bytes(value).hex(),
+    "DurationField": lambda value: str(value // timedelta(microseconds=1)),
+}
+
+# canonical text of the columns of the clone as stored by SQLite, values of
+# other types than SQLite stores for a field are compared as they are
+_CLONE_TEXT: dict[str, tuple[type | tuple[type, ...], Callable[[Any], str]]] = {
+    "DateTimeField": (str, lambda value: _utc_text(datetime.fromisoformat(value))),
+    "DateField": (str, lambda value: date.fromisoformat(value).isoformat()),
+    "TimeField": (
+        str,
+        lambda value: time.fromisoformat(value).isoformat(timespec="microseconds"),
+    ),
+    "JSONField": (
+        str,
+        lambda value: _jsonb_text(json.loads(value, parse_float=Decimal)),
+    ),
+    "UUIDField": (str, lambda value: UUID(value).hex),
+    "DecimalField": ((int, float, str), _decimal_text),
+    "BooleanField": (int, lambda value: str(value) if value in (0, 1) else repr(value)),
+    "FloatField": ((int, float), _float_text),
+    "BinaryField": (bytes, bytes.hex),
+    "DurationField": (int, str),
+}
+
+# canonical text of columns computed by Postgres, the same as `_SOURCE_TEXT`
+_POSTGRES_TEXT: dict[str, str] = {
+    "DateTimeField": "to_char({} AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS.US')",
+    "DateField": "to_char({}, 'YYYY-MM-DD')",
+    "TimeField": "to_char({}, 'HH24:MI:SS.US')",
+    "JSONField": "{}::text",
+    "UUIDField": "replace({}::text, '-', '')",
+    "DecimalField": "trim_scale({})::text",
+    "BooleanField": "{}::int::text",
+    "FloatField": "encode(float8send({}), 'hex')",
+    "BinaryField": "encode({}, 'hex')",
+    "DurationField": "(extract(epoch FROM {}) * 1000000)::bigint::text",
+}
+
+
+def _internal_type(field) -> str:
+    # foreign keys store the values of the fields they reference
+    while field.is_relation:
+        field = field.target_field
+    return field.get_internal_type()
+
+
+def _source_text(field) -> Callable[[Any], str | None]:
+    convert = _SOURCE_TEXT.get(_internal_type(field), str)
+    return lambda value: None if value is None else convert(value)
+
+
+def _clone_text(field) -> Callable[[Any], str | None]:
+    types, convert = _CLONE_TEXT.get(_internal_type(field), (object, str))
+
+    def canonical(value: Any) -> str | None:
+        if value is None:
+            return None
+        if not isinstance(value, types):
+            return repr(value)
+        try:
+            return convert(value)
+        except ValueError:
+            # a value SQLite can't have been written from the instance
+            return repr(value)
+
+    return canonical
+
+
+def _row_hash(texts: list[str | None]) -> int:
+    """Signed 64-bit hash of the canonical text of a row, as `_postgres_row_hash`."""
+    row_text = ",".join(
+        "-" if text is None else f"{len(text)}:{text}" for text in texts
+    )
+    digest = hashlib.md5(row_text.encode(), usedforsecurity=False).hexdigest()
+    value = int(digest[:16], 16)
+    return value - 2**64 if value >= 2**63 else value
+
+
+def _postgres_text(field) -> str:
+    from django.db import connection
+
+    column = connection.ops.quote_name(field.column)
+    return _POSTGRES_TEXT.get(_internal_type(field), "{}::text").format(column)
+
+
+def _postgres_row_hash(model) -> str:
+    texts = [_postgres_text(field) for field in model._meta.concrete_fields]
+    row_text = " || ',' || ".join(
+        f"coalesce(length({text})::text || ':' || {text}, '-')" for text in texts
+    )
+    return f"('x' || substr(md5({row_text}), 1, 16))::bit(64)::bigint"
+
+
+def _hashed_buckets(watermark: dict, bucket_size: int) -> int:
+    return max(1, -(-(watermark.get("count") or 0) // bucket_size))
+
+
+def _bucket_of(model, watermark: dict, bucket_size: int) -> Callable[[str], int]:
+    """Bucket of the canonical text of a primary key.
+
+    Buckets are ranges of `bucket_size` integer primary keys. Other primary keys
+    are spread over buckets of about `bucket_size` rows by their hash.
+    """
+    from lamin_cli.clone._incremental import _has_integer_pk
+
+    if _has_integer_pk(model):
+        return lambda pk: int(pk) // bucket_size
+    n_buckets = _hashed_buckets(watermark, bucket_size)
+
+    def bucket_of(pk: str) -> int:
+        digest = hashlib.md5(pk.encode(), usedforsecurity=False).hexdigest()
+        return int(digest[:8], 16) % n_buckets
+
+    return bucket_of
+
+
+def _postgres_bucket(model, watermark: dict, bucket_size: int) -> str:
+    from django.db import connection
+
+    from lamin_cli.clone._incremental import _has_integer_pk
+
+    if _has_integer_pk(model):
+        return f"{connection.ops.quote_name(model._meta.pk.column)} / {bucket_size}"
+    n_buckets = _hashed_buckets(watermark, bucket_size)
+    pk = _postgres_text(model._meta.pk)
+    return f"mod(('x' || substr(md5({pk}), 1, 8))::bit(32)::bigint, {n_buckets})"
+
+
+def _max_pk(model, watermark: dict) -> int | None:
+    from lamin_cli.clone._incremental import _has_integer_pk
+
+    # rows inserted after the watermark was taken aren't in the clone
+    return watermark.get("max_pk") if _has_integer_pk(model) else None
+
+
+def _source_rows(
+    model, watermark: dict, pk_range: tuple[int, int] | None = None
+) -> Iterator[tuple]:
+    """Rows of the instance, as read by Django."""
+    queryset = model._base_manager.all()
+    if (max_pk := _max_pk(model, watermark)) is not None:
+        queryset = queryset.filter(pk__lte=max_pk)
+    if pk_range is not None:
+        queryset = queryset.filter(pk__gte=pk_range[0], pk__lt=pk_range[1])
+    fields = model._meta.concrete_fields
+    rows = queryset.values_list(*(field.attname for field in fields))
+    return rows.iterator(chunk_size=CHECKSUM_BUCKET_SIZE)
+
+
+def _clone_rows(
+    clone, model, watermark: dict, pk_range: tuple[int, int] | None = None
+) -> Iterator[tuple]:
+    """Rows of the clone, as stored by SQLite."""
+    pk = f'"{model._meta.pk.column}"'
+    columns = ", ".join(f'"{field.column}"' for field in model._meta.concrete_fields)
+    conditions = []
+    if (max_pk := _max_pk(model, watermark)) is not None:
+        conditions.append(f"{pk} <= {int(max_pk)}")
+    if pk_range is not None:
+        conditions.append(f"{pk} >= {int(pk_range[0])} AND {pk} < {int(pk_range[1])}")
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return clone.execute(f'SELECT {columns} FROM "{model._meta.db_table}"{where}')
+
+
+def _row_hashes(
+    rows: Iterable[tuple], converters: list[Callable[[Any], str | None]], pk_index: int
+) -> Iterator[tuple[str, int, tuple]]:
+    """Canonical primary key, hash and values of every row."""
+    for row in rows:
+        texts = [convert(v) for convert, v in zip(converters, row, strict=True)]
+        yield texts[pk_index], _row_hash(texts), row
+
+
+def _read_buckets(
+    read: Callable[[tuple[int, int] | None], Iterable[tuple]],
+    pk_ranges: list[tuple[int, int]] | None,
+) -> Iterable[tuple]:
+    """Rows in `pk_ranges` of integer primary keys, or all rows."""
+    if pk_ranges is None:
+        return read(None)
+    return (row for pk_range in pk_ranges for row in read(pk_range))
+
+
+def _bucket_checksums(
+    hashes: Iterable[tuple[str, int, tuple]],
+    bucket_of: Callable[[str], int],
+    buckets: set[int] | None = None,
+) -> dict[int, tuple[int, int]]:
+    """Row count and sum of the row hashes of every bucket, or of `buckets`."""
+    checksums: dict[int, tuple[int, int]] = {}
+    for pk, row_hash, _ in hashes:
+        bucket = bucket_of(pk)
+        if buckets is not None and bucket not in buckets:
+            continue
+        count, total = checksums.get(bucket, (0, 0))
+        checksums[bucket] = (count + 1, total + row_hash)
+    return checksums
+
+
+def _bucket_row_hashes(
+    hashes: Iterable[tuple[str, int, tuple]],
+    bucket_of: Callable[[str], int],
+    buckets: set[int],
+    changed: Callable[[tuple], bool] | None = None,
+) -> tuple[dict[str, int], set[str]]:
+    """Row hashes in `buckets` and the primary keys of rows that are `changed`."""
+    row_hashes = {}
+    skipped = set()
+    for pk, row_hash, row in hashes:
+        if bucket_of(pk) not in buckets:
+            continue
+        row_hashes[pk] = row_hash
+        if changed is not None and changed(row):
+            skipped.add(pk)
+    return row_hashes, skipped
+
+
+def _postgres_where(
+    model, watermark: dict, bucket_size: int, buckets: set[int] | None = None
+) -> tuple[str, list]:
+    from django.db import connection
+
+    conditions = []
+    params = []
+    if (max_pk := _max_pk(model, watermark)) is not None:
+        conditions.append(f"{connection.ops.quote_name(model._meta.pk.column)} <= %s")
+        params.append(max_pk)
+    if buckets is not None:
+        bucket_list = ", ".join(str(int(bucket)) for bucket in sorted(buckets))
+        bucket = _postgres_bucket(model, watermark, bucket_size)
+        conditions.append(f"{bucket} IN ({bucket_list})")
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where, params
+
+
+def _postgres_checksums(
+    model, watermark: dict, bucket_size: int, buckets: set[int] | None = None
+) -> dict[int, tuple[int, int]]:
+    """Row count and sum of the row hashes of every bucket, computed by Postgres."""
+    from django.db import connection
+
+    bucket = _postgres_bucket(model, watermark, bucket_size)
+    where, params = _postgres_where(model, watermark, bucket_size, buckets)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {bucket}, count(*), sum({_postgres_row_hash(model)}) "
+            f"FROM {connection.ops.quote_name(model._meta.db_table)}{where} "
+            "GROUP BY 1",
+            params,
+        )
+        return {
+            int(bucket): (count, int(total))
+            for bucket, count, total in cursor.fetchall()
+        }
+
+
+def _postgres_bucket_row_hashes(
+    model, watermark: dict, bucket_size: int, buckets: set[int], updated_after
+) -> tuple[dict[str, int], set[str]]:
+    """Row hashes in `buckets` and keys of rows updated later, by Postgres."""
+    from django.db import connection
+
+    pk = _postgres_text(model._meta.pk)
+    where, params = _postgres_where(model, watermark, bucket_size, buckets)
+    changed = "false"
+    if updated_after is not None:
+        changed = f"{connection.ops.quote_name('updated_at')} > %s"
+        params = [updated_after, *params]
+    row_hashes = {}
+    skipped = set()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {pk}, {_postgres_row_hash(model)}, {changed} "
+            f"FROM {connection.ops.quote_name(model._meta.db_table)}{where}",
+            params,
+        )
+        for pk_text, row_hash, is_changed in cursor:
+            row_hashes[pk_text] = row_hash
+            if is_changed:
+                skipped.add(pk_text)
+    return row_hashes, skipped
+
+
+def _table_checksum(model) -> int:
+    """Sum of the row hashes of all rows of `model` in the instance."""
+    from django.db import connection
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT coalesce(sum({_postgres_row_hash(model)}), 0) "
+                f"FROM {connection.ops.quote_name(model._meta.db_table)}"
+            )
+            return int(cursor.fetchone()[0])
+    fields = model._meta.concrete_fields
+    converters = [_source_text(field) for field in fields]
+    hashes = _row_hashes(
+        _source_rows(model, {}), converters, fields.index(model._meta.pk)
+    )
+    return sum(row_hash for _, row_hash, _ in hashes)
+
+
+def _format_ids(ids: list) -> str:
+    if all(isinstance(pk, int) for pk in ids):
+        return ", ".join(_id_ranges(ids))
+    return ", ".join(sorted(str(pk) for pk in ids))
+
+
+def _id_ranges(ids: list[int]) -> list[str]:
+    ranges: list[list[int]] = []
+    for pk in sorted(ids):
+        if ranges and pk == ranges[-1][1] + 1:
+            ranges[-1][1] = pk
+        else:
+            ranges.append([pk, pk])
+    return [str(lo) if lo == hi else f"{lo}-{hi}" for lo, hi in ranges]
+
+
+def _verify_table(
+    model,
+    clone_db,
+    watermark: dict,
+    bucket_size: int,
+    buckets: set[int] | None = None,
+) -> list[str] | None:
+    import sqlite3
+
+    from django.db import connection
+
+    from lamin_cli.clone._incremental import _has_integer_pk, _has_updated_at
+
+    fields = model._meta.concrete_fields
+    pk_index = fields.index(model._meta.pk)
+    source_converters = [_source_text(field) for field in fields]
+    clone_converters = [_clone_text(field) for field in fields]
+    bucket_of = _bucket_of(model, watermark, bucket_size)
+    on_postgres = connection.vendor == "postgresql"
+
+    def pk_ranges(buckets: set[int] | None) -> list[tuple[int, int]] | None:
+        if buckets is None or not _has_integer_pk(model):
+            return None
+        return [
+            (bucket * bucket_size, (bucket + 1) * bucket_size)
+            for bucket in sorted(buckets)
+        ]
+
+    # rows updated after the watermark were changed while the snapshot ran
+    updated_after = None
+    updated_index = None
+    if watermark.get("max_updated_at") and _has_updated_at(model):
+        updated_after = datetime.fromisoformat(watermark["max_updated_at"])
+        updated_index = fields.index(model._meta.get_field("updated_at"))
+
+    def changed_after_watermark(row: tuple) -> bool:
+        return (
+            updated_index is not None
+            and row[updated_index] is not None
+            and row[updated_index] > updated_after
+        )
+
+    if buckets is not None and not buckets:
+        return None
+    clone = sqlite3.connect(f"file:{clone_db}?mode=ro", uri=True)
+    try:
+
+        def source_hashes(buckets: set[int] | None):
+            rows = _read_buckets(
+                lambda pk_range: _source_rows(model, watermark, pk_range),
+                pk_ranges(buckets),
+            )
+            return _row_hashes(rows, source_converters, pk_index)
+
+        def clone_hashes(buckets: set[int] | None):
+            rows = _read_buckets(
+                lambda pk_range: _clone_rows(clone, model, watermark, pk_range),
+                pk_ranges(buckets),
+            )
+            return _row_hashes(rows, clone_converters, pk_index)
+
+        if on_postgres:
+            source = _postgres_checksums(model, watermark, bucket_size, buckets)
+        else:
+            source = _bucket_checksums(source_hashes(buckets), bucket_of, buckets)
+        copy = _bucket_checksums(clone_hashes(buckets), bucket_of, buckets)
+        if source == copy:
+            return None
+
+        # compare the rows of differing buckets one by one
+        differing_buckets = {
+            bucket
+            for bucket in source.keys() | copy.keys()
+            if source.get(bucket) != copy.get(bucket)
+        }
+        if on_postgres:
+            source_rows, skipped = _postgres_bucket_row_hashes(
+                model, watermark, bucket_size, differing_buckets, updated_after
+            )
+        else:
+            source_rows, skipped = _bucket_row_hashes(
+                source_hashes(differing_buckets),
+                bucket_of,
+                differing_buckets,
+                changed_after_watermark,
+            )
+        clone_rows, _ = _bucket_row_hashes(
+            clone_hashes(differing_buckets), bucket_of, differing_buckets
+        )
+        differing = [
+            int(pk) if _has_integer_pk(model) else pk
+            for pk in source_rows.keys() | clone_rows.keys()
+            if source_rows.get(pk) != clone_rows.get(pk) and pk not in skipped
+        ]
+        return [f"ids {_format_ids(differing)}"] if differing else None
+    finally:
+        clone.close()
+        connection.close()
+
+
+def _verify_count(model, clone_db, watermark: dict) -> list[str] | None:
+    import sqlite3
+
+    clone = sqlite3.connect(f"file:{clone_db}?mode=ro", uri=True)
+    try:
+        (count,) = clone.execute(
+            f'SELECT COUNT(*) FROM "{model._meta.db_table}"'
+        ).fetchone()
+    finally:
+        clone.close()
+    expected = watermark.get("count") or 0
+    return None if count == expected else [f"{count} rows instead of {expected}"]
+
+
+def verify_clone(
+    models,
+    clone_db,
+    watermarks: dict[str, dict],
+    *,
+    changed_keys: dict[str, Iterable[Any]] | None = None,
+    bucket_size: int = CHECKSUM_BUCKET_SIZE,
+    max_workers: int = CHECKSUM_WORKERS,
+) -> dict[str, list[str]]:
+    """Compare checksums of the instance and its clone table by table.
+
+    Every row is hashed from the same canonical text on both sides: Postgres
+    computes it in SQL and sums the row hashes per bucket on the server, values
+    read from other instances and values stored in the clone are converted to the
+    same text in Python. A value converted wrongly while cloning changes the hash.
+    Buckets are ranges of `bucket_size` integer primary keys, or hashes of other
+    primary keys, and only the rows of differing buckets are compared one by one.
+
+    With `changed_keys`, the primary keys per table of the rows an incremental
+    snapshot upserted or deleted as stored in the clone, only the buckets of these
+    keys are compared, and only the row counts of the other tables.
+
+    Returns the differences per table.
+    """
+
+    def verify(model):
+        table = model._meta.db_table
+        watermark = watermarks.get(table, {})
+        if changed_keys is None:
+            return table, _verify_table(model, clone_db, watermark, bucket_size)
+        if table not in changed_keys:
+            return table, _verify_count(model, clone_db, watermark)
+        to_text = _clone_text(model._meta.pk)
+        bucket_of = _bucket_of(model, watermark, bucket_size)
+        buckets = {bucket_of(to_text(pk)) for pk in changed_keys[table]}
+        return table, _verify_table(model, clone_db, watermark, bucket_size, buckets)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(verify, models)
+    return {table: differences for table, differences in results if differences}
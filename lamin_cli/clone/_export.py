@@ -0,0 +1,459 @@
+"""Export registries to parquet, resumably and incrementally.
+
+Every table is written as a parquet dataset directory `<table>.parquet/` with one
+file per chunk of rows, which `import_db` and `pandas.read_parquet` read like a
+single file. Chunks are read by ascending primary key, after the last key of the
+previous chunk, and with `COPY` on Postgres. A `manifest.json` in the
+output directory records the watermark of every table and, once written, every
+chunk with its row count and SHA-256, so an interrupted export resumes after the
+last recorded chunk. Exporting with the manifest of a previous export as `since`
+only writes rows created or updated after the watermarks in it. Rows that
+Postgres commits after an export with a smaller key or an earlier `updated_at`
+than its watermarks aren't exported by the next one.
+
+For every table with a `uid` that exported rows reference but that isn't
+exported itself, the `(id, uid)` pairs of all its rows are written to
+`ids/<table>.parquet`, so that `upsert_tables` can remap the references.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from typing import TYPE_CHECKING, Any
+
+from lamin_cli.clone._incremental import (
+    _batched,
+    _changed_rows,
+    _has_integer_pk,
+    _row_batches,
+    _snapshot_models,
+    _table_watermarks,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from pathlib import Path
+
+    from django.db.models import Field, Model
+
+EXPORT_MANIFEST_VERSION = 1
+EXPORT_MANIFEST_FILE = "manifest.json"
+ID_MAPS_DIR = "ids"
+
+_ARROW_TYPES = {
+    "AutoField": "int64",
+    "BigAutoField": "int64",
+    "SmallAutoField": "int64",
+    "IntegerField": "int64",
+    "BigIntegerField": "int64",
+    "SmallIntegerField": "int64",
+    "PositiveIntegerField": "int64",
+    "PositiveBigIntegerField": "int64",
+    "PositiveSmallIntegerField": "int64",
+    "FloatField": "float64",
+    "BooleanField": "bool_",
+    "BinaryField": "binary",
+}
+
+
+def _model_label(model: type[Model]) -> str:
+    return f"{model._meta.app_label}.{model.__name__}"
+
+
+def select_models(
+    models: Iterable[type[Model]],
+    include: list[str] | None = None,
+    exclude: list[str] | None = None,
+) -> list[type[Model]]:
+    """Models whose table name or `module.Model` label match the patterns.
+
+    Patterns are case-insensitive shell-style wildcards, such as `bionty.*` or
+    `lamindb_artifact*`.
+    """
+
+    def matches(model: type[Model], patterns: list[str]) -> bool:
+        names = (model._meta.db_table.lower(), _model_label(model).lower())
+        return any(
+            fnmatch(name, pattern.lower()) for name in names for pattern in patterns
+        )
+
+    return [
+        model
+        for model in models
+        if (not include or matches(model, include))
+        and not (exclude and matches(model, exclude))
+    ]
+
+
+def _unique_uid(model: type[Model]) -> Field | None:
+    for field in model._meta.concrete_fields:
+        if field.name == "uid" and field.unique and not field.primary_key:
+            return field
+    return None
+
+
+def _internal_type(field) -> str:
+    # foreign keys store the values of the fields they reference
+    while field.is_relation:
+        field = field.target_field
+    return field.get_internal_type()
+
+
+def _arrow_type(field):
+    import pyarrow as pa
+
+    return getattr(pa, _ARROW_TYPES.get(_internal_type(field), "string"))()
+
+
+def _arrow_schema(model: type[Model]):
+    import pyarrow as pa
+
+    return pa.schema(
+        [(field.column, _arrow_type(field)) for field in model._meta.concrete_fields]
+    )
+
+
+# columns selected by `COPY` in the representation `_row_batches` converts to
+_COPY_COLUMNS = {
+    "DateTimeField": "{} AT TIME ZONE 'UTC'",
+    "UUIDField": "replace({}::text, '-', '')",
+    "BinaryField": "encode({}, 'hex')",
+    "DurationField": "(extract(epoch FROM {}) * 1000000)::bigint",
+}
+
+
+def _rows_table(model: type[Model], rows: list[tuple[Any, ...]]):
+    import pyarrow as pa
+
+    schema = _arrow_schema(model)
+    if not rows:
+        return schema.empty_table()
+    columns = list(zip(*rows, strict=True))
+    return pa.Table.from_arrays(
+        [
+            pa.array(values, type=field.type)
+            for values, field in zip(columns, schema, strict=True)
+        ],
+        schema=schema,
+    )
+
+
+def _copy_table(model: type[Model], queryset):
+    """Rows of `queryset` read with Postgres `COPY`, in primary key order."""
+    import io
+
+    import pyarrow as pa
+    import pyarrow.csv as csv
+    from django.db import connection
+
+    quote = connection.ops.quote_name
+    fields = model._meta.concrete_fields
+    columns = [
+        _COPY_COLUMNS.get(_internal_type(field), "{}").format(quote(field.column))
+        for field in fields
+    ]
+    schema = _arrow_schema(model)
+    # binary columns are read as hex
+    read_schema = pa.schema(
+        [
+            (field.name, pa.string() if pa.types.is_binary(field.type) else field.type)
+            for field in schema
+        ]
+    )
+    pk = quote(model._meta.pk.column)
+    pks, params = queryset.values_list("pk").query.sql_with_params()
+    buffer = io.BytesIO()
+    with connection.cursor() as cursor:
+        query = cursor.mogrify(
+            f"COPY (SELECT {', '.join(columns)} FROM {quote(model._meta.db_table)} "
+            f"WHERE {pk} IN ({pks}) ORDER BY {pk}) TO STDOUT WITH (FORMAT CSV)",
+            params,
+        )
+        cursor.copy_expert(query.decode(), buffer)
+    buffer.seek(0)
+    table = csv.read_csv(
+        buffer,
+        read_options=csv.ReadOptions(column_names=read_schema.names),
+        convert_options=csv.ConvertOptions(
+            column_types=read_schema,
+            # COPY writes NULL unquoted and empty strings quoted
+            null_values=[""],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+            true_values=["t"],
+            false_values=["f"],
+        ),
+    )
+    for index, field in enumerate(schema):
+        if pa.types.is_binary(field.type):
+            values = [
+                None if value is None else bytes.fromhex(value)
+                for value in table.column(index).to_pylist()
+            ]
+            table = table.set_column(index, field, pa.array(values, pa.binary()))
+    return table
+
+
+def _write_chunk(table, path: Path) -> str:
+    import pyarrow.parquet as pq
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.partial")
+    pq.write_table(table, tmp_path)
+    digest = hashlib.sha256(tmp_path.read_bytes()).hexdigest()
+    tmp_path.replace(path)
+    return digest
+
+
+class ExportManifest:
+    """The `manifest.json` of an export directory, written after every change."""
+
+    def __init__(self, directory: Path, data: dict[str, Any]):
+        self.directory = directory
+        self.data = data
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, directory: Path) -> ExportManifest | None:
+        path = directory / EXPORT_MANIFEST_FILE
+        if not path.exists():
+            return None
+        data = json.loads(path.read_text())
+        if data.get("version") != EXPORT_MANIFEST_VERSION:
+            return None
+        return cls(directory, data)
+
+    def save(self) -> None:
+        with self._lock:
+            path = self.directory / EXPORT_MANIFEST_FILE
+            tmp_path = path.with_suffix(".json.partial")
+            tmp_path.write_text(json.dumps(self.data, indent=2))
+            tmp_path.replace(path)
+
+    def table(self, table: str) -> dict[str, Any] | None:
+        return self.data["tables"].get(table)
+
+    def start_table(self, table: str, watermark: dict[str, Any]) -> dict[str, Any]:
+        with self._lock:
+            entry = self.data["tables"].setdefault(
+                table, {"watermark": watermark, "complete": False, "chunks": []}
+            )
+        self.save()
+        return entry
+
+    def add_chunk(self, table: str, chunk: dict[str, Any]) -> None:
+        with self._lock:
+            self.data["tables"][table]["chunks"].append(chunk)
+        self.save()
+
+    def complete_table(self, table: str) -> None:
+        with self._lock:
+            self.data["tables"][table]["complete"] = True
+        self.save()
+
+    def id_map(self, table: str) -> dict[str, Any] | None:
+        return self.data.get("id_maps", {}).get(table)
+
+    def add_id_map(self, table: str, entry: dict[str, Any]) -> None:
+        with self._lock:
+            self.data.setdefault("id_maps", {})[table] = entry
+        self.save()
+
+
+def _export_table(
+    model: type[Model],
+    manifest: ExportManifest,
+    previous: dict[str, Any] | None,
+    chunk_size: int,
+) -> dict[str, Any]:
+    """Export the rows of `model` past the `previous` watermark, or all rows."""
+    from django.db import connection
+
+    table = model._meta.db_table
+    try:
+        entry = manifest.table(table)
+        if entry is None:
+            entry = manifest.start_table(table, _table_watermarks([model])[table])
+        if entry["complete"]:
+            return entry
+        watermark = entry["watermark"]
+        queryset = _changed_rows(model, previous, watermark)
+        if _has_integer_pk(model) and watermark.get("max_pk") is not None:
+            # rows created after the export started belong to the next one
+            queryset = queryset.filter(pk__lte=watermark["max_pk"])
+        queryset = queryset.order_by("pk")
+        pk_index = model._meta.concrete_fields.index(model._meta.pk)
+
+        while True:
+            chunks = entry["chunks"]
+            # chunks continue after the last key, which is indexed
+            chunk_rows = queryset
+            if chunks:
+                chunk_rows = chunk_rows.filter(pk__gt=chunks[-1]["last_pk"])
+            chunk_rows = chunk_rows[:chunk_size]
+            if connection.vendor == "postgresql":
+                rows = _copy_table(model, chunk_rows)
+            else:
+                rows = _rows_table(
+                    model,
+                    [
+                        row
+                        for batch in _row_batches(model, chunk_rows, chunk_size)
+                        for row in batch
+                    ],
+                )
+            if not rows.num_rows:
+                break
+            file = f"{table}.parquet/part-{len(chunks):05d}.parquet"
+            digest = _write_chunk(rows, manifest.directory / file)
+            pks = rows.column(pk_index)
+            manifest.add_chunk(
+                table,
+                {
+                    "file": file,
+                    "rows": rows.num_rows,
+                    "sha256": digest,
+                    "first_pk": pks[0].as_py(),
+                    "last_pk": pks[-1].as_py(),
+                },
+            )
+            if rows.num_rows < chunk_size:
+                break
+        manifest.complete_table(table)
+        return entry
+    finally:
+        # every worker thread opens its own connection
+        connection.close()
+
+
+def _referenced_models(models: Iterable[type[Model]]) -> list[type[Model]]:
+    """Models with a uid whose primary keys `models` reference but that aren't in it."""
+    tables = {model._meta.db_table for model in models}
+    referenced: dict[str, type[Model]] = {}
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if not field.is_relation or not field.target_field.primary_key:
+                continue
+            target = field.related_model
+            if target._meta.db_table not in tables and _unique_uid(target) is not None:
+                referenced.setdefault(target._meta.db_table, target)
+    return list(referenced.values())
+
+
+def _export_id_map(
+    model: type[Model], manifest: ExportManifest, chunk_size: int
+) -> None:
+    """Write the `(id, uid)` pairs of all rows of `model`."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = model._meta.db_table
+    if manifest.id_map(table) is not None:
+        return
+    pk, uid = model._meta.pk, _unique_uid(model)
+    schema = pa.schema([(pk.column, _arrow_type(pk)), (uid.column, pa.string())])
+    file = f"{ID_MAPS_DIR}/{table}.parquet"
+    path = manifest.directory / file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.partial")
+    rows = model._base_manager.order_by("pk").values_list(pk.attname, uid.attname)
+    n_rows = 0
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for batch in _batched(rows.iterator(chunk_size=chunk_size), chunk_size):
+            ids, uids = zip(*batch, strict=True)
+            writer.write_table(
+                pa.Table.from_arrays(
+                    [pa.array(ids, schema[0].type), pa.array(uids, schema[1].type)],
+                    schema=schema,
+                )
+            )
+            n_rows += len(batch)
+    digest = hashlib.sha256(tmp_path.read_bytes()).hexdigest()
+    tmp_path.replace(path)
+    manifest.add_id_map(table, {"file": file, "rows": n_rows, "sha256": digest})
+
+
+def since_watermarks(directory: Path) -> dict[str, dict[str, Any]]:
+    """Watermarks per table of the complete export in `directory`."""
+    manifest = ExportManifest.load(directory)
+    if manifest is None or not manifest.data["complete"]:
+        raise ValueError(f"{directory} doesn't contain a complete export.")
+    return {
+        table: entry["watermark"] for table, entry in manifest.data["tables"].items()
+    }
+
+
+def export_tables(
+    module_names: Iterable[str],
+    output_dir: Path,
+    *,
+    include: list[str] | None = None,
+    exclude: list[str] | None = None,
+    since: dict[str, dict[str, Any]] | None = None,
+    chunk_size: int = 500_000,
+    max_workers: int = 8,
+    on_table: Callable[[str, dict[str, Any]], None] | None = None,
+) -> ExportManifest:
+    """Export the selected tables to `output_dir`, resuming an earlier attempt.
+
+    Args:
+        module_names: Modules whose registries and link tables are exported.
+        output_dir: Directory of the export and its manifest.
+        include: Patterns of tables to export, all tables if not given.
+        exclude: Patterns of tables not to export.
+        since: Watermarks per table of a previous export, see `since_watermarks`;
+            only rows created or updated after them are exported.
+        chunk_size: Rows per parquet file.
+        max_workers: Tables exported at the same time.
+        on_table: Called with the table name and its manifest entry once a table
+            is complete.
+    """
+    parameters = {
+        "modules": sorted(module_names),
+        "include": include or [],
+        "exclude": exclude or [],
+        "chunk_size": chunk_size,
+        "since": since,
+    }
+    manifest = ExportManifest.load(output_dir)
+    if manifest is not None and manifest.data["parameters"] != parameters:
+        raise ValueError(
+            f"{output_dir} contains an export with other parameters, "
+            "export into another directory to start a new one."
+        )
+    if manifest is None:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        manifest = ExportManifest(
+            output_dir,
+            {
+                "version": EXPORT_MANIFEST_VERSION,
+                "complete": False,
+                "parameters": parameters,
+                "tables": {},
+            },
+        )
+        manifest.save()
+
+    models = select_models(_snapshot_models(module_names), include, exclude)
+
+    def export(model: type[Model]) -> None:
+        table = model._meta.db_table
+        # tables that weren't part of the previous export are exported in full
+        previous = None if since is None else since.get(table)
+        entry = _export_table(model, manifest, previous, chunk_size)
+        if on_table is not None:
+            on_table(table, entry)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for future in [executor.submit(export, model) for model in models]:
+            future.result()
+    # taken after the tables, so that every row they reference is included
+    for model in _referenced_models(models):
+        _export_id_map(model, manifest, chunk_size)
+    manifest.data["complete"] = True
+    manifest.save()
+    return manifest
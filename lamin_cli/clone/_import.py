@@ -0,0 +1,132 @@
+"""Load tables into a SQLite clone.
+
+Tables are scheduled in levels of the foreign key graph of their models, so that a
+table is written after the tables it references. Tables within a level are read
+on worker threads while a single writer inserts their rows, see `_stream`. During the
+load, the clone runs without journal and fsync and its indexes are dropped; they
+are created again once all data is in.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any
+
+from lamin_cli.clone._incremental import _insert_statement
+
+if TYPE_CHECKING:
+    import sqlite3
+    from collections.abc import Iterable, Iterator
+
+    from django.db.models import Model
+
+# page cache of the clone during the load, in KiB
+BULK_CACHE_KIB = 512 * 1024
+# tables read at the same time
+IMPORT_WORKERS = 4
+# slowest tables listed in the timing report
+TIMINGS_SHOWN = 10
+
+
+def dependency_levels(models: Iterable[type[Model]]) -> list[list[type[Model]]]:
+    """Group models so that each only references models of earlier levels.
+
+    Self-references are ignored. Cycles are broken by scheduling the model with
+    the fewest unresolved references first.
+    """
+    by_table = {model._meta.db_table: model for model in models}
+    references = {
+        table: {
+            field.related_model._meta.db_table
+            for field in model._meta.concrete_fields
+            if field.is_relation
+            and field.related_model is not None
+            and field.related_model._meta.db_table in by_table
+        }
+        - {table}
+        for table, model in by_table.items()
+    }
+    levels = []
+    while references:
+        pending = references.keys()
+        ready = [table for table, refs in references.items() if not refs & pending]
+        if not ready:
+            ready = [min(references, key=lambda table: len(references[table]))]
+        levels.append([by_table[table] for table in sorted(ready)])
+        for table in ready:
+            del references[table]
+        for refs in references.values():
+            refs.difference_update(ready)
+    return levels
+
+
+@contextmanager
+def bulk_load(clone: sqlite3.Connection) -> Iterator[None]:
+    """Configure the clone for a bulk load and create its indexes afterwards."""
+    clone.commit()
+    (journal_mode,) = clone.execute("PRAGMA journal_mode").fetchone()
+    clone.execute("PRAGMA foreign_keys = OFF")
+    clone.execute("PRAGMA journal_mode = OFF")
+    clone.execute("PRAGMA synchronous = OFF")
+    clone.execute(f"PRAGMA cache_size = -{BULK_CACHE_KIB}")
+    clone.execute("PRAGMA temp_store = MEMORY")
+    # indexes backing primary keys and inline unique constraints have no SQL and
+    # can't be dropped
+    indexes = clone.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+        "AND sql IS NOT NULL AND tbl_name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    for name, _ in indexes:
+        clone.execute(f'DROP INDEX "{name}"')
+    try:
+        yield
+    finally:
+        clone.commit()
+        for _, sql in indexes:
+            clone.execute(sql)
+        clone.commit()
+        clone.execute(f"PRAGMA journal_mode = {journal_mode}")
+        clone.execute("PRAGMA synchronous = FULL")
+        clone.execute("PRAGMA foreign_keys = ON")
+
+
+class CloneWriter:
+    """Inserts rows into the tables of a clone and times each table.
+
+    The time of a table runs from when reading it started until its last rows
+    were written.
+    """
+
+    def __init__(self, clone: sqlite3.Connection):
+        self._clone = clone
+        self._statements: dict[str, str] = {}
+        self._started: dict[str, float] = {}
+        self.rows: dict[str, int] = {}
+        self.seconds: dict[str, float] = {}
+
+    def begin(
+        self, table: str, columns: list[str], *, started: float | None = None
+    ) -> None:
+        # replaces the default records of the freshly created clone
+        self._clone.execute(f'DELETE FROM "{table}"')
+        self._statements[table] = _insert_statement(table, columns, replace=False)
+        self._started[table] = time.perf_counter() if started is None else started
+        self.rows[table] = 0
+        self.seconds[table] = time.perf_counter() - self._started[table]
+
+    def write(self, table: str, rows: list[tuple[Any, ...]]) -> None:
+        self._clone.executemany(self._statements[table], rows)
+        self.rows[table] += len(rows)
+        self.seconds[table] = time.perf_counter() - self._started[table]
+
+    def report(self, limit: int = TIMINGS_SHOWN) -> list[str]:
+        slowest = sorted(self.seconds, key=self.seconds.__getitem__, reverse=True)
+        lines = [
+            f"{table}: {self.rows[table]} rows in {self.seconds[table]:.2f}s"
+            for table in slowest[:limit]
+        ]
+        lines.append(
+            f"loaded {sum(self.rows.values())} rows into {len(self.rows)} tables"
+        )
+        return lines
@@ -0,0 +1,349 @@
+"""Incremental SQLite snapshots.
+
+A snapshot records per-table high-water marks next to its clone: the row count,
+the largest integer primary key and the latest `updated_at`, or a checksum of
+tables that have neither. The next incremental snapshot reads only rows past
+these marks, and upserts those that are missing from the previous clone or differ
+from it; rows deleted since are found by comparing row counts.
+
+Postgres can commit a row after rows with a larger key or a later `updated_at`
+were read, so rows within a safety window below the marks are read again.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any
+from uuid import UUID
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from pathlib import Path
+
+    from django.db.models import Model
+
+SNAPSHOT_STATE_VERSION = 1
+SNAPSHOT_STATE_FILE = "snapshot.json"
+# rows fetched from the instance and written to the clone at a time
+DELTA_BATCH_SIZE = 5_000
+# rows below the marks that are read again, by primary key and `updated_at`
+SAFETY_WINDOW_IDS = 1_000
+SAFETY_WINDOW = timedelta(minutes=10)
+
+
+def _snapshot_state_path(clone_db: Path) -> Path:
+    return clone_db.with_name(SNAPSHOT_STATE_FILE)
+
+
+def _read_snapshot_state(
+    path: Path, instance_slug: str, modules: Iterable[str]
+) -> dict[str, Any] | None:
+    """The state of the previous snapshot if it can be updated incrementally."""
+    if not path.exists() or not path.with_name("lamin.db").exists():
+        return None
+    try:
+        state = json.loads(path.read_text())
+    except (OSError, json.JSONDecodeError):
+        return None
+    if (
+        not isinstance(state, dict)
+        or state.get("version") != SNAPSHOT_STATE_VERSION
+        or state.get("instance") != instance_slug
+        or state.get("modules") != sorted(modules)
+    ):
+        return None
+    return state
+
+
+def _write_snapshot_state(
+    path: Path,
+    instance_slug: str,
+    modules: Iterable[str],
+    watermarks: dict[str, dict[str, Any]],
+) -> None:
+    state = {
+        "version": SNAPSHOT_STATE_VERSION,
+        "instance": instance_slug,
+        "modules": sorted(modules),
+        "tables": watermarks,
+    }
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(state, indent=2))
+    tmp_path.replace(path)
+
+
+def _snapshot_models(modules: Iterable[str]) -> list[type[Model]]:
+    """Registries and link tables of the given modules, one per table."""
+    from django.apps import apps
+
+    app_labels = set(modules)
+    models: dict[str, type[Model]] = {}
+    for model in apps.get_models(include_auto_created=True):
+        if model._meta.app_label not in app_labels or model._meta.proxy:
+            continue
+        models.setdefault(model._meta.db_table, model)
+    return list(models.values())
+
+
+def _has_integer_pk(model: type[Model]) -> bool:
+    return model._meta.pk.get_internal_type() in {
+        "AutoField",
+        "BigAutoField",
+        "SmallAutoField",
+        "IntegerField",
+        "BigIntegerField",
+        "SmallIntegerField",
+    }
+
+
+def _has_updated_at(model: type[Model]) -> bool:
+    return any(field.name == "updated_at" for field in model._meta.concrete_fields)
+
+
+def _table_watermarks(models: Iterable[type[Model]]) -> dict[str, dict[str, Any]]:
+    """Row count, largest integer primary key and latest `updated_at` per table.
+
+    Tables with neither an integer primary key nor an `updated_at` column get a
+    checksum of their rows instead.
+    """
+    from django.db.models import Count, Max
+
+    from lamin_cli.clone._clone_verification import _table_checksum
+
+    watermarks = {}
+    for model in models:
+        aggregates: dict[str, Any] = {"count": Count("pk")}
+        if _has_integer_pk(model):
+            aggregates["max_pk"] = Max("pk")
+        if _has_updated_at(model):
+            aggregates["max_updated_at"] = Max("updated_at")
+        values = model._base_manager.aggregate(**aggregates)
+        if values.get("max_updated_at") is not None:
+            values["max_updated_at"] = values["max_updated_at"].isoformat()
+        if not _has_integer_pk(model) and not _has_updated_at(model):
+            values["checksum"] = _table_checksum(model)
+        watermarks[model._meta.db_table] = values
+    return watermarks
+
+
+def _changed_rows(
+    model: type[Model],
+    previous: dict[str, Any] | None,
+    current: dict[str, Any] | None = None,
+    *,
+    window: bool = False,
+):
+    """Queryset of the rows of `model` past the marks of the previous snapshot.
+
+    Tables that are new or were empty are exported in full, as are tables with
+    neither an integer primary key nor an `updated_at` column unless the row
+    count and checksum of the `current` marks are unchanged. With `window`, rows
+    within the safety window below the marks are included.
+    """
+    from django.db.models import Q
+
+    queryset = model._base_manager.all()
+    if not previous or not previous.get("count"):
+        return queryset
+    if not _has_integer_pk(model) and not _has_updated_at(model):
+        unchanged = (
+            current is not None
+            and previous.get("checksum") is not None
+            and current.get("count") == previous["count"]
+            and current.get("checksum") == previous["checksum"]
+        )
+        return queryset.none() if unchanged else queryset
+    condition = Q()
+    if previous.get("max_pk") is not None and _has_integer_pk(model):
+        max_pk = previous["max_pk"] - (SAFETY_WINDOW_IDS if window else 0)
+        condition |= Q(pk__gt=max_pk)
+    if previous.get("max_updated_at") is not None and _has_updated_at(model):
+        max_updated_at = datetime.fromisoformat(previous["max_updated_at"])
+        if window:
+            max_updated_at -= SAFETY_WINDOW
+        condition |= Q(updated_at__gt=max_updated_at)
+    return queryset.filter(condition) if condition else queryset
+
+
+def _sqlite_value(value: Any) -> Any:
+    """Convert a value read by Django into the representation of its SQLite backend."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return str(value)
+    if isinstance(value, (date, time, Decimal)):
+        return str(value)
+    if isinstance(value, UUID):
+        return value.hex
+    return value
+
+
+def _column_converters(model: type[Model]) -> list[Callable[[Any], Any]]:
+    def json_value(value: Any) -> Any:
+        return None if value is None else json.dumps(value)
+
+    return [
+        json_value if field.get_internal_type() == "JSONField" else _sqlite_value
+        for field in model._meta.concrete_fields
+    ]
+
+
+def _row_batches(
+    model: type[Model], queryset, batch_size: int
+) -> Iterator[list[tuple[Any, ...]]]:
+    """Rows of `queryset` in the column order of `model`, converted for SQLite."""
+    fields = model._meta.concrete_fields
+    converters = _column_converters(model)
+    batch: list[tuple[Any, ...]] = []
+    rows = queryset.values_list(*(field.attname for field in fields))
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(
+            tuple(convert(v) for convert, v in zip(converters, row, strict=True))
+        )
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert_statement(table: str, columns: list[str], *, replace: bool) -> str:
+    verb = "INSERT OR REPLACE" if replace else "INSERT"
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    placeholders = ", ".join("?" for _ in columns)
+    return f'{verb} INTO "{table}" ({column_list}) VALUES ({placeholders})'
+
+
+def _batched(rows: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _upsert_rows(
+    clone: sqlite3.Connection, model: type[Model], queryset, batch_size: int
+) -> set[Any]:
+    """Upsert the rows of `queryset` that are missing from the clone or differ.
+
+    Returns the primary keys of the upserted rows in the clone.
+    """
+    from lamin_cli.clone._clone_verification import (
+        _clone_text,
+        _row_hashes,
+        _source_text,
+    )
+
+    table = model._meta.db_table
+    fields = model._meta.concrete_fields
+    columns = [field.column for field in fields]
+    statement = _insert_statement(table, columns, replace=True)
+    pk_index = fields.index(model._meta.pk)
+    converters = _column_converters(model)
+    source_text = [_source_text(field) for field in fields]
+    clone_text = [_clone_text(field) for field in fields]
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    select = f'SELECT {column_list} FROM "{table}" WHERE "{model._meta.pk.column}" IN '
+    keys = set()
+    rows = queryset.values_list(*(field.attname for field in fields))
+    for batch in _batched(rows.iterator(chunk_size=batch_size), batch_size):
+        converted = [
+            tuple(convert(v) for convert, v in zip(converters, row, strict=True))
+            for row in batch
+        ]
+        pks = [row[pk_index] for row in converted]
+        stored_rows = clone.execute(f"{select}({', '.join('?' for _ in pks)})", pks)
+        stored = {
+            pk: row_hash
+            for pk, row_hash, _ in _row_hashes(stored_rows, clone_text, pk_index)
+        }
+        changed = [
+            sqlite_row
+            for (pk, row_hash, _), sqlite_row in zip(
+                _row_hashes(batch, source_text, pk_index), converted, strict=True
+            )
+            if stored.get(pk) != row_hash
+        ]
+        clone.executemany(statement, changed)
+        keys.update(row[pk_index] for row in changed)
+    return keys
+
+
+def _delete_missing_rows(
+    clone: sqlite3.Connection, model: type[Model], batch_size: int
+) -> set[Any]:
+    """Delete rows from the clone that no longer exist in the instance.
+
+    Returns the primary keys of the deleted rows.
+    """
+    table = model._meta.db_table
+    pk_column = model._meta.pk.column
+    clone.execute("CREATE TEMP TABLE IF NOT EXISTS _snapshot_keep (pk PRIMARY KEY)")
+    clone.execute("DELETE FROM _snapshot_keep")
+    pks = model._base_manager.values_list("pk", flat=True)
+    batch: list[tuple[Any]] = []
+    for pk in pks.iterator(chunk_size=batch_size):
+        batch.append((_sqlite_value(pk),))
+        if len(batch) == batch_size:
+            clone.executemany("INSERT INTO _snapshot_keep VALUES (?)", batch)
+            batch = []
+    clone.executemany("INSERT INTO _snapshot_keep VALUES (?)", batch)
+    missing = f'"{pk_column}" NOT IN (SELECT pk FROM _snapshot_keep)'
+    keys = {
+        pk
+        for (pk,) in clone.execute(
+            f'SELECT "{pk_column}" FROM "{table}" WHERE {missing}'
+        )
+    }
+    clone.execute(f'DELETE FROM "{table}" WHERE {missing}')
+    clone.execute("DELETE FROM _snapshot_keep")
+    return keys
+
+
+def apply_incremental_snapshot(
+    clone_db: Path,
+    models: Iterable[type[Model]],
+    previous: dict[str, dict[str, Any]],
+    watermarks: dict[str, dict[str, Any]],
+    *,
+    batch_size: int = DELTA_BATCH_SIZE,
+) -> dict[str, tuple[set[Any], set[Any]]]:
+    """Upsert rows changed since the `previous` marks into the clone.
+
+    `watermarks` are the current marks, taken before reading any rows.
+
+    Returns the primary keys of the upserted and deleted rows per changed table,
+    as stored in the clone.
+    """
+    changes: dict[str, tuple[set[Any], set[Any]]] = {}
+    clone = sqlite3.connect(clone_db)
+    try:
+        clone.execute("PRAGMA foreign_keys = OFF")
+        clone.execute("PRAGMA synchronous = OFF")
+        for model in models:
+            table = model._meta.db_table
+            with clone:
+                rows = _changed_rows(
+                    model, previous.get(table), watermarks.get(table), window=True
+                )
+                upserted = _upsert_rows(clone, model, rows, batch_size)
+                count = model._base_manager.count()
+                (clone_count,) = clone.execute(
+                    f'SELECT COUNT(*) FROM "{table}"'
+                ).fetchone()
+                deleted: set[Any] = set()
+                if clone_count > count:
+                    deleted = _delete_missing_rows(clone, model, batch_size)
+            if upserted or deleted:
+                changes[table] = (upserted, deleted)
+        clone.execute("PRAGMA synchronous = FULL")
+    finally:
+        clone.close()
+    return changes
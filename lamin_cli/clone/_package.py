@@ -0,0 +1,211 @@
+"""Package SQLite snapshots as independently compressed zstd frames.
+
+The clone is cut into frames of `FRAME_SIZE` bytes. Each frame is compressed with
+zstd on its own and stored under the SHA-256 of its uncompressed bytes in a
+`frames/` directory next to a `manifest.json` that lists the frames in order:
+
+    lamin.db.zst/
+        manifest.json
+        frames/<sha256>.zst
+
+Frames are compressed and uploaded on worker threads, one object per frame, so any
+object store that `UPath` supports works, and a local directory stands in for one
+in tests. Frames that already exist are skipped, which resumes interrupted uploads
+and only uploads the frames that changed since the previous snapshot. The manifest
+is written last, so readers never see a partial snapshot. Readers can fetch byte
+ranges or update a local copy by downloading only the frames they need.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+MANIFEST_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+FRAMES_DIR = "frames"
+# uncompressed bytes per frame
+FRAME_SIZE = 16 * 1024 * 1024
+ZSTD_LEVEL = 3
+TRANSFER_WORKERS = 8
+
+
+def _read_frames(path: Path, frame_size: int) -> Iterator[tuple[int, bytes]]:
+    with path.open("rb") as f:
+        offset = 0
+        while chunk := f.read(frame_size):
+            yield offset, chunk
+            offset += len(chunk)
+
+
+def _frame_path(destination: Path, digest: str) -> Path:
+    return destination / FRAMES_DIR / f"{digest}.zst"
+
+
+def _is_local(path: Path) -> bool:
+    return getattr(path, "protocol", "") in {"", "file", "local"}
+
+
+def _write_object(path: Path, data: bytes) -> None:
+    if _is_local(path):
+        # object stores write objects atomically, local files need a rename
+        tmp_path = path.with_name(f"{path.name}.partial")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+    else:
+        path.write_bytes(data)
+
+
+def _list_frames(frames_dir: Path) -> set[str]:
+    # one listing instead of a request per frame; object stores have no
+    # directories before their first object
+    return (
+        {path.name for path in frames_dir.iterdir()} if frames_dir.exists() else set()
+    )
+
+
+def read_manifest(source: Path) -> dict[str, Any] | None:
+    path = source / MANIFEST_FILE
+    if not path.exists():
+        return None
+    manifest = json.loads(path.read_bytes())
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def upload_snapshot(
+    sqlite_path: Path,
+    destination: Path,
+    *,
+    frame_size: int = FRAME_SIZE,
+    level: int = ZSTD_LEVEL,
+    max_workers: int = TRANSFER_WORKERS,
+) -> dict[str, int]:
+    """Upload the SQLite file as zstd frames and write its manifest.
+
+    Returns the number of frames, the frames uploaded and the compressed bytes
+    uploaded.
+    """
+    import zstandard
+
+    previous = read_manifest(destination)
+    frames_dir = destination / FRAMES_DIR
+    frames_dir.mkdir(parents=True, exist_ok=True)
+    existing = _list_frames(frames_dir)
+
+    def upload(digest: str, chunk: bytes) -> int:
+        data = zstandard.ZstdCompressor(level=level).compress(chunk)
+        _write_object(_frame_path(destination, digest), data)
+        return len(data)
+
+    frames = []
+    uploaded = 0
+    uploaded_bytes = 0
+    pending: deque[Future[int]] = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for offset, chunk in _read_frames(sqlite_path, frame_size):
+            digest = hashlib.sha256(chunk).hexdigest()
+            frames.append({"offset": offset, "size": len(chunk), "sha256": digest})
+            if f"{digest}.zst" in existing:
+                continue
+            existing.add(f"{digest}.zst")
+            pending.append(executor.submit(upload, digest, chunk))
+            uploaded += 1
+            # bound the frames held in memory
+            if len(pending) >= 2 * max_workers:
+                uploaded_bytes += pending.popleft().result()
+        uploaded_bytes += sum(future.result() for future in pending)
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "frame_size": frame_size,
+        "size": sum(frame["size"] for frame in frames),
+        "frames": frames,
+    }
+    _write_object(destination / MANIFEST_FILE, json.dumps(manifest).encode())
+
+    # readers of the previous manifest can still fetch its frames
+    keep = {
+        f"{frame['sha256']}.zst"
+        for frame in frames + (previous["frames"] if previous else [])
+    }
+    for name in _list_frames(frames_dir) - keep:
+        (frames_dir / name).unlink()
+    return {
+        "frames": len(frames),
+        "uploaded": uploaded,
+        "uploaded_bytes": uploaded_bytes,
+    }
+
+
+def _fetch_frame(source: Path, frame: dict[str, Any]) -> bytes:
+    import zstandard
+
+    data = zstandard.ZstdDecompressor().decompress(
+        _frame_path(source, frame["sha256"]).read_bytes(),
+        max_output_size=frame["size"],
+    )
+    if hashlib.sha256(data).hexdigest() != frame["sha256"]:
+        raise ValueError(f"Frame {frame['sha256']} of {source} is corrupted.")
+    return data
+
+
+def read_snapshot_range(source: Path, offset: int, length: int) -> bytes:
+    """Read `length` bytes at `offset` of a snapshot, fetching only their frames."""
+    manifest = read_manifest(source)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot manifest at {source}")
+    end = min(offset + length, manifest["size"])
+    parts = []
+    for frame in manifest["frames"]:
+        frame_end = frame["offset"] + frame["size"]
+        if frame_end <= offset or frame["offset"] >= end:
+            continue
+        data = _fetch_frame(source, frame)
+        parts.append(data[max(offset - frame["offset"], 0) : end - frame["offset"]])
+    return b"".join(parts)
+
+
+def download_snapshot(
+    source: Path, local_path: Path, *, max_workers: int = TRANSFER_WORKERS
+) -> dict[str, int]:
+    """Update a local copy of a snapshot, fetching only frames that differ.
+
+    Returns the number of frames and the frames downloaded.
+    """
+    manifest = read_manifest(source)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot manifest at {source}")
+    local = (
+        {
+            offset: hashlib.sha256(chunk).hexdigest()
+            for offset, chunk in _read_frames(local_path, manifest["frame_size"])
+        }
+        if local_path.exists()
+        else {}
+    )
+    missing = [
+        frame
+        for frame in manifest["frames"]
+        if local.get(frame["offset"]) != frame["sha256"]
+    ]
+    local_path.parent.mkdir(parents=True, exist_ok=True)
+    with local_path.open("r+b" if local_path.exists() else "wb") as f:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for frame, data in zip(
+                missing,
+                executor.map(lambda frame: _fetch_frame(source, frame), missing),
+                strict=True,
+            ):
+                f.seek(frame["offset"])
+                f.write(data)
+        f.truncate(manifest["size"])
+    return {"frames": len(manifest["frames"]), "downloaded": len(missing)}
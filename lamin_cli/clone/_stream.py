@@ -0,0 +1,165 @@
+"""Stream tables from an instance into a SQLite clone.
+
+The process connected to the instance reads tables on worker threads, level by
+level of `dependency_levels`, and sends each as a header frame followed by frames
+of converted rows over a pipe. The process that created the clone reads frames on
+a thread into a bounded queue and writes them with a `CloneWriter`. Pipe and
+queues are bounded, so memory stays proportional to the chunk size and nothing is
+written to disk besides the clone.
+"""
+
+from __future__ import annotations
+
+import pickle
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, BinaryIO
+
+from lamin_cli.clone._import import IMPORT_WORKERS, CloneWriter, dependency_levels
+from lamin_cli.clone._incremental import _row_batches
+
+if TYPE_CHECKING:
+    import sqlite3
+    from collections.abc import Iterable
+
+    from django.db.models import Model
+
+# rows per frame
+STREAM_CHUNK_SIZE = 5_000
+# frames buffered on either side of the pipe
+STREAM_QUEUE_SIZE = 4
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _put(frames: queue.Queue, frame: tuple[Any, ...], cancelled: threading.Event):
+    while True:
+        if cancelled.is_set():
+            raise _Cancelled
+        try:
+            frames.put(frame, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def _read_table(
+    model: type[Model],
+    frames: queue.Queue,
+    cancelled: threading.Event,
+    chunk_size: int,
+) -> None:
+    from django.db import connection
+
+    table = model._meta.db_table
+    columns = [field.column for field in model._meta.concrete_fields]
+    try:
+        _put(frames, ("table", table, columns), cancelled)
+        for batch in _row_batches(model, model._base_manager.all(), chunk_size):
+            _put(frames, ("rows", table, batch), cancelled)
+    finally:
+        # every worker thread opens its own connection
+        connection.close()
+
+
+def _read_tables(
+    models: Iterable[type[Model]],
+    frames: queue.Queue,
+    cancelled: threading.Event,
+    chunk_size: int,
+    max_workers: int,
+) -> None:
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for level in dependency_levels(models):
+                futures = [
+                    executor.submit(_read_table, model, frames, cancelled, chunk_size)
+                    for model in level
+                ]
+                for future in futures:
+                    future.result()
+        _put(frames, ("end",), cancelled)
+    except _Cancelled:
+        pass
+    except BaseException as error:
+        try:
+            _put(frames, ("error", error), cancelled)
+        except _Cancelled:
+            pass
+
+
+def send_tables(
+    models: Iterable[type[Model]],
+    stream: BinaryIO,
+    *,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    max_workers: int = IMPORT_WORKERS,
+    queue_size: int = STREAM_QUEUE_SIZE,
+) -> None:
+    """Write all rows of `models` to `stream` as frames for `receive_tables`."""
+    frames: queue.Queue[tuple[Any, ...]] = queue.Queue(maxsize=queue_size)
+    cancelled = threading.Event()
+    reader = threading.Thread(
+        target=_read_tables,
+        args=(models, frames, cancelled, chunk_size, max_workers),
+        name="lamin-snapshot-reader",
+    )
+    reader.start()
+    try:
+        while True:
+            frame = frames.get()
+            if frame[0] == "error":
+                raise frame[1]
+            pickle.dump(frame, stream, protocol=pickle.HIGHEST_PROTOCOL)
+            if frame[0] == "end":
+                break
+        stream.flush()
+    finally:
+        cancelled.set()
+        reader.join()
+
+
+def _read_frames(stream: BinaryIO, frames: queue.Queue) -> None:
+    try:
+        while True:
+            frame = pickle.load(stream)
+            frames.put(frame)
+            if frame[0] == "end":
+                return
+    except BaseException as error:
+        frames.put(("error", error))
+
+
+def receive_tables(
+    stream: BinaryIO,
+    clone: sqlite3.Connection,
+    *,
+    queue_size: int = STREAM_QUEUE_SIZE,
+) -> CloneWriter:
+    """Replace the rows of the clone's tables with the frames read from `stream`.
+
+    Raises `RuntimeError` if the stream ends before the sender finished.
+    """
+    frames: queue.Queue[tuple[Any, ...]] = queue.Queue(maxsize=queue_size)
+    reader = threading.Thread(
+        target=_read_frames, args=(stream, frames), name="lamin-clone-reader"
+    )
+    reader.daemon = True
+    reader.start()
+
+    writer = CloneWriter(clone)
+    while True:
+        frame = frames.get()
+        if frame[0] == "table":
+            writer.begin(frame[1], frame[2])
+        elif frame[0] == "rows":
+            writer.write(frame[1], frame[2])
+        elif frame[0] == "error":
+            raise RuntimeError("The snapshot stream ended early.") from frame[1]
+        else:
+            break
+    clone.commit()
+    return writer
@@ -0,0 +1,426 @@
+"""Upsert exported tables into the connected instance.
+
+Rows are matched on `uid`, or on the unique constraint of link tables, because
+primary keys differ between instances. Tables are merged in levels of
+`dependency_levels`. Every chunk of a table's parquet files is loaded into a
+temporary staging table and merged with one `INSERT ... ON CONFLICT` statement.
+
+Foreign keys are remapped in the staging table before the merge, with one
+`UPDATE` per column. The `(id, uid)` pairs of every referenced table are loaded
+from the export, or from the id map of a table that wasn't exported, into a
+temporary table once and joined by `uid` with the rows of the instance.
+References to rows merged later, such as self-references, are remapped again in
+a final pass. Foreign keys that can't be remapped, and references to rows of
+tables that weren't exported and aren't in the instance, abort the upsert.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Any
+
+from lamin_cli.clone._export import ExportManifest, _unique_uid
+from lamin_cli.clone._import import dependency_levels
+from lamin_cli.clone._incremental import _sqlite_value
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from pathlib import Path
+
+    from django.db.models import Field, Model
+
+# rows merged per statement
+UPSERT_CHUNK_SIZE = 100_000
+
+_STAGING_TABLE = "_upsert_staging"
+_AUTO_FIELDS = {"AutoField", "BigAutoField", "SmallAutoField"}
+
+
+def _upsert_key(model: type[Model]) -> list[str] | None:
+    """Columns that identify a row across instances."""
+    from django.db.models import UniqueConstraint
+
+    uid = _unique_uid(model)
+    if uid is not None:
+        return [uid.column]
+    unique_fields = [list(names) for names in model._meta.unique_together] + [
+        list(constraint.fields)
+        for constraint in model._meta.constraints
+        if isinstance(constraint, UniqueConstraint)
+        and constraint.fields
+        and constraint.condition is None
+    ]
+    if not unique_fields:
+        return None
+    return [model._meta.get_field(name).column for name in unique_fields[0]]
+
+
+def _parquet_files(
+    directory: Path, table: str, manifest: ExportManifest | None
+) -> list[Path]:
+    if manifest is not None:
+        entry = manifest.table(table)
+        if entry is None:
+            return []
+        return [directory / chunk["file"] for chunk in entry["chunks"]]
+    path = directory / f"{table}.parquet"
+    if path.is_dir():
+        return sorted(path.glob("*.parquet"))
+    return [path] if path.exists() else []
+
+
+def _id_map_files(
+    directory: Path, table: str, manifest: ExportManifest | None
+) -> list[Path]:
+    entry = None if manifest is None else manifest.id_map(table)
+    return [] if entry is None else [directory / entry["file"]]
+
+
+def _parquet_columns(model: type[Model], files: list[Path]) -> list[str]:
+    import pyarrow.parquet as pq
+
+    names = set(pq.read_schema(files[0]).names)
+    return [
+        field.column for field in model._meta.concrete_fields if field.column in names
+    ]
+
+
+def _parquet_batches(
+    files: list[Path], columns: list[str], chunk_size: int
+) -> Iterator[list[tuple[Any, ...]]]:
+    import pyarrow.parquet as pq
+
+    for file in files:
+        batches = pq.ParquetFile(file).iter_batches(
+            batch_size=chunk_size, columns=columns
+        )
+        for batch in batches:
+            if batch.num_rows:
+                yield list(
+                    zip(*(column.to_pylist() for column in batch.columns), strict=True)
+                )
+
+
+def _staging_converters(
+    model: type[Model], columns: list[str], vendor: str
+) -> list[Callable[[Any], Any]]:
+    fields = {field.column: field for field in model._meta.concrete_fields}
+
+    def converter(field: Field) -> Callable[[Any], Any]:
+        is_boolean = field.get_internal_type() == "BooleanField"
+
+        def convert(value: Any) -> Any:
+            # postgres exports booleans as 't'/'f' and NULL as empty strings
+            if value == "" and field.null:
+                return None
+            if is_boolean and isinstance(value, str):
+                return value == "t"
+            if isinstance(value, (dict, list)):
+                return json.dumps(value)
+            return _sqlite_value(value) if vendor == "sqlite" else value
+
+        return convert
+
+    return [converter(fields[column]) for column in columns]
+
+
+def _column_list(columns: Iterable[str]) -> str:
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+def _create_like(cursor, name: str, table: str, columns: str) -> None:
+    # copies the column types without constraints or rows
+    cursor.execute(
+        f'CREATE TEMP TABLE "{name}" AS SELECT {columns} FROM "{table}" WHERE 1 = 0'
+    )
+
+
+def _load_id_map(
+    cursor,
+    model: type[Model],
+    files: list[Path],
+    name: str,
+    chunk_size: int,
+) -> None:
+    """Load the `(id, uid)` pairs of the exported rows of `model` into `name`."""
+    pk = model._meta.pk.column
+    uid = _unique_uid(model).column
+    table = model._meta.db_table
+    _create_like(cursor, name, table, f'"{pk}" AS source_id, "{uid}" AS uid')
+    for rows in _parquet_batches(files, [pk, uid], chunk_size):
+        cursor.executemany(f'INSERT INTO "{name}" VALUES (%s, %s)', rows)
+    cursor.execute(f'CREATE INDEX "{name}_source_id" ON "{name}" (source_id)')
+
+
+def _remap_statement(
+    table: str, column: str, target: type[Model], id_map: str, rows: str
+) -> str:
+    """Replace exported ids in `table.column` by the ids of the same uids.
+
+    `rows` selects the exported ids from the rows of `table`.
+    """
+    pk = target._meta.pk.column
+    uid = _unique_uid(target).column
+    match = (
+        f'FROM "{target._meta.db_table}" r JOIN "{id_map}" m ON m.uid = r."{uid}" '
+        f"WHERE m.source_id = {rows}"
+    )
+    return (
+        f'UPDATE "{table}" SET "{column}" = (SELECT r."{pk}" {match}) '
+        f"WHERE EXISTS (SELECT 1 {match})"
+    )
+
+
+def _unmatched_statement(column: str, target: type[Model], id_map: str) -> str:
+    """Count staging rows whose `column` references no row of the instance."""
+    uid = _unique_uid(target).column
+    return (
+        f'SELECT COUNT(*) FROM "{_STAGING_TABLE}" s WHERE s."{column}" IS NOT NULL '
+        f'AND NOT EXISTS (SELECT 1 FROM "{target._meta.db_table}" r '
+        f'JOIN "{id_map}" m ON m.uid = r."{uid}" WHERE m.source_id = s."{column}")'
+    )
+
+
+def _merge_statement(model: type[Model], columns: list[str], key: list[str]) -> str:
+    """Merge the staging table into the table of `model`."""
+    pk = model._meta.pk
+    # new rows get primary keys of this instance
+    if pk.get_internal_type() in _AUTO_FIELDS:
+        columns = [column for column in columns if column != pk.column]
+    updated = [column for column in columns if column not in key]
+    if updated:
+        action = "DO UPDATE SET " + ", ".join(
+            f'"{column}" = excluded."{column}"' for column in updated
+        )
+    else:
+        action = "DO NOTHING"
+    # SQLite needs a WHERE clause to parse ON CONFLICT after a SELECT
+    return (
+        f'INSERT INTO "{model._meta.db_table}" ({_column_list(columns)}) '
+        f'SELECT {_column_list(columns)} FROM "{_STAGING_TABLE}" WHERE 1 = 1 '
+        f"ON CONFLICT ({_column_list(key)}) {action}"
+    )
+
+
+def upsert_tables(
+    models: Iterable[type[Model]],
+    directory: Path,
+    *,
+    chunk_size: int = UPSERT_CHUNK_SIZE,
+    on_table: Callable[[str, tuple[int, int] | None], None] | None = None,
+) -> dict[str, tuple[int, int]]:
+    """Upsert the exported rows of `models` into the connected instance.
+
+    All tables are merged in one transaction. Tables without a `uid` or unique
+    constraint can't be matched and are skipped.
+
+    Args:
+        models: Models whose exported tables are merged.
+        directory: Directory of the export, with or without its manifest.
+        chunk_size: Rows loaded into the staging table and merged at a time.
+        on_table: Called with the table name and its merged rows and chunks once
+            a table is merged, or with `None` if it was skipped.
+
+    Returns:
+        The number of merged rows and chunks per merged table.
+
+    Raises:
+        ValueError: If the export is incomplete, if a foreign key references a
+            table without `uid` or one that is neither exported nor has an id map,
+            or if it references rows that aren't in the instance.
+    """
+    from django.db import connection, transaction
+
+    manifest = ExportManifest.load(directory)
+    if manifest is not None and not manifest.data["complete"]:
+        raise ValueError(
+            f"The export in {directory} is incomplete, rerun the export to complete it."
+        )
+    files = {}
+    for model in models:
+        table_files = _parquet_files(directory, model._meta.db_table, manifest)
+        if table_files:
+            files[model._meta.db_table] = (model, table_files)
+    columns_of = {
+        table: _parquet_columns(model, table_files)
+        for table, (model, table_files) in files.items()
+    }
+    levels = dependency_levels([model for model, _ in files.values()])
+    level_of = {
+        model._meta.db_table: index
+        for index, level in enumerate(levels)
+        for model in level
+    }
+
+    def id_files(target: type[Model]) -> list[Path]:
+        """Files with the exported `(id, uid)` pairs of `target`."""
+        table = target._meta.db_table
+        if _unique_uid(target) is None:
+            return []
+        if table in files:
+            return files[table][1]
+        return _id_map_files(directory, table, manifest)
+
+    def foreign_keys(model: type[Model]) -> Iterator[Field]:
+        """Exported columns that reference the primary key of another table."""
+        for field in model._meta.concrete_fields:
+            if (
+                field.is_relation
+                and field.target_field.primary_key
+                and field.column in columns_of[model._meta.db_table]
+            ):
+                yield field
+
+    def references(model: type[Model]) -> Iterator[tuple[str, type[Model]]]:
+        """Foreign key columns whose values can be remapped by uid."""
+        for field in foreign_keys(model):
+            if id_files(field.related_model):
+                yield field.column, field.related_model
+
+    def is_skipped(model: type[Model]) -> bool:
+        key = _upsert_key(model)
+        return key is None or not set(key) <= set(columns_of[model._meta.db_table])
+
+    # ids of the source instance mustn't be written into this one
+    unmapped = [
+        f"{model._meta.db_table}.{field.column} -> {field.related_model._meta.db_table}"
+        for model, _ in files.values()
+        if not is_skipped(model)
+        for field in foreign_keys(model)
+        if not id_files(field.related_model)
+    ]
+    if unmapped:
+        raise ValueError(
+            "Can't remap these foreign keys by uid, the tables they reference have "
+            "no uid or neither their rows nor their ids are in the export: "
+            f"{', '.join(unmapped)}. Export again with `lamin io exportdb` to "
+            "include the ids of referenced tables."
+        )
+
+    merged: dict[str, tuple[int, int]] = {}
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+        id_maps: dict[str, str] = {}
+        for model, _ in files.values():
+            if is_skipped(model):
+                continue
+            for _, target in references(model):
+                table = target._meta.db_table
+                if table not in id_maps:
+                    id_maps[table] = f"_upsert_ids_{len(id_maps)}"
+                    _load_id_map(
+                        cursor, target, id_files(target), id_maps[table], chunk_size
+                    )
+        # (table, column, key, target, table of the exported ids by key)
+        deferred: list[tuple[str, str, list[str], type[Model], str]] = []
+
+        for level in levels:
+            for model in level:
+                table = model._meta.db_table
+                table_files = files[table][1]
+                columns = columns_of[table]
+                if is_skipped(model):
+                    if on_table is not None:
+                        on_table(table, None)
+                    continue
+                key = _upsert_key(model)
+                column_list = _column_list(columns)
+                _create_like(cursor, _STAGING_TABLE, table, column_list)
+                remaps = []
+                table_deferred = []
+                # (column, referenced table, count of rows that can't be remapped)
+                checks = []
+                for column, target in references(model):
+                    if target._meta.db_table not in files:
+                        # rows of tables that weren't exported must exist here
+                        checks.append(
+                            (
+                                column,
+                                target._meta.db_table,
+                                _unmatched_statement(
+                                    column, target, id_maps[target._meta.db_table]
+                                ),
+                            )
+                        )
+                    remaps.append(
+                        _remap_statement(
+                            _STAGING_TABLE,
+                            column,
+                            target,
+                            id_maps[target._meta.db_table],
+                            f'"{_STAGING_TABLE}"."{column}"',
+                        )
+                    )
+                    # rows of the same or a later level aren't merged yet
+                    target_level = level_of.get(target._meta.db_table, -1)
+                    if target_level >= level_of[table] and column not in key:
+                        name = f"_upsert_deferred_{len(deferred)}"
+                        _create_like(
+                            cursor,
+                            name,
+                            table,
+                            f'{_column_list(key)}, "{column}" AS source_id',
+                        )
+                        table_deferred.append(
+                            f'INSERT INTO "{name}" SELECT {_column_list(key)}, '
+                            f'"{column}" FROM "{_STAGING_TABLE}" '
+                            f'WHERE "{column}" IS NOT NULL'
+                        )
+                        deferred.append((table, column, key, target, name))
+                insert = (
+                    f'INSERT INTO "{_STAGING_TABLE}" ({column_list}) '
+                    f"VALUES ({', '.join('%s' for _ in columns)})"
+                )
+                merge = _merge_statement(model, columns, key)
+                converters = _staging_converters(model, columns, connection.vendor)
+                n_rows = n_chunks = 0
+                for rows in _parquet_batches(table_files, columns, chunk_size):
+                    cursor.execute(f'DELETE FROM "{_STAGING_TABLE}"')
+                    cursor.executemany(
+                        insert,
+                        [
+                            tuple(
+                                convert(value)
+                                for convert, value in zip(converters, row, strict=True)
+                            )
+                            for row in rows
+                        ],
+                    )
+                    for column, target_table, check in checks:
+                        cursor.execute(check)
+                        (unmatched,) = cursor.fetchone()
+                        if unmatched:
+                            raise ValueError(
+                                f"{unmatched} rows of {table}.{column} reference rows "
+                                f"of {target_table} that aren't in this instance, "
+                                f"export and upsert {target_table} too."
+                            )
+                    for statement in table_deferred + remaps:
+                        cursor.execute(statement)
+                    cursor.execute(merge)
+                    n_rows += len(rows)
+                    n_chunks += 1
+                cursor.execute(f'DROP TABLE "{_STAGING_TABLE}"')
+                merged[table] = (n_rows, n_chunks)
+                if on_table is not None:
+                    on_table(table, merged[table])
+
+        for table, column, key, target, name in deferred:
+            cursor.execute(
+                f'CREATE INDEX "{name}_key" ON "{name}" ({_column_list(key)})'
+            )
+            matches_key = " AND ".join(f'd."{k}" = "{table}"."{k}"' for k in key)
+            cursor.execute(
+                _remap_statement(
+                    table,
+                    column,
+                    target,
+                    id_maps[target._meta.db_table],
+                    f'(SELECT d.source_id FROM "{name}" d WHERE {matches_key})',
+                )
+            )
+            cursor.execute(f'DROP TABLE "{name}"')
+        for name in id_maps.values():
+            cursor.execute(f'DROP TABLE "{name}"')
+    return merged
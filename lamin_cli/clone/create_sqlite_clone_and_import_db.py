@@ -6,19 +6,16 @@ from pathlib import Path
 import lamindb_setup as ln_setup
 
 if __name__ == "__main__":
-    from lamindb_setup.io import import_db
-
     sys.path.insert(0, str(Path(__file__).parent.parent))
 
     parser = argparse.ArgumentParser()
     parser.add_argument("--instance-name", required=True)
-    parser.add_argument("--export-dir", required=True)
     parser.add_argument("--modules", required=True)
-    parser.add_argument("--original-counts", required=True)
+    # the snapshot command verifies clones with checksums instead
+    parser.add_argument("--original-counts", default=None)
     args = parser.parse_args()
 
     instance_name = args.instance_name
-    export_dir = args.export_dir
     modules_without_lamindb = {m for m in args.modules.split(",") if m}
     modules_complete = modules_without_lamindb.copy()
     modules_complete.add("lamindb")
@@ -27,27 +24,42 @@ if __name__ == "__main__":
         storage=f"{instance_name}-clone", modules=f"{','.join(modules_without_lamindb)}"
     )
 
-    import_db(
-        module_names=list(modules_complete), input_dir=export_dir, if_exists="replace"
-    )
+    import sqlite3
+
+    from django.db import connection, connections
 
-    from django.db import connection
+    from lamin_cli.clone._import import bulk_load
+    from lamin_cli.clone._incremental import _snapshot_models
+    from lamin_cli.clone._stream import receive_tables
+
+    models = _snapshot_models(modules_complete)
+    connections.close_all()
+    clone = sqlite3.connect(ln_setup.settings.instance._sqlite_file_local)
+    try:
+        # tables are streamed through stdin
+        with bulk_load(clone):
+            writer = receive_tables(sys.stdin.buffer, clone)
+    except RuntimeError as error:
+        print(f"{error} {error.__cause__!r}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        clone.close()
+    print("\n".join(writer.report()))
 
     with connection.cursor() as cursor:
         cursor.execute("PRAGMA wal_checkpoint(FULL)")
 
-    from lamin_cli.clone._clone_verification import (
-        _compare_record_counts,
-        _count_instance_records,
-    )
-
-    clone_counts = _count_instance_records()
-    original_counts = json.loads(args.original_counts)
-    mismatches = _compare_record_counts(original_counts, clone_counts)
-    if mismatches:
-        print(json.dumps(mismatches), file=sys.stderr)
-        sys.exit(1)
+    if args.original_counts is not None:
+        from lamin_cli.clone._clone_verification import (
+            _compare_record_counts,
+            _count_instance_records,
+        )
 
-    from django.db import connections
+        clone_counts = _count_instance_records()
+        original_counts = json.loads(args.original_counts)
+        mismatches = _compare_record_counts(original_counts, clone_counts)
+        if mismatches:
+            print(json.dumps(mismatches), file=sys.stderr)
+            sys.exit(1)
 
     connections.close_all()
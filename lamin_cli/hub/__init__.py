@@ -1,7 +1,14 @@
 from __future__ import annotations
 
+from ._cache import ResponseCache, cache
 from ._click import hub_group
-from ._client import instance_url, module_model_path, request_json
+from ._client import (
+    HubClient,
+    get_hub_client,
+    instance_url,
+    module_model_path,
+    request_json,
+)
 from ._mutations import delete, insert, update, upsert
 from ._query import get_record, list_records
 from ._schema import schema
@@ -27,8 +34,12 @@ hub.add_command(insert)
 hub.add_command(upsert)
 hub.add_command(update)
 hub.add_command(delete)
+hub.add_command(cache)
 
 __all__ = [
+    "HubClient",
+    "ResponseCache",
+    "get_hub_client",
     "request_json",
     "hub",
     "instance_url",
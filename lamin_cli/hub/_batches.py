@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import base64
+import csv
+import datetime
+import json
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from decimal import Decimal
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TextIO
+from uuid import UUID
+
+from ._click import click
+from ._client import HubRequestError
+from ._utils import _print_json, _read_objects
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+FORMATS = ("json", "ndjson", "csv", "parquet")
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# a rate-limited request wasn't processed, so even inserts can be sent again
+RETRY_UNPROCESSED_STATUS_CODES = {429}
+# seconds waited at most before a retry, whatever Retry-After asks for
+MAX_RETRY_DELAY = 60.0
+
+
+def _infer_format(source: str) -> str:
+    suffix = Path(source).suffix.lower()
+    if suffix in {".ndjson", ".jsonl"}:
+        return "ndjson"
+    if suffix in {".csv", ".parquet", ".json"}:
+        return suffix[1:]
+    raise click.ClickException(
+        f"Cannot infer the format of {source}, pass --format {'|'.join(FORMATS)}"
+    )
+
+
+def iter_objects(source: str, format: str | None = None) -> Iterator[dict[str, Any]]:
+    """Read objects from a file or `-` for stdin, incrementally except for JSON.
+
+    CSV values are strings, empty values become `None`. Parquet values become JSON
+    types: dates and times ISO strings, decimals strings, durations seconds and
+    binary values base64.
+    """
+    format = format or ("ndjson" if source == "-" else _infer_format(source))
+    if format == "json":
+        value = "-" if source == "-" else f"@{source}"
+        yield from _read_objects(value, "--from", allow_object=False)
+    elif format == "ndjson":
+        with _open_text(source) as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    obj = json.loads(line)
+                except json.JSONDecodeError as error:
+                    raise click.ClickException(
+                        f"--from line {line_number} must be valid JSON: {error}"
+                    ) from error
+                if not isinstance(obj, dict):
+                    raise click.ClickException(
+                        f"--from line {line_number} must be a JSON object"
+                    )
+                yield obj
+    elif format == "csv":
+        with _open_text(source) as f:
+            for row in csv.DictReader(f):
+                yield {
+                    key: value if value != "" else None for key, value in row.items()
+                }
+    elif format == "parquet":
+        if source == "-":
+            raise click.ClickException("Parquet can't be read from stdin")
+        try:
+            import pyarrow.parquet as pq  # pyright: ignore[reportMissingImports]
+        except ImportError as error:
+            raise click.ClickException(
+                "Reading parquet requires pyarrow: pip install pyarrow"
+            ) from error
+        for record_batch in pq.ParquetFile(source).iter_batches():
+            for row in record_batch.to_pylist():
+                yield {key: _json_value(value) for key, value in row.items()}
+    else:
+        raise click.ClickException(f"--format must be one of {', '.join(FORMATS)}")
+
+
+def _json_value(value: Any) -> Any:
+    """Convert a value read from parquet to a type that JSON can encode."""
+    if isinstance(value, dict):
+        return {key: _json_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_value(item) for item in value]
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (Decimal, UUID)):
+        # a string keeps the precision of decimals
+        return str(value)
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    return value
+
+
+@contextmanager
+def _open_text(source: str) -> Iterator[TextIO]:
+    if source == "-":
+        yield sys.stdin
+    else:
+        with Path(source).open(newline="") as f:
+            yield f
+
+
+def iter_batches(
+    objects: Iterable[dict[str, Any]], batch_size: int
+) -> Iterator[list[dict[str, Any]]]:
+    iterator = iter(objects)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+class Checkpoint:
+    """Indices of sent batches, written atomically after each batch."""
+
+    def __init__(self, path: str | None, source: str | None, batch_size: int):
+        self.path = None if path is None else Path(path)
+        if source is not None and source != "-":
+            source = Path(source).resolve().as_posix()
+        self.source = source
+        self.batch_size = batch_size
+        self.done: set[int] = set()
+        if self.path is not None and self.path.exists():
+            state = json.loads(self.path.read_text())
+            if (state["source"], state["batch_size"]) != (self.source, batch_size):
+                raise click.ClickException(
+                    f"Checkpoint {self.path} is for {state['source']} with batch size"
+                    f" {state['batch_size']}, pass the same --from and --batch-size"
+                )
+            self.done = set(state["done"])
+
+    def mark_done(self, index: int) -> None:
+        self.done.add(index)
+        if self.path is None:
+            return
+        state = {
+            "source": self.source,
+            "batch_size": self.batch_size,
+            "done": sorted(self.done),
+        }
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        tmp_path.write_text(json.dumps(state))
+        tmp_path.replace(self.path)
+
+    def remove(self) -> None:
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+def _is_retryable(error: click.ClickException, *, idempotent: bool = True) -> bool:
+    """Whether the request can be sent again.
+
+    A request that timed out or failed with a 5xx status may have been processed,
+    so only idempotent requests are retried then.
+    """
+    if not isinstance(error, HubRequestError):
+        return False
+    if not idempotent:
+        return error.status_code in RETRY_UNPROCESSED_STATUS_CODES
+    return error.status_code is None or error.status_code in RETRY_STATUS_CODES
+
+
+def _with_retries(
+    send: Callable[[list[dict[str, Any]]], Any],
+    batch: list[dict[str, Any]],
+    max_retries: int,
+    idempotent: bool,
+) -> Any:
+    for attempt in range(max_retries + 1):
+        try:
+            return send(batch)
+        except HubRequestError as error:
+            if (
+                not _is_retryable(error, idempotent=idempotent)
+                or attempt == max_retries
+            ):
+                raise
+            delay = error.retry_after
+            if delay is None:
+                delay = min(30.0, 0.5 * 2**attempt) * (0.5 + random.random() / 2)
+            time.sleep(min(delay, MAX_RETRY_DELAY))
+
+
+def send_batches(
+    objects: Iterable[dict[str, Any]],
+    send: Callable[[list[dict[str, Any]]], Any],
+    *,
+    batch_size: int,
+    max_workers: int,
+    max_retries: int,
+    checkpoint: Checkpoint,
+    idempotent: bool,
+    failed_rows: Callable[[list[dict[str, Any]]], Any] | None = None,
+) -> None:
+    """Send batches of objects concurrently and print one report line per batch.
+
+    At most `max_workers` batches are read ahead. Batches in the checkpoint are
+    skipped. Reports of failed batches list `failed_rows(batch)` if passed. If a
+    batch is rejected, the remaining batches are still sent; if the hub stays
+    unavailable after all retries, no further batches are sent. Batches of
+    requests that aren't `idempotent`, such as inserts, are only retried when
+    they were rate-limited.
+    """
+    n_sent, n_rows, failed = 0, 0, []
+    stop = False
+    batches = (
+        (index, batch)
+        for index, batch in enumerate(iter_batches(objects, batch_size))
+        if index not in checkpoint.done
+    )
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: dict = {}
+
+        def submit() -> bool:
+            item = next(batches, None)
+            if item is None:
+                return False
+            index, batch = item
+            future = executor.submit(
+                _with_retries, send, batch, max_retries, idempotent
+            )
+            pending[future] = (index, batch)
+            return True
+
+        while len(pending) < max_workers and submit():
+            pass
+        while pending:
+            completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                index, batch = pending.pop(future)
+                report: dict[str, Any] = {"batch": index, "rows": len(batch)}
+                try:
+                    report["response"] = future.result()
+                except click.ClickException as error:
+                    failed.append(index)
+                    stop = stop or _is_retryable(error)
+                    report["error"] = error.message
+                    if failed_rows is not None:
+                        report["failed"] = failed_rows(batch)
+                else:
+                    checkpoint.mark_done(index)
+                    n_sent += 1
+                    n_rows += len(batch)
+                _print_json(report, compact=True)
+                if not stop:
+                    submit()
+    if failed:
+        resume = (
+            f", resume with --checkpoint {checkpoint.path}"
+            if checkpoint.path is not None
+            else ""
+        )
+        raise click.ClickException(
+            f"{len(failed)} batches failed, sent {n_sent} batches ({n_rows} rows)"
+            f"{resume}"
+        )
+    checkpoint.remove()
+    click.echo(f"sent {n_sent} batches ({n_rows} rows)", err=True)
+
+
+def batch_options(f):
+    """Options for streaming objects from a file in concurrent batches."""
+    options = [
+        click.option(
+            "--from",
+            "from_",
+            help="Stream objects from a JSON, NDJSON, CSV, or Parquet file, or - for NDJSON on stdin.",
+        ),
+        click.option(
+            "--format",
+            "format_",
+            type=click.Choice(FORMATS),
+            help="Format of --from, inferred from its suffix by default.",
+        ),
+        click.option(
+            "--batch-size",
+            type=click.IntRange(min=1),
+            default=1000,
+            show_default=True,
+            help="Objects per request; longer update and delete --objects lists are sent in batches, too.",
+        ),
+        click.option(
+            "--max-workers",
+            type=click.IntRange(min=1),
+            default=4,
+            show_default=True,
+            help="Concurrent batch requests.",
+        ),
+        click.option(
+            "--max-retries",
+            type=click.IntRange(min=0),
+            default=5,
+            show_default=True,
+            help="Retries of a batch on 429, 5xx, and connection errors; insert batches are only retried on 429.",
+        ),
+        click.option(
+            "--checkpoint",
+            help="File recording sent batches; rerun with it to resume a failed load.",
+        ),
+    ]
+    for option in reversed(options):
+        f = option(f)
+    return f
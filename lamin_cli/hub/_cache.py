@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from ._click import click
+
+CACHE_ENV_VAR = "LAMIN_HUB_CACHE"
+CACHE_DIR_ENV_VAR = "LAMIN_HUB_CACHE_DIR"
+CACHE_MAX_BYTES_ENV_VAR = "LAMIN_HUB_CACHE_MAX_BYTES"
+DEFAULT_MAX_BYTES = 100 * 2**20
+
+# (method, path pattern, TTL in seconds) of cached read endpoints, first match wins
+CACHE_TTLS: list[tuple[str, re.Pattern[str], float]] = [
+    ("get", re.compile(r"statistics"), 300),
+    ("get", re.compile(r"modules/[^/]+/[^/]+/[^/]+/counts"), 300),
+    ("post", re.compile(r"modules/core/branch"), 30),
+    ("post", re.compile(r"modules/[^/]+/[^/]+"), 60),
+    ("post", re.compile(r"modules/[^/]+/[^/]+/(?!batch-delete$)[^/]+"), 60),
+]
+
+
+def _cache_rule(method: str, path: str) -> tuple[str, re.Pattern[str], float] | None:
+    for rule in CACHE_TTLS:
+        cached_method, pattern, _ = rule
+        if method == cached_method and pattern.fullmatch(path):
+            return rule
+    return None
+
+
+def cache_ttl(method: str, path: str) -> float | None:
+    """The TTL of responses to a request, `None` if they aren't cached."""
+    rule = _cache_rule(method, path)
+    return None if rule is None else rule[2]
+
+
+def _default_cache_dir() -> Path:
+    root = Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")).expanduser()
+    return root / "lamin" / "hub" / "responses"
+
+
+def _safe_cache_part(value: str) -> str:
+    return "".join(char if char.isalnum() or char in "._-" else "_" for char in value)
+
+
+class ResponseCache:
+    """On-disk cache of hub responses with least-recently-used eviction.
+
+    Entries live in one directory per instance and are named by a hash of method,
+    URL, params and body. Reading an entry bumps its modification time, which orders
+    the eviction once the total size exceeds `max_bytes`.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(method: str, url: str, params: Any, body: Any) -> str:
+        request = json.dumps([method, url, params, body], sort_keys=True, default=str)
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def _path(self, instance_id: str, key: str) -> Path:
+        return self.directory / _safe_cache_part(instance_id) / f"{key}.json"
+
+    def get(self, instance_id: str, key: str) -> dict[str, Any] | None:
+        path = self._path(instance_id, key)
+        try:
+            entry = json.loads(path.read_text())
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry if isinstance(entry, dict) else None
+
+    def put(self, instance_id: str, key: str, entry: dict[str, Any]) -> None:
+        path = self._path(instance_id, key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # concurrent requests may write the same entry, so each gets its own tmp
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            Path(tmp_name).replace(path)
+        except OSError:
+            return
+        self._evict()
+
+    def _entries(self) -> list[tuple[Path, os.stat_result]]:
+        entries = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                entries.append((path, path.stat()))
+            except OSError:
+                continue
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        size = sum(stat.st_size for _, stat in entries)
+        if size <= self.max_bytes:
+            return
+        for path, stat in sorted(entries, key=lambda entry: entry[1].st_mtime):
+            path.unlink(missing_ok=True)
+            size -= stat.st_size
+            if size <= self.max_bytes:
+                break
+
+    def invalidate(self, instance_id: str) -> None:
+        """Remove the entries of an instance, after a mutation."""
+        for path in (self.directory / _safe_cache_part(instance_id)).glob("*.json"):
+            path.unlink(missing_ok=True)
+
+    def clear(self) -> int:
+        entries = self._entries()
+        for path, _ in entries:
+            path.unlink(missing_ok=True)
+        return len(entries)
+
+    def stats(self) -> dict[str, Any]:
+        now = time.time()
+        endpoints: dict[str, dict[str, int]] = {}
+        entries = self._entries()
+        for path, _ in entries:
+            try:
+                entry = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            rule = _cache_rule(str(entry.get("method")), str(entry.get("path")))
+            if rule is None:
+                continue
+            method, pattern, ttl = rule
+            endpoint = endpoints.setdefault(
+                f"{method.upper()} {pattern.pattern}", {"entries": 0, "fresh": 0}
+            )
+            endpoint["entries"] += 1
+            if now - entry.get("stored_at", 0) < ttl:
+                endpoint["fresh"] += 1
+        return {
+            "directory": str(self.directory),
+            "entries": len(entries),
+            "bytes": sum(stat.st_size for _, stat in entries),
+            "max_bytes": self.max_bytes,
+            "endpoints": dict(sorted(endpoints.items())),
+        }
+
+
+def response_cache(*, enabled: bool | None = None) -> ResponseCache | None:
+    """The response cache configured by the environment.
+
+    The cache is enabled if `LAMIN_HUB_CACHE` is set to `1` or `true`, unless
+    `enabled` is passed.
+    """
+    if enabled is None:
+        enabled = os.environ.get(CACHE_ENV_VAR, "").lower() in {"1", "true"}
+    if not enabled:
+        return None
+    directory = os.environ.get(CACHE_DIR_ENV_VAR)
+    max_bytes = os.environ.get(CACHE_MAX_BYTES_ENV_VAR)
+    return ResponseCache(
+        Path(directory).expanduser() if directory else _default_cache_dir(),
+        int(max_bytes) if max_bytes else DEFAULT_MAX_BYTES,
+    )
+
+
+@click.group("cache", short_help="Inspect or clear the response cache.")
+def cache() -> None:
+    """Inspect or clear the on-disk cache of hub responses.
+
+    The cache is opt-in: set `LAMIN_HUB_CACHE=1` to serve repeated `get`, `list`,
+    and `statistics` requests from disk. Entries expire after a per-endpoint TTL
+    and are revalidated with the server's ETag. Any mutation through the CLI drops
+    the entries of its instance. `LAMIN_HUB_CACHE_DIR` and
+    `LAMIN_HUB_CACHE_MAX_BYTES` override location and size cap.
+    """
+
+
+@cache.command("stats")
+@click.option("--compact", is_flag=True, default=False, help="Print one-line JSON.")
+def cache_stats(compact: bool) -> None:
+    """Print size and entries per endpoint of the response cache."""
+    from ._utils import _print_json
+
+    stats = response_cache(enabled=True).stats()
+    stats["enabled"] = response_cache() is not None
+    _print_json(stats, compact=compact)
+
+
+@cache.command("clear")
+def cache_clear() -> None:
+    """Remove all entries of the response cache."""
+    n_removed = response_cache(enabled=True).clear()
+    click.echo(f"removed {n_removed} cached responses")
@@ -20,6 +20,10 @@ REST_COMMAND_GROUP_LIST = [
         "name": "Mutations",
         "commands": ["insert", "upsert", "update", "delete"],
     },
+    {
+        "name": "Client",
+        "commands": ["cache"],
+    },
 ]
 
 REST_COMMAND_GROUPS = {"*": REST_COMMAND_GROUP_LIST}
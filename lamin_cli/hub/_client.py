@@ -1,10 +1,39 @@
 from __future__ import annotations
 
-from typing import Any, Literal
+import atexit
+import importlib.util
+import os
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Literal
 from urllib.parse import quote
 
 import click
 
+from lamin_cli._mirror import is_offline
+
+from ._cache import ResponseCache, cache_ttl, response_cache
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+Method = Literal["delete", "get", "patch", "post", "put"]
+
+
+class HubRequestError(click.ClickException):
+    """A failed hub request, `status_code` is `None` if no response was received."""
+
+    def __init__(
+        self,
+        message: str,
+        status_code: int | None = None,
+        retry_after: float | None = None,
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
 
 def _current_instance() -> tuple[str, str]:
     import lamindb_setup as ln_setup
@@ -35,8 +64,7 @@ def _access_token() -> tuple[str | None, bool]:
 
 
 def instance_url(path: str) -> str:
-    instance_id, api_url = _current_instance()
-    return f"{api_url}/instances/{quote(instance_id, safe='')}/{path}"
+    return get_hub_client().instance_url(path)
 
 
 def module_model_path(
@@ -50,42 +78,319 @@ def module_model_path(
     return path
 
 
+def _make_http_client(*, http2: bool):
+    import httpx
+
+    # local is used in tests, see lamindb_setup.core._hub_client.httpx_client
+    if os.environ.get("LAMIN_ENV", "prod") == "local":
+        from fastapi.testclient import TestClient
+        from laminhub_rest.main import app
+
+        return TestClient(app)
+    from lamindb_setup.core._hub_client import LogRetry, RetryTransport
+
+    transport = RetryTransport(
+        retry=LogRetry(total=2, backoff_factor=0.2),
+        transport=httpx.HTTPTransport(verify=True, http2=http2, trust_env=True),
+    )
+    # as in lamindb_setup, the client builds its proxy map from the environment
+    client = httpx.Client(trust_env=True, http2=http2)
+    client._transport = transport
+    return client
+
+
+class HubClient:
+    """Hub REST client with a pooled keep-alive connection.
+
+    Instance and access token are resolved once from the settings, unless passed.
+    The connection pool is shared by all requests, including concurrent ones, and
+    uses HTTP/2 if `h2` is installed.
+
+    With a `cache`, responses of read endpoints are served from disk within their
+    TTL and revalidated with `If-None-Match` afterwards. Other requests, except
+    `GET`, drop the cached responses of the instance.
+
+    Args:
+        instance_id: The instance id, defaults to the current instance.
+        api_url: The API URL, defaults to the one of the current instance.
+        access_token: The access token, defaults to the one of the current user.
+        cache: The response cache, responses aren't cached by default.
+    """
+
+    def __init__(
+        self,
+        instance_id: str | None = None,
+        api_url: str | None = None,
+        access_token: str | None = None,
+        cache: ResponseCache | None = None,
+    ):
+        self._instance = None
+        if instance_id is not None and api_url is not None:
+            self._instance = (instance_id, api_url.rstrip("/"))
+        self._token: tuple[str | None, bool] | None = None
+        if access_token is not None:
+            self._token = (access_token, False)
+        self._http = None
+        self._lock = threading.Lock()
+        self.cache = cache
+
+    @property
+    def http(self):
+        with self._lock:
+            if self._http is None:
+                self._http = _make_http_client(
+                    http2=importlib.util.find_spec("h2") is not None
+                )
+            return self._http
+
+    def close(self) -> None:
+        with self._lock:
+            if self._http is not None:
+                self._http.close()
+                self._http = None
+
+    def instance_url(self, path: str) -> str:
+        if self._instance is None:
+            self._instance = _current_instance()
+        instance_id, api_url = self._instance
+        return f"{api_url}/instances/{quote(instance_id, safe='')}/{path}"
+
+    def _access_token(self) -> tuple[str | None, bool]:
+        if self._token is None:
+            self._token = _access_token()
+        return self._token
+
+    def _renew_access_token(self, expired_token: str | None) -> str | None:
+        import lamindb_setup as ln_setup
+        from lamindb_setup.core._hub_client import get_access_token
+        from lamindb_setup.core._settings_save import save_user_settings
+
+        with self._lock:
+            token, renew_token = self._access_token()
+            if token != expired_token:
+                # another thread renewed it already
+                return token
+            user = ln_setup.settings.user
+            new_token = get_access_token(user.email, user.password, user.api_key)
+            if new_token is not None:
+                user.access_token = new_token
+                save_user_settings(user)
+                self._token = (new_token, renew_token)
+            return new_token
+
+    def _send(
+        self, method: Method, url: str, headers: dict[str, str] | None = None, **kwargs
+    ):
+        from lamindb_setup.core._hub_client import DEFAULT_TIMEOUT
+
+        token, renew_token = self._access_token()
+        headers = dict(headers or {})
+        if token is not None:
+            headers["Authorization"] = f"Bearer {token}"
+        response = self.http.request(
+            method, url, headers=headers, timeout=DEFAULT_TIMEOUT, **kwargs
+        )
+        # 304 answers a conditional request of the response cache
+        failed = not 200 <= response.status_code < 300 and response.status_code != 304
+        if failed and renew_token:
+            new_token = self._renew_access_token(token)
+            if new_token is not None:
+                headers["Authorization"] = f"Bearer {new_token}"
+                response = self.http.request(
+                    method, url, headers=headers, timeout=DEFAULT_TIMEOUT, **kwargs
+                )
+        return response
+
+    def request_json(
+        self,
+        method: Method,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        body: Any | None = None,
+    ) -> Any:
+        url = self.instance_url(path)
+        kwargs: dict[str, Any] = {"params": params or {}}
+        if body is not None:
+            kwargs["json"] = body
+        ttl = None if self.cache is None else cache_ttl(method, path)
+        if ttl is None:
+            try:
+                response = self._request(method, url, **kwargs)
+            finally:
+                if self.cache is not None and method != "get":
+                    self.cache.invalidate(self._instance[0])
+            return self._parse_json(method, url, response)
+
+        instance_id = self._instance[0]
+        key = self.cache.key(method, url, params, body)
+        entry = self.cache.get(instance_id, key)
+        etag = None
+        if entry is not None:
+            if time.time() - entry["stored_at"] < ttl:
+                return entry["data"]
+            etag = entry.get("etag")
+        changed = self.request_json_if_changed(
+            method, path, etag=etag, params=params, body=body
+        )
+        if changed is None:
+            data = entry["data"]
+        else:
+            data, etag = changed
+        self.cache.put(
+            instance_id,
+            key,
+            {
+                "method": method,
+                "path": path,
+                "stored_at": time.time(),
+                "etag": etag,
+                "data": data,
+            },
+        )
+        return data
+
+    def request_json_if_changed(
+        self,
+        method: Method,
+        path: str,
+        *,
+        etag: str | None,
+        params: dict[str, Any] | None = None,
+        body: Any | None = None,
+    ) -> tuple[Any, str | None] | None:
+        """Send a conditional request, `None` if the response still matches `etag`.
+
+        Returns the response data and its ETag otherwise.
+        """
+        url = self.instance_url(path)
+        kwargs: dict[str, Any] = {"params": params or {}}
+        if body is not None:
+            kwargs["json"] = body
+        headers = {} if etag is None else {"If-None-Match": etag}
+        response = self._request(method, url, headers=headers, **kwargs)
+        if response.status_code == 304 and etag is not None:
+            return None
+        return self._parse_json(method, url, response), response.headers.get("ETag")
+
+    def _request(self, method: Method, url: str, **kwargs):
+        import httpx
+
+        try:
+            response = self._send(method, url, **kwargs)
+        # other errors, such as a body JSON can't encode, aren't retried
+        except httpx.HTTPError as error:
+            raise HubRequestError(f"{method.upper()} {url} failed: {error}") from error
+        if not 200 <= response.status_code < 300 and response.status_code != 304:
+            msg = (
+                f"{method.upper()} {url} failed: {response.status_code} {response.text}"
+            )
+            retry_after = response.headers.get("Retry-After", "")
+            raise HubRequestError(
+                msg,
+                status_code=response.status_code,
+                retry_after=float(retry_after) if retry_after.isdigit() else None,
+            )
+        return response
+
+    @staticmethod
+    def _parse_json(method: Method, url: str, response) -> Any:
+        response_text = str(getattr(response, "text", "") or "")
+        response_content = getattr(response, "content", None)
+        if (
+            response.status_code == 204
+            or (response_content is not None and len(response_content) == 0)
+            or not response_text.strip()
+        ):
+            return None
+
+        try:
+            return response.json()
+        except ValueError as error:
+            snippet = response_text[:500]
+            raise click.ClickException(
+                f"{method.upper()} {url} returned invalid JSON: {snippet}"
+            ) from error
+
+
+_hub_client: HubClient | None = None
+
+
+def get_hub_client() -> HubClient:
+    """The hub client shared by all hub commands of this process."""
+    global _hub_client
+
+    if _hub_client is None:
+        from lamindb_setup._silence_loggers import silence_loggers
+
+        silence_loggers()
+        _hub_client = HubClient(cache=response_cache())
+        atexit.register(_hub_client.close)
+    return _hub_client
+
+
 def request_json(
-    method: Literal["delete", "get", "patch", "post", "put"],
+    method: Method,
     path: str,
     *,
     params: dict[str, Any] | None = None,
     body: Any | None = None,
 ) -> Any:
-    from lamindb_setup.core._hub_client import request_with_auth
-
-    url = instance_url(path)
-    token, renew_token = _access_token()
-    kwargs: dict[str, Any] = {"params": params or {}}
-    if body is not None:
-        kwargs["json"] = body
-    try:
-        response = request_with_auth(url, method, token, renew_token, **kwargs)
-    except Exception as error:
-        raise click.ClickException(f"{method.upper()} {url} failed: {error}") from error
-
-    if not 200 <= response.status_code < 300:
-        msg = f"{method.upper()} {url} failed: {response.status_code} {response.text}"
-        raise click.ClickException(msg)
-
-    response_text = str(getattr(response, "text", "") or "")
-    response_content = getattr(response, "content", None)
-    if (
-        response.status_code == 204
-        or (response_content is not None and len(response_content) == 0)
-        or not response_text.strip()
-    ):
-        return None
+    if is_offline():
+        from lamin_cli._mirror import request_json_offline
 
-    try:
-        return response.json()
-    except ValueError as error:
-        snippet = response_text[:500]
-        raise click.ClickException(
-            f"{method.upper()} {url} returned invalid JSON: {snippet}"
-        ) from error
+        return request_json_offline(method, path, params=params, body=body)
+    return get_hub_client().request_json(method, path, params=params, body=body)
+
+
+def request_json_if_changed(
+    method: Method,
+    path: str,
+    *,
+    etag: str | None,
+    params: dict[str, Any] | None = None,
+    body: Any | None = None,
+) -> tuple[Any, str | None] | None:
+    if is_offline():
+        raise click.ClickException(f"{method.upper()} {path} isn't available offline")
+    return get_hub_client().request_json_if_changed(
+        method, path, etag=etag, params=params, body=body
+    )
+
+
+def iter_request_json(
+    requests: Iterable[tuple[Method, str, dict[str, Any] | None, Any | None]],
+    *,
+    in_flight: int,
+) -> Iterator[Any]:
+    """Send `(method, path, params, body)` requests with up to `in_flight` pending.
+
+    Responses are yielded in request order. Requests are drawn lazily, so
+    `requests` may be unbounded; closing the iterator cancels pending requests.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    requests = iter(requests)
+    with ThreadPoolExecutor(max_workers=in_flight) as executor:
+        pending: deque = deque()
+
+        def submit() -> None:
+            request = next(requests, None)
+            if request is not None:
+                method, path, params, body = request
+                pending.append(
+                    executor.submit(
+                        request_json, method, path, params=params, body=body
+                    )
+                )
+
+        try:
+            for _ in range(in_flight):
+                submit()
+            while pending:
+                response = pending.popleft().result()
+                submit()
+                yield response
+        finally:
+            for future in pending:
+                future.cancel()
@@ -1,6 +1,9 @@
 # ruff: noqa: D301
 from __future__ import annotations
 
+from typing import TYPE_CHECKING, Any
+
+from ._batches import Checkpoint, batch_options, iter_objects, send_batches
 from ._click import click
 from ._utils import (
     _columns,
@@ -11,31 +14,111 @@ from ._utils import (
     request_json,
 )
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+def _send_objects(
+    send: Callable[[Any], Any],
+    objects: str | None,
+    from_: str | None,
+    format_: str | None,
+    *,
+    batch_size: int,
+    max_workers: int,
+    max_retries: int,
+    checkpoint: str | None,
+    compact: bool,
+    allow_object: bool,
+    batch_objects: bool,
+    idempotent: bool = True,
+    failed_rows: Callable[[list[dict[str, Any]]], Any] | None = None,
+) -> None:
+    """Send `--from` in batches, and `--objects` in one request.
+
+    With `batch_objects`, `--objects` that don't fit in a batch are sent in
+    batches, too.
+    """
+    if (objects is None) == (from_ is None):
+        raise click.ClickException("Pass either --objects or --from")
+    if from_ is None:
+        if checkpoint is not None:
+            raise click.ClickException("--checkpoint requires --from")
+        parsed = _read_objects(objects, "--objects", allow_object=allow_object)
+        if not batch_objects or isinstance(parsed, dict) or len(parsed) <= batch_size:
+            _print_json(send(parsed), compact=compact)
+            return
+        source_objects: Any = parsed
+    else:
+        source_objects = iter_objects(from_, format_)
+    send_batches(
+        source_objects,
+        send,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        max_retries=max_retries,
+        checkpoint=Checkpoint(checkpoint, from_, batch_size),
+        idempotent=idempotent,
+        failed_rows=failed_rows,
+    )
+
+
+def _index_values(columns: list[str]) -> Callable[[list[dict[str, Any]]], Any]:
+    return lambda batch: [
+        {column: row.get(column) for column in columns} for row in batch
+    ]
+
 
 @click.command("insert", short_help="Insert objects.")
 @click.argument("module", type=str)
 @click.argument("model", type=str)
 @click.option(
     "--objects",
-    required=True,
     help="Object or list of objects as JSON, @path, or -.",
 )
+@batch_options
 @click.option("--compact", is_flag=True, default=False, help="Print one-line JSON.")
-def insert(module: str, model: str, objects: str, compact: bool) -> None:
+def insert(
+    module: str,
+    model: str,
+    objects: str | None,
+    from_: str | None,
+    format_: str | None,
+    batch_size: int,
+    max_workers: int,
+    max_retries: int,
+    checkpoint: str | None,
+    compact: bool,
+) -> None:
     """Insert one or more simple objects.
 
+    With `--from`, objects are streamed from a file and sent in concurrent batches,
+    printing one JSON line per batch.
+
     \b
     Examples:
       lamin hub insert core ulabel --objects '{"name":"treated"}'
       lamin hub insert core ulabel --objects '[{"name":"control"},{"name":"treated"}]'
       lamin hub insert core project --objects @projects.json
+      lamin hub insert core ulabel --from ulabels.ndjson --batch-size 5000 --checkpoint ulabels.ckpt
     """
-    data = request_json(
-        "put",
-        path=_module_model_path(module, model),
-        body=_read_objects(objects, "--objects", allow_object=True),
+    path = _module_model_path(module, model)
+    _send_objects(
+        lambda body: request_json("put", path=path, body=body),
+        objects,
+        from_,
+        format_,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        max_retries=max_retries,
+        checkpoint=checkpoint,
+        compact=compact,
+        allow_object=True,
+        # --objects are sent in one atomic request
+        batch_objects=False,
+        # a batch that timed out may have been inserted
+        idempotent=False,
     )
-    _print_json(data, compact=compact)
 
 
 @click.command("upsert", short_help="Insert or update objects.")
@@ -43,7 +126,6 @@ def insert(module: str, model: str, objects: str, compact: bool) -> None:
 @click.argument("model", type=str)
 @click.option(
     "--objects",
-    required=True,
     help="Object or list of objects as JSON, @path, or -.",
 )
 @click.option(
@@ -54,28 +136,50 @@ def insert(module: str, model: str, objects: str, compact: bool) -> None:
     required=True,
     help="Conflict column name. Repeat for multiple columns or pass a JSON list.",
 )
+@batch_options
 @click.option("--compact", is_flag=True, default=False, help="Print one-line JSON.")
 def upsert(
     module: str,
     model: str,
-    objects: str,
+    objects: str | None,
     conflict_columns: tuple[str, ...],
+    from_: str | None,
+    format_: str | None,
+    batch_size: int,
+    max_workers: int,
+    max_retries: int,
+    checkpoint: str | None,
     compact: bool,
 ) -> None:
     """Insert or update one or more objects by conflict columns.
 
+    With `--from`, objects are streamed from a file and sent in concurrent batches,
+    printing one JSON line per batch.
+
     \b
     Examples:
       lamin hub upsert core ulabel --conflict-column name --objects @ulabels.json
       lamin hub upsert core project --conflict-column uid --objects @projects.json
+      lamin hub upsert bionty gene --conflict-column ensembl_gene_id --from genes.parquet --max-workers 8
     """
-    data = request_json(
-        "put",
-        path=f"{_module_model_path(module, model)}/upsert",
-        params={"conflict_columns": _columns(conflict_columns, "--conflict-column")},
-        body=_read_objects(objects, "--objects", allow_object=True),
+    path = f"{_module_model_path(module, model)}/upsert"
+    columns = _columns(conflict_columns, "--conflict-column")
+    _send_objects(
+        lambda body: request_json(
+            "put", path=path, params={"conflict_columns": columns}, body=body
+        ),
+        objects,
+        from_,
+        format_,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        max_retries=max_retries,
+        checkpoint=checkpoint,
+        compact=compact,
+        allow_object=True,
+        batch_objects=False,
+        failed_rows=_index_values(columns),
     )
-    _print_json(data, compact=compact)
 
 
 @click.command("update", short_help="Update objects.")
@@ -91,6 +195,7 @@ def upsert(
     multiple=True,
     help="Identifier column name. Repeat for multiple columns or pass a JSON list.",
 )
+@batch_options
 @click.option("--compact", is_flag=True, default=False, help="Print one-line JSON.")
 def update(
     module: str,
@@ -99,29 +204,51 @@ def update(
     values: str | None,
     objects: str | None,
     index_columns: tuple[str, ...],
+    from_: str | None,
+    format_: str | None,
+    batch_size: int,
+    max_workers: int,
+    max_retries: int,
+    checkpoint: str | None,
     compact: bool,
 ) -> None:
     """Partially update one row or a batch of objects.
 
+    Objects from `--from` or more than `--batch-size` `--objects` are sent in
+    concurrent batches, printing one JSON line per batch that lists the index
+    values of failed batches.
+
     \b
     Examples:
       lamin hub update core ulabel abc12345 --values '{"description":"updated"}'
       lamin hub update core project --index-column uid --objects @projects.json
+      lamin hub update core artifact --index-column uid --from descriptions.ndjson --batch-size 500
     """
-    if objects is not None:
+    if objects is not None or from_ is not None:
         if uid or values is not None:
             raise click.ClickException(
-                "update with --objects cannot also pass uid or --values"
+                "update with --objects or --from cannot also pass uid or --values"
             )
-        data = request_json(
-            "patch",
-            path=f"{_module_model_path(module, model)}/batch-update",
-            body={
-                "index_columns": _columns(index_columns, "--index-column"),
-                "records": _read_objects(objects, "--objects", allow_object=False),
-            },
+        path = f"{_module_model_path(module, model)}/batch-update"
+        columns = _columns(index_columns, "--index-column")
+        _send_objects(
+            lambda records: request_json(
+                "patch",
+                path=path,
+                body={"index_columns": columns, "records": records},
+            ),
+            objects,
+            from_,
+            format_,
+            batch_size=batch_size,
+            max_workers=max_workers,
+            max_retries=max_retries,
+            checkpoint=checkpoint,
+            compact=compact,
+            allow_object=False,
+            batch_objects=True,
+            failed_rows=_index_values(columns),
         )
-        _print_json(data, compact=compact)
         return
 
     if not uid or values is None:
@@ -145,32 +272,53 @@ def update(
 @click.argument("model", type=str)
 @click.argument("uid", required=False)
 @click.option("--objects", help="List of identifier objects as JSON, @path, or -.")
+@batch_options
 @click.option("--compact", is_flag=True, default=False, help="Print one-line JSON.")
 def delete(
     module: str,
     model: str,
     uid: str | None,
     objects: str | None,
+    from_: str | None,
+    format_: str | None,
+    batch_size: int,
+    max_workers: int,
+    max_retries: int,
+    checkpoint: str | None,
     compact: bool,
 ) -> None:
     """Delete one row or a batch of objects.
 
+    Objects from `--from` or more than `--batch-size` `--objects` are sent in
+    concurrent batches, printing one JSON line per batch that lists the
+    identifiers of failed batches.
+
     \b
     Examples:
       lamin hub delete core ulabel abc12345
       lamin hub delete core ulabel --objects '[{"name":"control"},{"name":"treated"}]'
+      lamin hub delete core ulabel --from obsolete_ulabels.csv --max-workers 8
     """
-    if objects is not None:
+    if objects is not None or from_ is not None:
         if uid:
             raise click.ClickException(
-                "delete accepts either uid or --objects, not both"
+                "delete accepts either uid or --objects/--from, not both"
             )
-        data = request_json(
-            "post",
-            path=f"{_module_model_path(module, model)}/batch-delete",
-            body={"records": _read_objects(objects, "--objects", allow_object=False)},
+        path = f"{_module_model_path(module, model)}/batch-delete"
+        _send_objects(
+            lambda records: request_json("post", path=path, body={"records": records}),
+            objects,
+            from_,
+            format_,
+            batch_size=batch_size,
+            max_workers=max_workers,
+            max_retries=max_retries,
+            checkpoint=checkpoint,
+            compact=compact,
+            allow_object=False,
+            batch_objects=True,
+            failed_rows=lambda batch: batch,
         )
-        _print_json(data, compact=compact)
         return
 
     if not uid:
@@ -1,7 +1,11 @@
 # ruff: noqa: D301
 from __future__ import annotations
 
+import json
+from typing import TYPE_CHECKING, Any
+
 from ._click import click
+from ._client import iter_request_json
 from ._utils import (
     _module_model_path,
     _print_json,
@@ -11,6 +15,191 @@ from ._utils import (
     request_json,
 )
 
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+def _keyset_order(order_by: list[Any] | None) -> list[tuple[str, bool]] | None:
+    """Return `(field, descending)` pairs if rows can be paged by their values."""
+    order = []
+    for item in order_by or []:
+        if not isinstance(item, dict) or not isinstance(item.get("field"), str):
+            return None
+        field = item["field"]
+        if "." in field or "(" in field:
+            return None
+        order.append((field, bool(item.get("descending", False))))
+    if not any(field == "id" for field, _ in order):
+        # a unique tiebreaker makes the keyset well-defined
+        order.append(("id", False))
+    return order
+
+
+def _after(field: str, descending: bool, value: Any) -> dict[str, Any] | None:
+    """Condition for values of `field` after `value`, or `None` if there are none.
+
+    NULLs sort as on Postgres: after all values in ascending order and before all
+    values in descending order. The primary key `id` is never NULL.
+    """
+    if value is None:
+        return {field: {"ne": None}} if descending else None
+    if descending or field == "id":
+        return {field: {"lt" if descending else "gt": value}}
+    return {"or": [{field: {"gt": value}}, {field: {"eq": None}}]}
+
+
+def _keyset_filter(
+    order: list[tuple[str, bool]], last_row: dict[str, Any]
+) -> dict[str, Any]:
+    """Filter for rows after `last_row` in `order`."""
+    clauses = []
+    for i, (field, descending) in enumerate(order):
+        condition = _after(field, descending, last_row[field])
+        if condition is None:
+            continue
+        equal = [{prior: {"eq": last_row[prior]}} for prior, _ in order[:i]]
+        clauses.append({"and": [*equal, condition]} if equal else condition)
+    return clauses[0] if len(clauses) == 1 else {"or": clauses}
+
+
+def _iter_rows(
+    path: str,
+    params: dict[str, Any],
+    body: dict[str, Any],
+    *,
+    page_size: int,
+    max_rows: int | None = None,
+    prefetch: int = 1,
+) -> Iterator[dict[str, Any]]:
+    """Yield rows page by page, holding at most one page in memory.
+
+    Pages are requested by keyset on the `order_by` fields plus `id` where
+    possible, and by offset otherwise. With `prefetch > 1`, offset pages are
+    requested with up to `prefetch` requests in flight, see `_iter_prefetched_rows`.
+
+    A server may return fewer rows than requested per page. A short first page
+    is taken as its page size, so that only a short later page ends the rows.
+    """
+    if prefetch > 1:
+        yield from _iter_prefetched_rows(
+            path,
+            params,
+            body,
+            page_size=page_size,
+            max_rows=max_rows,
+            prefetch=prefetch,
+        )
+        return
+    order = _keyset_order(body.get("order_by"))
+    select = body.get("select")
+    added_fields: list[str] = []
+    if order is not None:
+        body = {**body, "order_by": [{"field": f, "descending": d} for f, d in order]}
+        if select:
+            added_fields = [f for f, _ in order if f not in select]
+            body["select"] = [*select, *added_fields]
+    base_filter = body.get("filter")
+    offset = params.get("offset") or 0
+    n_rows = 0
+    first_page = True
+    while max_rows is None or n_rows < max_rows:
+        limit = page_size if max_rows is None else min(page_size, max_rows - n_rows)
+        page = request_json(
+            "post", path, params={**params, "limit": limit, "offset": offset}, body=body
+        )
+        if not isinstance(page, list):
+            raise click.ClickException(
+                "Expected a JSON list of rows from the list endpoint"
+            )
+        for row in page:
+            yield {k: v for k, v in row.items() if k not in added_fields}
+        n_rows += len(page)
+        if not page or (len(page) < limit and not first_page):
+            return
+        if len(page) < limit:
+            page_size = len(page)
+        first_page = False
+        last_row = page[-1]
+        if order is not None and all(
+            field in last_row and (field != "id" or last_row[field] is not None)
+            for field, _ in order
+        ):
+            keyset = _keyset_filter(order, last_row)
+            body = {
+                **body,
+                "filter": keyset
+                if base_filter is None
+                else {"and": [base_filter, keyset]},
+            }
+            offset = 0
+        else:
+            # continue from where the keyset stopped, or page by offset throughout
+            order = None
+            offset += len(page)
+
+
+def _iter_prefetched_rows(
+    path: str,
+    params: dict[str, Any],
+    body: dict[str, Any],
+    *,
+    page_size: int,
+    max_rows: int | None,
+    prefetch: int,
+) -> Iterator[dict[str, Any]]:
+    """Yield rows of offset pages while the next `prefetch` pages are in flight.
+
+    Keyset pages depend on the previous page and can't be pipelined. An `id`
+    tiebreaker keeps the offset order deterministic across requests. The first
+    page is requested on its own, because offsets of later pages depend on the
+    page size of the server, see `_iter_rows`.
+    """
+    order_by = list(body.get("order_by") or [])
+    if not any(
+        isinstance(item, dict) and item.get("field") == "id" for item in order_by
+    ):
+        order_by.append({"field": "id", "descending": False})
+    body = {**body, "order_by": order_by}
+    start = params.get("offset") or 0
+
+    def page_params(offset: int) -> dict[str, Any]:
+        limit = page_size
+        if max_rows is not None:
+            limit = min(page_size, max_rows - (offset - start))
+        return {**params, "limit": limit, "offset": offset}
+
+    def check(page: Any) -> list[dict[str, Any]]:
+        if not isinstance(page, list):
+            raise click.ClickException(
+                "Expected a JSON list of rows from the list endpoint"
+            )
+        return page
+
+    first_params = page_params(start)
+    first_page = check(request_json("post", path, params=first_params, body=body))
+    yield from first_page
+    if not first_page:
+        return
+    if len(first_page) < first_params["limit"]:
+        page_size = len(first_page)
+
+    def page_requests(offset: int):
+        while max_rows is None or offset - start < max_rows:
+            offset_params = page_params(offset)
+            yield "post", path, offset_params, body
+            offset += offset_params["limit"]
+
+    pages = iter_request_json(
+        page_requests(start + len(first_page)), in_flight=prefetch
+    )
+    try:
+        for page in pages:
+            yield from check(page)
+            if len(page) < page_size:
+                return
+    finally:
+        pages.close()
+
 
 @click.command("list", short_help="List objects.")
 @click.argument("module", type=str)
@@ -55,6 +244,33 @@ from ._utils import (
     help="Include foreign key fields in the response.",
 )
 @click.option("--compact", is_flag=True, default=False, help="Print one-line JSON.")
+@click.option(
+    "--all",
+    "all_",
+    is_flag=True,
+    default=False,
+    help="Page through all matching rows and stream them as NDJSON, one row per line.",
+)
+@click.option(
+    "--page-size",
+    type=click.IntRange(min=1),
+    default=1000,
+    show_default=True,
+    help="Rows per request with --all.",
+)
+@click.option(
+    "--max-rows",
+    type=click.IntRange(min=0),
+    default=None,
+    help="Stop after this many rows with --all.",
+)
+@click.option(
+    "--prefetch",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Pages to keep in flight with --all; pages by offset if greater than 1.",
+)
 def list_records(
     module: str,
     model: str,
@@ -69,6 +285,10 @@ def list_records(
     limit_to_many: int,
     include_foreign_keys: bool,
     compact: bool,
+    all_: bool,
+    page_size: int,
+    max_rows: int | None,
+    prefetch: int,
 ) -> None:
     """Query multiple objects.
 
@@ -79,7 +299,25 @@ def list_records(
       lamin hub list core artifact --search training --search-in ulabels.name --limit 10
       lamin hub list core artifact --select uid --select key --select 'run(transform(uid,key))'
       lamin hub list core record --filter '{"and":[{"is_type":{"eq":true}},{"name":{"contains":"dataset"}}]}' --select uid --select name
+      lamin hub list core artifact --all --select uid --select key > artifacts.ndjson
+      lamin hub list core artifact --all --page-size 500 --prefetch 8 > artifacts.ndjson
     """
+    if all_:
+        rows = _iter_rows(
+            _module_model_path(module, model),
+            _query_params(
+                offset=offset,
+                limit_to_many=limit_to_many,
+                include_foreign_keys=include_foreign_keys,
+            ),
+            _records_body(body, select, filter_, order_by, search, search_in),
+            page_size=page_size,
+            max_rows=max_rows,
+            prefetch=prefetch,
+        )
+        for row in rows:
+            click.echo(json.dumps(row, default=str))
+        return
     data = request_json(
         "post",
         path=_module_model_path(module, model),
@@ -1,43 +1,136 @@
 from __future__ import annotations
 
 import json
+import mmap
 import os
+import threading
+import time
+from collections.abc import Iterator, Mapping
 from pathlib import Path
 from typing import Any
 
+from lamin_cli._mirror import is_offline
 from lamin_cli.hub._click import click
 from lamin_cli.hub._utils import (
     _current_instance,
     _current_instance_schema_id,
     request_json,
+    request_json_if_changed,
 )
 
+SCHEMA_INDEX_VERSION = 1
+# seconds after which a cached schema is served once more and revalidated
+SCHEMA_MAX_AGE = 3600
+# cache file of instances whose settings lack a schema id
+FALLBACK_SCHEMA_KEY = "latest"
+
+
+class IndexedModuleSchema(Mapping[str, Any]):
+    """Models of one module of an `IndexedSchema`, parsed on first access."""
+
+    def __init__(self, schema: IndexedSchema, module: str):
+        self._schema = schema
+        self._index = schema._header["modules"][module]
+        self._models: dict[str, Any] = {}
+
+    def __getitem__(self, model: str) -> Any:
+        if model not in self._models:
+            start, length = self._index["offsets"][model]
+            self._models[model] = self._schema._read(start, length)
+        return self._models[model]
+
+    def __contains__(self, model: object) -> bool:
+        return model in self._index["offsets"]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index["offsets"])
+
+    def __len__(self) -> int:
+        return len(self._index["offsets"])
+
+    def lookup(self, normalized_model: str) -> list[str]:
+        """Model keys whose class name, or else key, match case-insensitively."""
+        return self._index["class_names"].get(normalized_model) or self._index[
+            "keys"
+        ].get(normalized_model, [])
+
+
+class IndexedSchema(Mapping[str, Any]):
+    """Schema backed by a cache file written with `_write_cached_schema`.
+
+    The file starts with a JSON header line that maps every model to the offset
+    of its JSON in the remainder of the file and indexes class names and model
+    keys per module. Only the header is parsed when loading; models are read from
+    a memory map on access. The modification time of the file is the time the
+    schema was last fetched or revalidated.
+    """
+
+    def __init__(self, path: Path, header: dict[str, Any], body_start: int):
+        self._path = path
+        self._header = header
+        self._body_start = body_start
+        self.etag: str | None = header.get("etag")
+        self.fetched_at = path.stat().st_mtime
+        self._map: mmap.mmap | None = None
+        self._modules: dict[str, Any] = {}
+
+    def _read(self, start: int, length: int) -> Any:
+        if self._map is None:
+            with self._path.open("rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        start += self._body_start
+        return json.loads(self._map[start : start + length])
+
+    def __getitem__(self, module: str) -> Any:
+        if module not in self._modules:
+            if module in self._header["modules"]:
+                self._modules[module] = IndexedModuleSchema(self, module)
+            else:
+                self._modules[module] = self._header["other"][module]
+        return self._modules[module]
+
+    def __contains__(self, module: object) -> bool:
+        return module in self._header["modules"] or module in self._header["other"]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._header["modules"]
+        yield from self._header["other"]
+
+    def __len__(self) -> int:
+        return len(self._header["modules"]) + len(self._header["other"])
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            module: dict(value) if isinstance(value, Mapping) else value
+            for module, value in self.items()
+        }
+
 
 def scope_schema(schema: Any, module: str | None, model: str | None) -> Any:
     if module is None:
-        return schema
-    if not isinstance(schema, dict):
+        return schema.to_dict() if isinstance(schema, IndexedSchema) else schema
+    if not isinstance(schema, Mapping):
         raise click.ClickException("Schema response must be a JSON object.")
     module_schema_ = module_schema(schema, module)
     if model is None:
-        return module_schema_
+        return dict(module_schema_)
     model_key, _ = resolve_model_metadata(schema, module, model)
     return module_schema_[model_key]
 
 
-def module_schema(schema: dict[str, Any], module: str) -> dict[str, Any]:
+def module_schema(schema: Mapping[str, Any], module: str) -> Mapping[str, Any]:
     if module not in schema:
         raise click.ClickException(
             f"Unknown module '{module}'. Available modules: {sorted(schema)}"
         )
     module_schema_ = schema[module]
-    if not isinstance(module_schema_, dict):
+    if not isinstance(module_schema_, Mapping):
         raise click.ClickException(f"Schema module '{module}' must be a JSON object.")
     return module_schema_
 
 
 def resolve_model_metadata(
-    schema: dict[str, Any],
+    schema: Mapping[str, Any],
     module: str,
     model: str,
 ) -> tuple[str, dict[str, Any]]:
@@ -51,18 +144,24 @@ def resolve_model_metadata(
         return model, metadata
 
     normalized_model = model.lower()
-    matches = [
-        (model_key, metadata)
-        for model_key, metadata in module_schema_.items()
-        if isinstance(metadata, dict)
-        and str(metadata.get("class_name", "")).lower() == normalized_model
-    ]
-    if not matches:
+    if isinstance(module_schema_, IndexedModuleSchema):
+        matches = [
+            (model_key, module_schema_[model_key])
+            for model_key in module_schema_.lookup(normalized_model)
+        ]
+    else:
         matches = [
             (model_key, metadata)
             for model_key, metadata in module_schema_.items()
-            if isinstance(metadata, dict) and model_key.lower() == normalized_model
+            if isinstance(metadata, dict)
+            and str(metadata.get("class_name", "")).lower() == normalized_model
         ]
+        if not matches:
+            matches = [
+                (model_key, metadata)
+                for model_key, metadata in module_schema_.items()
+                if isinstance(metadata, dict) and model_key.lower() == normalized_model
+            ]
     if len(matches) == 1:
         return matches[0]
     if len(matches) > 1:
@@ -76,38 +175,79 @@ def resolve_model_metadata(
     )
 
 
-def load_schema(*, refresh: bool) -> dict[str, Any]:
+def load_schema(*, refresh: bool) -> Mapping[str, Any]:
+    """The schema of the current instance, from the cache if possible.
+
+    A cached schema older than `SCHEMA_MAX_AGE` is returned right away and
+    revalidated in a background thread, with a conditional request on the ETag
+    that the hub sent with the schema.
+    """
     cache_path = _current_schema_cache_path()
     if cache_path is not None and not refresh:
         cached = _read_cached_schema(cache_path)
         if cached is not None:
+            if time.time() - cached.fetched_at > SCHEMA_MAX_AGE:
+                _revalidate_in_background(cache_path, cached.etag)
             return cached
 
-    schema = request_json("get", "schema")
+    etag = None
+    if cache_path is None or is_offline():
+        schema = request_json("get", "schema")
+    else:
+        schema, etag = request_json_if_changed("get", "schema", etag=None)
     if not isinstance(schema, dict):
         raise click.ClickException("Schema response must be a JSON object.")
     if cache_path is not None:
-        _write_cached_schema(cache_path, schema)
+        _write_cached_schema(cache_path, schema, etag=etag)
     return schema
 
 
+_revalidations: dict[Path, threading.Thread] = {}
+
+
+def _revalidate_in_background(path: Path, etag: str | None) -> None:
+    if path in _revalidations:
+        return
+    # a daemon, so that a slow hub doesn't hold up the exit of the command; the
+    # cache is replaced atomically, so an interrupted write keeps the stale one
+    thread = threading.Thread(
+        target=_revalidate_schema,
+        args=(path, etag),
+        name="lamin-schema-revalidate",
+        daemon=True,
+    )
+    _revalidations[path] = thread
+    thread.start()
+
+
+def _revalidate_schema(path: Path, etag: str | None) -> None:
+    try:
+        changed = request_json_if_changed("get", "schema", etag=etag)
+        if changed is None:
+            os.utime(path)
+            return
+        schema, new_etag = changed
+        if isinstance(schema, dict):
+            _write_cached_schema(path, schema, etag=new_etag)
+    except Exception:
+        # the cached schema stays stale and the next command retries
+        pass
+
+
 def _current_schema_cache_path() -> Path | None:
     try:
         schema_id = _current_instance_schema_id()
-        if schema_id is None:
-            return None
         instance_id, _ = _current_instance()
     except Exception:
         return None
     return _schema_cache_path(instance_id, schema_id)
 
 
-def _schema_cache_path(instance_id: str, schema_id: str) -> Path:
+def _schema_cache_path(instance_id: str, schema_id: str | None) -> Path:
     cache_root = os.environ.get("LAMIN_REST_SCHEMA_CACHE_DIR")
     root = Path(cache_root).expanduser() if cache_root else _default_cache_root()
-    return (
-        root / "hub" / "schemas" / _safe_cache_part(instance_id) / f"{schema_id}.json"
-    )
+    key = FALLBACK_SCHEMA_KEY if schema_id is None else _safe_cache_part(schema_id)
+    return root / "hub" / "schemas" / _safe_cache_part(instance_id) / f"{key}.idx"
 
 
 def _default_cache_root() -> Path:
@@ -118,33 +258,70 @@ def _safe_cache_part(value: str) -> str:
     return "".join(char if char.isalnum() or char in "._-" else "_" for char in value)
 
 
-def _read_cached_schema(path: Path) -> dict[str, Any] | None:
+def _read_cached_schema(path: Path) -> IndexedSchema | None:
     if not path.exists():
         return None
     try:
-        data = json.loads(path.read_text())
+        with path.open("rb") as f:
+            header_line = f.readline()
     except OSError as error:
         raise click.ClickException(
             f"Could not read schema cache at {path}: {error}"
         ) from error
+    try:
+        header = json.loads(header_line)
     except json.JSONDecodeError as error:
         raise click.ClickException(
             f"Schema cache at {path} is not valid JSON. "
             "Run `lamin hub schema --refresh` to rebuild it."
         ) from error
-    if not isinstance(data, dict):
+    if not isinstance(header, dict):
         raise click.ClickException(
             f"Schema cache at {path} has invalid content. "
             "Run `lamin hub schema --refresh` to rebuild it."
         )
-    return data
+    if header.get("version") != SCHEMA_INDEX_VERSION:
+        return None
+    return IndexedSchema(path, header, len(header_line))
+
+
+def _index_schema(schema: dict[str, Any]) -> tuple[dict[str, Any], bytes]:
+    modules: dict[str, Any] = {}
+    other: dict[str, Any] = {}
+    chunks: list[bytes] = []
+    offset = 0
+    for module, models in schema.items():
+        if not isinstance(models, dict):
+            other[module] = models
+            continue
+        index: dict[str, Any] = {"offsets": {}, "class_names": {}, "keys": {}}
+        for model_key, metadata in models.items():
+            chunk = json.dumps(metadata, separators=(",", ":")).encode()
+            index["offsets"][model_key] = [offset, len(chunk)]
+            chunks.append(chunk)
+            offset += len(chunk)
+            if not isinstance(metadata, dict):
+                continue
+            class_name = str(metadata.get("class_name", "")).lower()
+            index["class_names"].setdefault(class_name, []).append(model_key)
+            index["keys"].setdefault(model_key.lower(), []).append(model_key)
+        modules[module] = index
+    header = {"version": SCHEMA_INDEX_VERSION, "modules": modules, "other": other}
+    return header, b"".join(chunks)
 
 
-def _write_cached_schema(path: Path, schema: dict[str, Any]) -> None:
+def _write_cached_schema(
+    path: Path, schema: dict[str, Any], *, etag: str | None = None
+) -> None:
+    header, body = _index_schema(schema)
+    header["etag"] = etag
     try:
         path.parent.mkdir(parents=True, exist_ok=True)
-        tmp_path = path.with_suffix(path.suffix + ".tmp")
-        tmp_path.write_text(json.dumps(schema))
+        tmp_path = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+        with tmp_path.open("wb") as f:
+            # json.dumps escapes newlines, so the header is exactly one line
+            f.write(json.dumps(header, separators=(",", ":")).encode() + b"\n")
+            f.write(body)
         tmp_path.replace(path)
     except OSError as error:
         raise click.ClickException(
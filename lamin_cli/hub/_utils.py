@@ -6,7 +6,7 @@ from pathlib import Path
 from typing import Any
 
 from ._click import click
-from ._client import _current_instance, request_json
+from ._client import _current_instance, request_json, request_json_if_changed
 from ._client import module_model_path as _module_model_path
 
 
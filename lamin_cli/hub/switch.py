@@ -2,10 +2,6 @@ from __future__ import annotations
 
 from typing import Any
 
-import lamindb_setup as ln_setup
-from lamin_utils import logger
-from lamindb_setup.core._settings_store import settings_dir
-
 from ._click import click
 from ._client import module_model_path, request_json
 from .branches import create_branch
@@ -51,17 +47,24 @@ def _get_branch(target: str) -> dict[str, Any] | None:
 
 
 def _branch_settings_path():
+    import lamindb_setup as ln_setup
+    from lamindb_setup.core._settings_store import settings_dir
+
     instance = ln_setup.settings.instance
     return settings_dir / f"current-branch--{instance.owner}--{instance.name}.txt"
 
 
 def _write_current_branch(uid: str, name: str) -> None:
+    import lamindb_setup as ln_setup
+
     _branch_settings_path().write_text(f"{uid}\n{name}")
     # Clear cache so current process reloads branch from file on next access.
     ln_setup.settings._branch = None
 
 
 def switch_branch(target: str | None, *, create: bool = False) -> None:
+    from lamin_utils import logger
+
     if target is None:
         raise click.ClickException(
             "Please pass a branch name or uid. Example: lamin switch main"
@@ -0,0 +1,35 @@
+import html
+import re
+from pathlib import Path
+
+import pytest
+from lamin_cli.agents.claude import _ansi_to_html
+
+ANSI_LOGS = sorted((Path(__file__).parent / "ansi_logs").glob("*.log"))
+ANSI_SGR = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def test_ansi_to_html_styles_and_escapes():
+    assert _ansi_to_html("a < b & 'c'") == "a &lt; b &amp; &#x27;c&#x27;"
+    assert (
+        _ansi_to_html("\x1b[1;31merror\x1b[0m: <x>")
+        == '<span style="color:#cd3131;font-weight:700">error</span>: &lt;x&gt;'
+    )
+    # 39 resets only the foreground, unknown codes such as 256 colors are ignored
+    assert (
+        _ansi_to_html("\x1b[32;44mok\x1b[39m!\x1b[38;5;12m?")
+        == '<span style="color:#0dbc79;background:#2472c8">ok</span>'
+        '<span style="background:#2472c8">!</span>'
+        '<span style="background:#2472c8">?</span>'
+    )
+
+
+@pytest.mark.parametrize("path", ANSI_LOGS, ids=lambda path: path.stem)
+def test_ansi_to_html_converts_colored_logs(path):
+    text = path.read_text()
+    converted = _ansi_to_html(text)
+    assert not ANSI_SGR.search(converted)
+    assert converted.count("<span") == converted.count("</span>")
+    # only the color sequences are replaced
+    plain = html.unescape(re.sub(r"</?span[^>]*>", "", converted))
+    assert plain == ANSI_SGR.sub("", text)
@@ -1,13 +1,24 @@
+import gzip
+import io
 import json
+import re
 from datetime import datetime, timezone
 from pathlib import Path
 
 import lamindb as ln
 import pytest
+from lamin_cli.agents import claude
 from lamin_cli.agents.claude import (
     _TRANSFORM_KEY,
+    _checkpoint_file,
+    _report_file,
+    _report_lock,
     _run_uid_file,
     _transcript_path_file,
+    _TranscriptRenderer,
+    _update_report,
+    checkpoint_claudecode_session,
+    claudecode_report_url,
     finish_claudecode_session,
     track_claudecode_session,
 )
@@ -101,3 +112,181 @@ def test_track_reuses_transform_across_sessions():
 def test_finish_without_active_session_exits_cleanly():
     # finish called with no prior track — must not raise
     finish_claudecode_session()
+
+
+def test_update_report_streams_tool_calls_in_result_order(tmp_path):
+    p = tmp_path / "session.jsonl"
+    messages = [
+        {
+            "role": "assistant",
+            "content": [
+                {
+                    "type": "tool_use",
+                    "id": "a",
+                    "name": "Bash",
+                    "input": {"command": "ls"},
+                },
+                {
+                    "type": "tool_use",
+                    "id": "b",
+                    "name": "Write",
+                    "input": {"file_path": "run.py"},
+                },
+                {
+                    "type": "tool_use",
+                    "id": "c",
+                    "name": "Bash",
+                    "input": {"command": "lamin track finish"},
+                },
+            ],
+        },
+        {
+            "role": "user",
+            "content": [{"type": "tool_result", "tool_use_id": "c", "content": "x"}],
+        },
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "tool_result",
+                    "tool_use_id": "a",
+                    "content": "\x1b[32mok\x1b[0m",
+                }
+            ],
+        },
+        {"role": "assistant", "content": "all done"},
+    ]
+    p.write_text(
+        "".join(json.dumps({"message": m}) + "\n" for m in messages) + "{oops\n"
+    )
+    Path(".claude").mkdir()
+
+    script_paths = _update_report(p, final=True)
+
+    html_doc = _report_file().read_text()
+    assert html_doc.startswith("<!doctype html>") and html_doc.endswith("</html>")
+    assert script_paths == [Path("run.py")]
+    # the bookkeeping call is hidden, the Bash step is rendered when its result
+    # arrives and the Write without a result is rendered at the end
+    assert "lamin track finish" not in html_doc
+    assert '<span style="color:#0dbc79">ok</span>' in html_doc
+    assert html_doc.index("Bash") < html_doc.index("all done") < html_doc.index("Write")
+
+
+def test_checkpoint_renders_appended_lines_and_finish_uploads_report(tmp_path):
+    track_claudecode_session(name="checkpointed session")
+    uid = _run_uid_file().read_text().strip()
+    transcript = tmp_path / "session.jsonl"
+    _transcript_path_file().write_text(str(transcript))
+    first = json.dumps({"message": {"role": "user", "content": "first step"}})
+    second = json.dumps({"message": {"role": "assistant", "content": "second step"}})
+
+    # the second line is still being written and must wait for the next checkpoint
+    transcript.write_text(first + "\n" + second[:10])
+    checkpoint_claudecode_session()
+    checkpoint = json.loads(_checkpoint_file().read_text())
+    assert checkpoint["transcript_offset"] == len(first) + 1
+    assert "first step" in _report_file().read_text()
+    assert "second" not in _report_file().read_text()
+
+    transcript.write_text(first + "\n" + second + "\n")
+    checkpoint_claudecode_session()
+    assert "second step" in _report_file().read_text()
+
+    finish_claudecode_session()
+    assert not _checkpoint_file().exists()
+    assert not _report_file().exists()
+    report = ln.Run.get(uid=uid).report
+    html_doc = report.cache().read_text()
+    assert html_doc.endswith("</html>")
+    assert html_doc.count("first step") == 1
+
+
+def test_checkpoint_hook_reads_session_id_from_its_input(tmp_path, monkeypatch):
+    monkeypatch.setenv("CLAUDE_CODE_SESSION_ID", "hook-session")
+    track_claudecode_session(name="hooked session")
+    _transcript_path_file().write_text(str(_write_transcript(tmp_path)))
+    monkeypatch.delenv("CLAUDE_CODE_SESSION_ID")
+    hook_input = {"session_id": "hook-session", "hook_event_name": "Stop"}
+    monkeypatch.setattr("sys.stdin", io.StringIO(json.dumps(hook_input)))
+
+    checkpoint_claudecode_session()
+
+    assert "done" in _report_file().read_text()
+    finish_claudecode_session()
+
+
+def test_checkpoint_waits_for_finish_and_skips_closed_session(tmp_path):
+    import threading
+
+    track_claudecode_session(name="concurrent hooks")
+    transcript = _write_transcript(tmp_path)
+    _transcript_path_file().write_text(str(transcript))
+
+    with _report_lock():
+        checkpoint = threading.Thread(target=checkpoint_claudecode_session)
+        checkpoint.start()
+        checkpoint.join(timeout=0.5)
+        # the checkpoint blocks while a finish holds the lock
+        assert checkpoint.is_alive()
+        assert not _report_file().exists()
+        _run_uid_file().unlink()
+    checkpoint.join()
+
+    # the session was closed meanwhile, so nothing is written again
+    assert not _report_file().exists()
+    assert not _checkpoint_file().exists()
+
+
+def test_paged_report_stores_full_steps_as_gzip_members():
+    out = io.StringIO()
+    bodies = io.BytesIO()
+    renderer = _TranscriptRenderer(out, bodies=bodies)
+    renderer.feed({"role": "user", "content": "short"})
+    renderer.feed({"role": "assistant", "content": "long " * 2000})
+    renderer.close()
+
+    html_doc = out.getvalue()
+    (start, length), *others = [
+        tuple(map(int, m)) for m in re.findall(r'data-body="(\d+):(\d+)"', html_doc)
+    ]
+    # only the truncated step has a body, which decompresses on its own
+    assert not others
+    body = json.loads(gzip.decompress(bodies.getvalue()[start : start + length]))
+    assert body["html"].count("long") == 2000
+    # only a short summary of the step is inlined
+    assert html_doc.count("long") == 60
+    assert "short" in html_doc
+
+
+def test_finish_paged_session_saves_step_bodies(tmp_path, monkeypatch):
+    track_claudecode_session(name="paged session", report_format="paged")
+    uid = _run_uid_file().read_text().strip()
+    transcript = tmp_path / "session.jsonl"
+    message = {"role": "assistant", "content": "long " * 2000}
+    transcript.write_text(json.dumps({"message": message}) + "\n")
+    _transcript_path_file().write_text(str(transcript))
+
+    finish_claudecode_session()
+
+    html_doc = ln.Run.get(uid=uid).report.cache().read_text()
+    ((start, length),) = [
+        tuple(map(int, m)) for m in re.findall(r'data-body="(\d+):(\d+)"', html_doc)
+    ]
+    ref = json.loads(re.search(r"const BODIES = (.*);", html_doc).group(1))
+    # no storage URL that the viewer can't access is embedded
+    assert list(ref) == ["uid"]
+    bodies = ln.Artifact.get(uid=ref["uid"])
+    data = bodies.cache().read_bytes()[start : start + length]
+    assert json.loads(gzip.decompress(data))["html"].count("long") == 2000
+    assert html_doc.count("long") == 60
+
+    # the signed bodies URL is passed in the fragment of the signed report URL
+    monkeypatch.setattr(
+        claude, "_signed_url", lambda a, **kw: f"https://s/{a.uid}?sig={len(kw)}"
+    )
+    report_uid = ln.Run.get(uid=uid).report.uid
+    assert claudecode_report_url(uid) == (
+        f"https://s/{report_uid}?sig=1#bodies=https%3A%2F%2Fs%2F{bodies.uid}%3Fsig%3D0"
+    )
+    bodies.delete(permanent=True)
@@ -0,0 +1,82 @@
+"""Tests for `lamin daemon start|stop|status` and forwarding via `LAMIN_DAEMON`."""
+
+import os
+import subprocess
+
+import lamindb as ln
+
+
+def _daemon_requests(slug: str) -> list[str]:
+    from lamin_cli._daemon import _log_path
+
+    return [
+        line.split(": ", 1)[1]
+        for line in _log_path(slug).read_text().splitlines()
+        if " request " in line
+    ]
+
+
+def test_daemon_forwards_commands():
+    slug = ln.setup.settings.instance.slug
+    result = subprocess.run(
+        "lamin daemon start", shell=True, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert f"export LAMIN_DAEMON={slug}" in result.stdout
+    try:
+        result = subprocess.run(
+            "lamin daemon status", shell=True, capture_output=True, text=True
+        )
+        assert slug in result.stdout
+        # the log of the daemon lists the requests it served
+        n_requests = len(_daemon_requests(slug))
+
+        env = {**os.environ, "LAMIN_DAEMON": slug}
+        forwarded = subprocess.run(
+            "lamin get branch --status",
+            shell=True,
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+        in_process = subprocess.run(
+            "lamin get branch --status", shell=True, capture_output=True, text=True
+        )
+        assert forwarded.returncode == in_process.returncode == 0
+        assert forwarded.stdout == in_process.stdout
+        # only the call with LAMIN_DAEMON ran in the daemon
+        requests = _daemon_requests(slug)[n_requests:]
+        assert requests == ["lamin get"]
+
+        # usage errors and their exit codes are passed through
+        result = subprocess.run(
+            "lamin get --bogus", shell=True, capture_output=True, text=True, env=env
+        )
+        assert result.returncode == 2
+        assert "No such option" in result.stderr
+    finally:
+        result = subprocess.run(
+            "lamin daemon stop", shell=True, capture_output=True, text=True
+        )
+    assert result.returncode == 0, result.stderr
+    assert "stopped daemon" in result.stdout
+
+
+def test_daemon_refuses_directory_accessible_by_others(tmp_path, monkeypatch):
+    from lamin_cli._daemon_client import _socket_path, forward
+
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    daemon_dir = tmp_path / f"lamin-daemon-{os.getuid()}"
+    daemon_dir.mkdir()
+    daemon_dir.chmod(0o755)
+
+    result = subprocess.run(
+        "lamin daemon start", shell=True, capture_output=True, text=True
+    )
+    assert result.returncode == 1
+    assert "accessible by other users" in result.stderr
+
+    # a socket someone else placed there doesn't receive the environment
+    monkeypatch.setenv("LAMIN_DAEMON", "account/name")
+    _socket_path("account/name").touch()
+    assert forward(["get", "branch"]) is None
@@ -1,7 +1,9 @@
 import os
 import subprocess
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
 
+import pytest
 from lamindb_setup.core.upath import UPath
 
 
@@ -35,6 +37,20 @@ def test_snapshot():
             <= file_mtime
             <= after_snapshot + timedelta(seconds=15)
         )
+
+        # the full snapshot recorded the marks to update its clone incrementally
+        assert Path("lamin-site-assets-clone/.lamindb/snapshot.json").exists()
+        result = subprocess.run(
+            "lamin io snapshot --incremental --no-upload --no-track",
+            shell=True,
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+        assert result.returncode == 0, result.stderr
+        assert "creating a full snapshot" not in result.stdout
+        # nothing changed since the full snapshot
+        assert "Snapshot is up to date." in result.stdout
     finally:
         import lamindb_setup as ln_setup
 
@@ -46,3 +62,228 @@ def test_snapshot():
             env=env,
         )
         ln_setup.connect("testuser1/lamin-cli-unit-tests")
+
+
+def test_verify_clone_reports_differing_ids(tmp_path):
+    import shutil
+    import sqlite3
+
+    import lamindb as ln
+    from lamin_cli.clone._clone_verification import verify_clone
+    from lamin_cli.clone._incremental import _snapshot_models, _table_watermarks
+
+    ulabels = [ln.ULabel(name=f"verify-clone-{i}").save() for i in range(3)]
+    clone_db = tmp_path / "lamin.db"
+    shutil.copy(ln.setup.settings.instance._sqlite_file_local, clone_db)
+    models = _snapshot_models(["lamindb"])
+    watermarks = _table_watermarks(models)
+
+    assert verify_clone(models, clone_db, watermarks) == {}
+
+    with sqlite3.connect(clone_db) as clone:
+        clone.execute(
+            "DELETE FROM lamindb_ulabel WHERE id IN (?, ?)",
+            (ulabels[0].id, ulabels[1].id),
+        )
+    differences = verify_clone(models, clone_db, watermarks, bucket_size=2)
+
+    assert differences == {"lamindb_ulabel": [f"ids {ulabels[0].id}-{ulabels[1].id}"]}
+    for ulabel in ulabels:
+        ulabel.delete(permanent=True)
+
+
+def test_verify_clone_compares_column_values(tmp_path):
+    import shutil
+    import sqlite3
+
+    import lamindb as ln
+    from lamin_cli.clone._clone_verification import verify_clone
+    from lamin_cli.clone._incremental import _snapshot_models, _table_watermarks
+
+    ulabels = [ln.ULabel(name=f"verify-values-{i}").save() for i in range(3)]
+    clone_db = tmp_path / "lamin.db"
+    shutil.copy(ln.setup.settings.instance._sqlite_file_local, clone_db)
+    models = _snapshot_models(["lamindb"])
+    watermarks = _table_watermarks(models)
+
+    # the same ids and timestamps, but other values
+    with sqlite3.connect(clone_db) as clone:
+        clone.execute(
+            "UPDATE lamindb_ulabel SET name = 'changed' WHERE id = ?",
+            (ulabels[0].id,),
+        )
+        clone.execute(
+            "UPDATE lamindb_ulabel SET is_type = 't' WHERE id = ?", (ulabels[2].id,)
+        )
+    differences = verify_clone(models, clone_db, watermarks)
+
+    assert differences == {"lamindb_ulabel": [f"ids {ulabels[0].id}, {ulabels[2].id}"]}
+    for ulabel in ulabels:
+        ulabel.delete(permanent=True)
+
+
+def test_verify_clone_with_changed_keys_checks_their_buckets(tmp_path):
+    import shutil
+    import sqlite3
+
+    import lamindb as ln
+    from lamin_cli.clone._clone_verification import verify_clone
+    from lamin_cli.clone._incremental import _snapshot_models, _table_watermarks
+
+    ulabels = [ln.ULabel(name=f"verify-changed-{i}").save() for i in range(3)]
+    clone_db = tmp_path / "lamin.db"
+    shutil.copy(ln.setup.settings.instance._sqlite_file_local, clone_db)
+    models = _snapshot_models(["lamindb"])
+    watermarks = _table_watermarks(models)
+    with sqlite3.connect(clone_db) as clone:
+        clone.execute(
+            "UPDATE lamindb_ulabel SET name = 'changed' WHERE id = ?",
+            (ulabels[0].id,),
+        )
+
+    # a bucket without changed keys isn't compared
+    changed_keys = {"lamindb_ulabel": {ulabels[2].id + 10}}
+    differences = verify_clone(
+        models, clone_db, watermarks, changed_keys=changed_keys, bucket_size=2
+    )
+    assert differences == {}
+    changed_keys = {"lamindb_ulabel": {ulabels[0].id}}
+    differences = verify_clone(
+        models, clone_db, watermarks, changed_keys=changed_keys, bucket_size=2
+    )
+    assert differences == {"lamindb_ulabel": [f"ids {ulabels[0].id}"]}
+    # the other tables only compare row counts
+    with sqlite3.connect(clone_db) as clone:
+        clone.execute("DELETE FROM lamindb_user")
+    differences = verify_clone(models, clone_db, watermarks, changed_keys={})
+    assert list(differences) == ["lamindb_user"]
+    for ulabel in ulabels:
+        ulabel.delete(permanent=True)
+
+
+def test_zstd_snapshot_frames_upload_and_partial_reads(tmp_path):
+    pytest.importorskip("zstandard")
+    from lamin_cli.clone._package import (
+        download_snapshot,
+        read_snapshot_range,
+        upload_snapshot,
+    )
+
+    sqlite_path = tmp_path / "lamin.db"
+    data = bytearray(os.urandom(95_000))
+    sqlite_path.write_bytes(data)
+    # a local directory stands in for the object store
+    store = tmp_path / "store" / "lamin.db.zst"
+
+    stats = upload_snapshot(sqlite_path, store, frame_size=10_000)
+    assert stats["frames"] == stats["uploaded"] == 10
+
+    # only the changed frame is uploaded again
+    data[42_000:42_010] = b"x" * 10
+    sqlite_path.write_bytes(data)
+    assert upload_snapshot(sqlite_path, store, frame_size=10_000)["uploaded"] == 1
+
+    assert read_snapshot_range(store, 39_990, 20_000) == bytes(data[39_990:59_990])
+
+    local_path = tmp_path / "copy.db"
+    assert download_snapshot(store, local_path)["downloaded"] == 10
+    data[0:2] = b"zz"
+    sqlite_path.write_bytes(data)
+    upload_snapshot(sqlite_path, store, frame_size=10_000)
+    assert download_snapshot(store, local_path)["downloaded"] == 1
+    assert local_path.read_bytes() == bytes(data)
+
+
+def test_exportdb_filters_resumes_and_exports_since(tmp_path):
+    import json
+
+    import lamindb as ln
+
+    output_dir = tmp_path / "export"
+    command = [
+        "lamin",
+        "io",
+        "exportdb",
+        "--include",
+        "lamindb.ULabel,lamindb_user",
+        "--chunk-size",
+        "2",
+        "--output-dir",
+        str(output_dir),
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    manifest = json.loads((output_dir / "manifest.json").read_text())
+    assert manifest["complete"]
+    assert sorted(manifest["tables"]) == ["lamindb_ulabel", "lamindb_user"]
+    for entry in manifest["tables"].values():
+        assert all(chunk["rows"] <= 2 for chunk in entry["chunks"])
+
+    # rerunning a complete export writes nothing again
+    result = subprocess.run(command, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert json.loads((output_dir / "manifest.json").read_text()) == manifest
+
+    ulabel = ln.ULabel(name="exportdb-since").save()
+    delta_dir = tmp_path / "delta"
+    result = subprocess.run(
+        [*command[:-1], str(delta_dir), "--since", str(output_dir)],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    delta = json.loads((delta_dir / "manifest.json").read_text())
+    chunks = delta["tables"]["lamindb_ulabel"]["chunks"]
+    assert [chunk["rows"] for chunk in chunks] == [1]
+    ulabel.delete(permanent=True)
+
+
+def test_importdb_upsert_matches_rows_on_uid(tmp_path):
+    import lamindb as ln
+
+    ulabel = ln.ULabel(name="importdb-upsert").save()
+    output_dir = tmp_path / "export"
+    command = ["lamin", "io", "exportdb", "--include", "lamindb_ulabel"]
+    result = subprocess.run(
+        [*command, "--output-dir", str(output_dir)], capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    n_ulabels = ln.ULabel.filter().count()
+    ulabel.name = "importdb-upsert-changed"
+    ulabel.save()
+
+    command = ["lamin", "io", "importdb", "--if-exists", "upsert"]
+    result = subprocess.run(
+        [*command, "--input-dir", str(output_dir)], capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert "lamindb_ulabel: " in result.stdout
+    # the exported row replaced the changed one instead of being added
+    assert ln.ULabel.filter().count() == n_ulabels
+    assert ln.ULabel.get(uid=ulabel.uid).name == "importdb-upsert"
+    # references to tables that weren't exported are remapped with their id maps
+    assert ln.ULabel.get(uid=ulabel.uid).created_by_id == ulabel.created_by_id
+    ulabel.delete(permanent=True)
+
+
+def test_importdb_upsert_refuses_unmapped_foreign_keys(tmp_path):
+    import json
+
+    output_dir = tmp_path / "export"
+    command = ["lamin", "io", "exportdb", "--include", "lamindb_ulabel"]
+    result = subprocess.run(
+        [*command, "--output-dir", str(output_dir)], capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    manifest_path = output_dir / "manifest.json"
+    manifest = json.loads(manifest_path.read_text())
+    assert "lamindb_user" in manifest["id_maps"]
+    manifest["id_maps"] = {}
+    manifest_path.write_text(json.dumps(manifest))
+
+    command = ["lamin", "io", "importdb", "--if-exists", "upsert"]
+    result = subprocess.run(
+        [*command, "--input-dir", str(output_dir)], capture_output=True, text=True
+    )
+    assert result.returncode == 1
+    assert "lamindb_ulabel.created_by_id -> lamindb_user" in result.stderr
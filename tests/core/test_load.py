@@ -142,3 +142,32 @@ def test_load_collection():
         capture_output=True,
     )
     assert result.returncode == 0
+
+
+def test_load_many_artifacts(tmp_path):
+    subprocess.run("lamin connect laminlabs/lamin-site-assets", shell=True)
+    path_manifest = tmp_path / "paths.tsv"
+    result = subprocess.run(
+        "lamin load --uid e2G7k9EVul4JbfsEYA"
+        " --key blog/nbproject/elyra-completed-tutorial-pipeline.png"
+        f" --max-workers 2 --path-manifest {path_manifest}",
+        shell=True,
+        capture_output=True,
+    )
+    print(result.stdout.decode())
+    print(result.stderr.decode())
+    assert result.returncode == 0
+    header, *rows = path_manifest.read_text().splitlines()
+    assert header == "uid\tkey\tpath"
+    assert len(rows) == 2
+    for row in rows:
+        assert Path(row.split("\t")[2]).exists()
+
+    # missing artifacts are reported before downloading
+    result = subprocess.run(
+        "lamin load --key does/not/exist.txt --key-prefix blog/nbproject/",
+        shell=True,
+        capture_output=True,
+    )
+    assert result.returncode == 1
+    assert "key=does/not/exist.txt" in result.stderr.decode()
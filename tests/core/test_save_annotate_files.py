@@ -1,3 +1,4 @@
+import json
 import re
 import subprocess
 from pathlib import Path
@@ -148,3 +149,59 @@ def test_save_cloud_file():
         shell=True,
         check=True,
     )
+
+
+def test_save_many_files(tmp_path):
+    run_dir = tmp_path / "run42"
+    (run_dir / "lane1").mkdir(parents=True)
+    for i in range(3):
+        (run_dir / "lane1" / f"reads{i}.txt").write_text(f"batch save {i}")
+    (run_dir / "extra.txt").write_text("batch save extra")
+    manifest = tmp_path / "manifest.tsv"
+    manifest.write_text(
+        "path\tkey\tdescription\n"
+        "run42/extra.txt\tbatch_test/extra.txt\tan extra file\n"
+        "run42/missing.txt\tbatch_test/missing.txt\t\n"
+    )
+    summary_path = tmp_path / "summary.json"
+
+    result = subprocess.run(
+        f"lamin save '{run_dir}/**/reads*.txt' --key batch_test/run42"
+        f" --manifest {manifest} --summary {summary_path} --max-workers 2",
+        shell=True,
+        capture_output=True,
+    )
+    print(result.stdout.decode())
+    print(result.stderr.decode())
+    # the missing manifest entry fails, all others are saved
+    assert result.returncode == 1
+
+    summary = json.loads(summary_path.read_text())
+    statuses = {entry["key"]: entry["status"] for entry in summary["files"]}
+    assert statuses["batch_test/missing.txt"] == "failed"
+    assert statuses["batch_test/extra.txt"] == "saved"
+    assert statuses["batch_test/run42/lane1/reads0.txt"] == "saved"
+    assert summary["saved"] == 4
+    assert summary["failed"] == 1
+    artifact = ln.Artifact.get(key="batch_test/run42/lane1/reads2.txt")
+    assert artifact.description is None
+
+    for artifact in ln.Artifact.filter(key__startswith="batch_test/"):
+        artifact.delete(permanent=True)
+
+
+def test_save_existing_path_with_glob_characters(tmp_path):
+    path = tmp_path / "results[1].csv"
+    path.write_text("a,b\n1,2\n")
+
+    result = subprocess.run(
+        f"lamin save '{path}' --key glob_chars_test/results.csv",
+        shell=True,
+        capture_output=True,
+    )
+    print(result.stdout.decode())
+    print(result.stderr.decode())
+    assert result.returncode == 0
+
+    artifact = ln.Artifact.get(key="glob_chars_test/results.csv")
+    artifact.delete(permanent=True)
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from click.testing import CliRunner
+from lamin_cli.hub import hub
+from lamin_cli.hub._cache import ResponseCache
+from lamin_cli.hub._client import HubClient
+
+
+class EtagHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    requests: list[tuple[str, str, str | None]] = []
+    etag = '"v1"'
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if_none_match = self.headers.get("If-None-Match")
+        type(self).requests.append((self.command, self.path, if_none_match))
+        if if_none_match == self.etag:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        payload = json.dumps([{"uid": "abc123", "etag": self.etag}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("ETag", self.etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def cached_client(monkeypatch, tmp_path):
+    monkeypatch.delenv("LAMIN_ENV", raising=False)
+    EtagHandler.requests = []
+    EtagHandler.etag = '"v1"'
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EtagHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = HubClient(
+        instance_id="inst-1",
+        api_url=f"http://127.0.0.1:{server.server_address[1]}",
+        access_token="tok",
+        cache=ResponseCache(tmp_path / "responses"),
+    )
+    yield client
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_cached_reads_skip_requests_until_mutation(cached_client):
+    for _ in range(3):
+        data = cached_client.request_json(
+            "post", "modules/core/artifact", body={"select": ["uid"]}
+        )
+        assert data == [{"uid": "abc123", "etag": '"v1"'}]
+    assert len(EtagHandler.requests) == 1
+
+    # another body is another entry
+    cached_client.request_json("post", "modules/core/artifact", body={"select": []})
+    assert len(EtagHandler.requests) == 2
+
+    cached_client.request_json("put", "modules/core/ulabel", body={"name": "x"})
+    cached_client.request_json(
+        "post", "modules/core/artifact", body={"select": ["uid"]}
+    )
+    assert [request[0] for request in EtagHandler.requests] == [
+        "POST",
+        "POST",
+        "PUT",
+        "POST",
+    ]
+
+
+def test_expired_entries_are_revalidated_with_etag(monkeypatch, cached_client):
+    monkeypatch.setattr("lamin_cli.hub._client.cache_ttl", lambda method, path: 0)
+
+    first = cached_client.request_json("get", "statistics")
+    second = cached_client.request_json("get", "statistics")
+    EtagHandler.etag = '"v2"'
+    third = cached_client.request_json("get", "statistics")
+
+    assert first == second == [{"uid": "abc123", "etag": '"v1"'}]
+    assert third == [{"uid": "abc123", "etag": '"v2"'}]
+    assert [request[2] for request in EtagHandler.requests] == [None, '"v1"', '"v1"']
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path):
+    entry = {"method": "get", "path": "statistics", "stored_at": 0, "data": "x" * 50}
+    cache = ResponseCache(tmp_path, max_bytes=2 * len(json.dumps(entry)))
+    cache.put("inst-1", "a", entry)
+    cache.put("inst-1", "b", entry)
+    os.utime(tmp_path / "inst-1" / "a.json", (1, 1))
+    os.utime(tmp_path / "inst-1" / "b.json", (2, 2))
+    # reading "a" makes "b" the least recently used entry
+    assert cache.get("inst-1", "a") is not None
+
+    cache.put("inst-1", "c", entry)
+
+    assert sorted(path.stem for path in (tmp_path / "inst-1").glob("*.json")) == [
+        "a",
+        "c",
+    ]
+
+
+def test_hub_cache_stats_and_clear(monkeypatch, tmp_path):
+    monkeypatch.setenv("LAMIN_HUB_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("LAMIN_HUB_CACHE", "1")
+    cache = ResponseCache(tmp_path)
+    cache.put(
+        "inst-1",
+        "a",
+        {"method": "get", "path": "statistics", "stored_at": 0, "data": {}},
+    )
+
+    result = CliRunner().invoke(hub, ["cache", "stats", "--compact"])
+
+    assert result.exit_code == 0, result.output
+    stats = json.loads(result.output)
+    assert stats["enabled"] is True
+    assert stats["entries"] == 1
+    assert stats["endpoints"] == {"GET statistics": {"entries": 1, "fresh": 0}}
+
+    result = CliRunner().invoke(hub, ["cache", "clear"])
+
+    assert result.exit_code == 0, result.output
+    assert "removed 1 cached responses" in result.output
+    assert not list(tmp_path.glob("*/*.json"))
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from lamin_cli.hub._client import HubClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+    requests: list[tuple[str, str, str | None]] = []
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length)) if length else None
+        type(self).requests.append((self.path, self.headers.get("Authorization"), body))
+        payload = json.dumps([{"uid": "abc123"}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    monkeypatch.delenv("LAMIN_ENV", raising=False)
+    StubHandler.connections = 0
+    StubHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_hub_client_reuses_connection(stub_server):
+    client = HubClient(instance_id="inst-1", api_url=stub_server, access_token="tok")
+    try:
+        for _ in range(5):
+            data = client.request_json(
+                "post", "modules/core/artifact", params={"limit": 1}, body={"x": 1}
+            )
+            assert data == [{"uid": "abc123"}]
+    finally:
+        client.close()
+
+    assert StubHandler.connections == 1
+    assert StubHandler.requests[0] == (
+        "/instances/inst-1/modules/core/artifact?limit=1",
+        "Bearer tok",
+        {"x": 1},
+    )
+    assert len(StubHandler.requests) == 5
+
+
+def test_hub_client_doesnt_wrap_encoding_errors(stub_server):
+    import datetime
+
+    client = HubClient(instance_id="inst-1", api_url=stub_server, access_token="tok")
+    try:
+        # not a request failure that could be retried
+        with pytest.raises(TypeError):
+            client.request_json(
+                "post", "modules/core/run", body={"started_at": datetime.date.today()}
+            )
+    finally:
+        client.close()
+    assert StubHandler.requests == []
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import subprocess
+import sys
+
 from click.testing import CliRunner
 from lamin_cli.hub import hub
 
@@ -47,3 +50,36 @@ def test_rest_delete_help_includes_bulk_ulabel_example():
     assert "lamin hub delete core ulabel" in result.output
     assert "--objects" in result.output
     assert '[{"name":"control"},{"name":"treated"}]' in result.output
+
+
+# like tests/profiling/import_lamin_cli.py, reports the imports at exit
+_CHILD = """\
+import atexit, sys
+atexit.register(lambda: print("lamin_cli.hub" in sys.modules, file=sys.stderr))
+from lamin_cli.__main__ import main
+main(prog_name="lamin")
+"""
+
+
+def _run_lamin(*args: str) -> tuple[subprocess.CompletedProcess, bool]:
+    # a fresh interpreter, since this module imports lamin_cli.hub
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD, *args], capture_output=True, text=True
+    )
+    imports_hub = result.stderr.strip().splitlines()[-1] == "True"
+    return result, imports_hub
+
+
+def test_main_resolves_hub_lazily():
+    # other commands don't resolve it, unlike `lamin --help`, which lists the
+    # short help of every command
+    result, imports_hub = _run_lamin("track", "--help")
+
+    assert result.returncode == 0, result.stderr
+    assert not imports_hub
+
+    result, imports_hub = _run_lamin("hub", "list", "--help")
+
+    assert result.returncode == 0, result.stderr
+    assert "--filter" in result.stdout
+    assert imports_hub
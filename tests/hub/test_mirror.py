@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import json
+import operator
+
+import pytest
+from click.testing import CliRunner
+from lamin_cli._mirror import mirror
+from lamin_cli.hub import hub
+
+SCHEMA = {
+    "core": {
+        "artifact": {
+            "class_name": "Artifact",
+            "fields": {
+                "id": {"type": "integer"},
+                "uid": {"type": "string"},
+                "key": {"type": "string"},
+                "updated_at": {"type": "datetime"},
+            },
+        },
+        "artifactulabel": {
+            "class_name": "ArtifactULabel",
+            "is_link_table": True,
+            "fields": {"id": {"type": "integer"}, "updated_at": {}},
+        },
+        "user": {"class_name": "User", "fields": {"id": {"type": "integer"}}},
+    }
+}
+OPERATORS = {"eq": operator.eq, "gt": operator.gt, "gte": operator.ge}
+
+
+def _matches(row: dict, condition: dict) -> bool:
+    if "and" in condition:
+        return all(_matches(row, c) for c in condition["and"])
+    if "or" in condition:
+        return any(_matches(row, c) for c in condition["or"])
+    ((field, ops),) = condition.items()
+    return all(OPERATORS[op](row[field], value) for op, value in ops.items())
+
+
+@pytest.fixture
+def hub_rows(monkeypatch, tmp_path, patch_request_json):
+    monkeypatch.setenv("LAMIN_MIRROR_DIR", str(tmp_path))
+    monkeypatch.delenv("LAMIN_OFFLINE", raising=False)
+    monkeypatch.setattr(
+        "lamin_cli.hub._client._current_instance", lambda: ("inst-1", "http://hub")
+    )
+    patch_request_json("_schema.utils", lambda *args: SCHEMA)
+    monkeypatch.setattr(
+        "lamin_cli.hub._schema.utils._current_schema_cache_path", lambda: None
+    )
+    rows = {
+        i: {
+            "id": i,
+            "uid": f"uid{i}",
+            "key": f"file{i}.parquet",
+            "updated_at": f"2026-01-0{i}T00:00:00",
+        }
+        for i in range(1, 4)
+    }
+
+    def handler(method, path, params, body):
+        assert path == "modules/core/artifact"
+        selected = [
+            row
+            for row in rows.values()
+            if _matches(row, body.get("filter", {"and": []}))
+        ]
+        selected.sort(key=lambda row: (row["updated_at"], row["id"]))
+        return selected[params["offset"] :][: params["limit"]]
+
+    calls = patch_request_json("_query", handler)
+    return rows, calls
+
+
+def test_mirror_sync_pulls_rows_after_watermark(hub_rows):
+    rows, calls = hub_rows
+
+    result = CliRunner().invoke(mirror, ["sync"])
+
+    assert result.exit_code == 0, result.output
+    # link tables and registries without updated_at aren't mirrored
+    assert "core.artifact: 3 rows synced, 3 rows mirrored" in result.output
+    assert "artifactulabel" not in result.output
+    assert "filter" not in calls[0][3]
+
+    rows[2] = {**rows[2], "key": "renamed.parquet", "updated_at": "2026-01-05"}
+    n_calls = len(calls)
+    result = CliRunner().invoke(mirror, ["sync", "--registry", "core.Artifact"])
+
+    assert result.exit_code == 0, result.output
+    # rows updated at the watermark are requested again
+    assert "core.artifact: 2 rows synced, 3 rows mirrored" in result.output
+    assert calls[n_calls][3]["filter"] == {"updated_at": {"gte": "2026-01-03T00:00:00"}}
+
+    result = CliRunner().invoke(mirror, ["status"])
+
+    assert result.exit_code == 0, result.output
+    assert "core.artifact: 3 rows, updated until 2026-01-05" in result.output
+
+
+def test_mirror_sync_keeps_rows_sharing_the_watermark(hub_rows):
+    rows, _ = hub_rows
+    late = rows.pop(3)
+
+    assert CliRunner().invoke(mirror, ["sync"]).exit_code == 0
+    # committed after the sync with the timestamp of the watermark
+    rows[3] = {**late, "updated_at": rows[2]["updated_at"]}
+    result = CliRunner().invoke(mirror, ["sync"])
+
+    assert result.exit_code == 0, result.output
+    assert "core.artifact: 2 rows synced, 3 rows mirrored" in result.output
+
+
+def test_offline_hub_reads_from_mirror(monkeypatch, hub_rows):
+    from lamin_cli.hub._client import request_json
+
+    assert CliRunner().invoke(mirror, ["sync"]).exit_code == 0
+    monkeypatch.setenv("LAMIN_OFFLINE", "1")
+    monkeypatch.setattr("lamin_cli.hub._query.request_json", request_json)
+
+    result = CliRunner().invoke(
+        hub,
+        [
+            "list",
+            "core",
+            "artifact",
+            "--filter",
+            '{"or":[{"key":{"contains":"file1"}},{"id":{"gte":3}}]}',
+            "--order-by",
+            '[{"field":"updated_at","descending":true}]',
+            "--select",
+            "uid",
+            "--compact",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output) == [{"uid": "uid3"}, {"uid": "uid1"}]
+
+    result = CliRunner().invoke(hub, ["get", "core", "artifact", "uid2", "--compact"])
+
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output)["key"] == "file2.parquet"
+
+    result = CliRunner().invoke(
+        hub, ["statistics", "core", "artifact", "--format", "json", "--compact"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output) == {"counts": {"core": {"Artifact": 3}}}
+
+    result = CliRunner().invoke(hub, ["insert", "core", "ulabel", "--objects", "{}"])
+
+    assert result.exit_code == 1
+    assert "isn't available offline" in result.output
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_offline_list_all_pages_over_null_values(monkeypatch, hub_rows, descending):
+    from lamin_cli.hub._client import request_json
+
+    rows, _ = hub_rows
+    rows[2] = {**rows[2], "key": None}
+    assert CliRunner().invoke(mirror, ["sync"]).exit_code == 0
+    monkeypatch.setenv("LAMIN_OFFLINE", "1")
+    monkeypatch.setattr("lamin_cli.hub._query.request_json", request_json)
+
+    order_by = json.dumps([{"field": "key", "descending": descending}])
+    result = CliRunner().invoke(
+        hub,
+        [
+            "list",
+            "core",
+            "artifact",
+            "--all",
+            "--order-by",
+            order_by,
+            "--select",
+            "uid",
+            "--page-size",
+            "1",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    uids = [json.loads(line)["uid"] for line in result.output.splitlines()]
+    # NULLs sort last in ascending and first in descending order
+    assert uids == (
+        ["uid2", "uid3", "uid1"] if descending else ["uid1", "uid3", "uid2"]
+    )
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 
+import pytest
 from click.testing import CliRunner
 from lamin_cli.hub import hub
 
@@ -184,3 +185,284 @@ def test_rest_delete_batch_constructs_request(monkeypatch):
             {"records": [{"record_id": 1, "feature_id": 2, "value_id": 3}]},
         )
     ]
+
+
+def test_rest_insert_from_ndjson_in_batches(tmp_path, patch_request_json):
+    source = tmp_path / "ulabels.ndjson"
+    source.write_text("".join(f'{{"name":"label{i}"}}\n' for i in range(5)))
+    calls = patch_request_json(
+        "_mutations", lambda method, path, params, body: {"inserted": len(body)}
+    )
+
+    result = CliRunner().invoke(
+        hub,
+        ["insert", "core", "ulabel", "--from", str(source), "--batch-size", "2"],
+    )
+
+    assert result.exit_code == 0, result.output
+    reports = sorted(
+        (json.loads(line) for line in result.output.splitlines() if line[:1] == "{"),
+        key=lambda report: report["batch"],
+    )
+    assert [report["rows"] for report in reports] == [2, 2, 1]
+    assert reports[2]["response"] == {"inserted": 1}
+    assert sorted(body[0]["name"] for _, _, _, body in calls) == [
+        "label0",
+        "label2",
+        "label4",
+    ]
+    assert all(path == "modules/core/ulabel" for _, path, _, _ in calls)
+
+
+def test_rest_insert_from_parquet_sends_json_values(tmp_path, patch_request_json):
+    import datetime
+    from decimal import Decimal
+
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    source = tmp_path / "runs.parquet"
+    started_at = datetime.datetime(2026, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)
+    table = pa.table(
+        {
+            "started_at": pa.array([started_at]),
+            "day": pa.array([datetime.date(2026, 1, 2)]),
+            "cost": pa.array([Decimal("1.50")], pa.decimal128(5, 2)),
+        }
+    )
+    pq.write_table(table, source)
+    calls = patch_request_json("_mutations", lambda method, path, params, body: {})
+
+    result = CliRunner().invoke(hub, ["insert", "core", "run", "--from", str(source)])
+
+    assert result.exit_code == 0, result.output
+    assert calls[0][3] == [
+        {
+            "started_at": "2026-01-02T03:04:05+00:00",
+            "day": "2026-01-02",
+            "cost": "1.50",
+        }
+    ]
+
+
+def test_rest_upsert_from_csv_retries(monkeypatch, tmp_path, patch_request_json):
+    from lamin_cli.hub._client import HubRequestError
+
+    monkeypatch.setattr("lamin_cli.hub._batches.time.sleep", lambda seconds: None)
+    source = tmp_path / "ulabels.csv"
+    source.write_text("name,description\ntreated,\ncontrol,untreated\n")
+    attempts = []
+
+    def handler(method, path, params, body):
+        attempts.append(body)
+        if len(attempts) < 3:
+            raise HubRequestError("unavailable", status_code=503)
+        return body
+
+    calls = patch_request_json("_mutations", handler)
+
+    result = CliRunner().invoke(
+        hub,
+        [
+            "upsert",
+            "core",
+            "ulabel",
+            "--conflict-column",
+            "name",
+            "--from",
+            str(source),
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert len(calls) == 3
+    assert calls[-1] == (
+        "put",
+        "modules/core/ulabel/upsert",
+        {"conflict_columns": ["name"]},
+        [
+            {"name": "treated", "description": None},
+            {"name": "control", "description": "untreated"},
+        ],
+    )
+
+
+def test_rest_insert_from_only_retries_rate_limited_batches(
+    monkeypatch, tmp_path, patch_request_json
+):
+    from lamin_cli.hub._client import HubRequestError
+
+    delays = []
+    monkeypatch.setattr("lamin_cli.hub._batches.time.sleep", delays.append)
+    source = tmp_path / "ulabels.ndjson"
+    source.write_text('{"name":"treated"}\n')
+    errors = [
+        HubRequestError("too many requests", status_code=429, retry_after=3600),
+        HubRequestError("gateway timeout", status_code=504),
+    ]
+
+    def handler(method, path, params, body):
+        raise errors.pop(0)
+
+    calls = patch_request_json("_mutations", handler)
+
+    result = CliRunner().invoke(
+        hub, ["insert", "core", "ulabel", "--from", str(source)]
+    )
+
+    # the timed out insert may have been processed and isn't sent again
+    assert result.exit_code == 1
+    assert len(calls) == 2
+    assert delays == [60.0]
+
+
+def test_rest_insert_from_resumes_checkpoint(tmp_path, patch_request_json):
+    from lamin_cli.hub._client import HubRequestError
+
+    source = tmp_path / "ulabels.ndjson"
+    source.write_text("".join(f'{{"name":"label{i}"}}\n' for i in range(3)))
+    checkpoint = tmp_path / "ulabels.ckpt"
+    fail = {"label1"}
+
+    def handler(method, path, params, body):
+        if body[0]["name"] in fail:
+            raise HubRequestError("bad request", status_code=400)
+        return None
+
+    calls = patch_request_json("_mutations", handler)
+    args = [
+        "insert",
+        "core",
+        "ulabel",
+        "--from",
+        str(source),
+        "--batch-size",
+        "1",
+        "--max-workers",
+        "1",
+        "--checkpoint",
+        str(checkpoint),
+    ]
+
+    result = CliRunner().invoke(hub, args)
+
+    assert result.exit_code == 1
+    assert "resume with --checkpoint" in result.output
+    # a rejected batch doesn't stop the remaining ones
+    assert [body[0]["name"] for _, _, _, body in calls] == [
+        "label0",
+        "label1",
+        "label2",
+    ]
+    assert json.loads(checkpoint.read_text())["done"] == [0, 2]
+
+    fail.clear()
+    calls.clear()
+    result = CliRunner().invoke(hub, args)
+
+    assert result.exit_code == 0, result.output
+    assert [body[0]["name"] for _, _, _, body in calls] == ["label1"]
+    assert not checkpoint.exists()
+
+
+def test_rest_insert_objects_stay_one_request(patch_request_json):
+    calls = patch_request_json("_mutations", lambda *args: {"inserted": 3})
+    objects = [{"name": f"label{i}"} for i in range(3)]
+
+    result = CliRunner().invoke(
+        hub,
+        [
+            "insert",
+            "core",
+            "ulabel",
+            "--objects",
+            json.dumps(objects),
+            "--batch-size",
+            "2",
+            "--compact",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output) == {"inserted": 3}
+    assert [body for _, _, _, body in calls] == [objects]
+
+
+def test_rest_update_objects_in_batches_reports_failed_index_values(
+    patch_request_json,
+):
+    from lamin_cli.hub._client import HubRequestError
+
+    def handler(method, path, params, body):
+        if any(record["uid"] == "uid3" for record in body["records"]):
+            raise HubRequestError("bad request", status_code=400)
+        return {"updated": len(body["records"])}
+
+    calls = patch_request_json("_mutations", handler)
+    objects = [{"uid": f"uid{i}", "description": "updated"} for i in range(5)]
+
+    result = CliRunner().invoke(
+        hub,
+        [
+            "update",
+            "core",
+            "project",
+            "--index-column",
+            "uid",
+            "--objects",
+            json.dumps(objects),
+            "--batch-size",
+            "2",
+        ],
+    )
+
+    assert result.exit_code == 1
+    assert "1 batches failed, sent 2 batches (3 rows)" in result.output
+    reports = {
+        report["batch"]: report
+        for report in (
+            json.loads(line) for line in result.output.splitlines() if line[:1] == "{"
+        )
+    }
+    assert reports[0]["response"] == {"updated": 2}
+    assert reports[1]["failed"] == [{"uid": "uid2"}, {"uid": "uid3"}]
+    assert "response" not in reports[1]
+    assert len(calls) == 3
+    assert all(
+        method == "patch"
+        and path == "modules/core/project/batch-update"
+        and body["index_columns"] == ["uid"]
+        for method, path, _, body in calls
+    )
+
+
+def test_rest_delete_from_csv_in_batches(tmp_path, patch_request_json):
+    source = tmp_path / "obsolete.csv"
+    source.write_text("name\n" + "".join(f"label{i}\n" for i in range(3)))
+    calls = patch_request_json(
+        "_mutations",
+        lambda method, path, params, body: {"deleted": len(body["records"])},
+    )
+
+    result = CliRunner().invoke(
+        hub,
+        ["delete", "core", "ulabel", "--from", str(source), "--batch-size", "2"],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "sent 2 batches (3 rows)" in result.output
+    assert sorted(
+        (method, path, body["records"][0]["name"]) for method, path, _, body in calls
+    ) == [
+        ("post", "modules/core/ulabel/batch-delete", "label0"),
+        ("post", "modules/core/ulabel/batch-delete", "label2"),
+    ]
+
+
+def test_rest_delete_checkpoint_requires_from():
+    result = CliRunner().invoke(
+        hub,
+        ["delete", "core", "ulabel", "--objects", "[]", "--checkpoint", "x.ckpt"],
+    )
+
+    assert result.exit_code == 1
+    assert "--checkpoint requires --from" in result.output
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 
+import pytest
 from click.testing import CliRunner
 from lamin_cli.hub import hub
 
@@ -96,3 +97,195 @@ def test_rest_get_constructs_request(monkeypatch):
             {"select": ["uid", "name"]},
         )
     ]
+
+
+def test_rest_list_all_streams_keyset_pages(monkeypatch):
+    rows = [{"id": i, "uid": f"uid{i}"} for i in range(1, 6)]
+    calls = []
+
+    def fake_request_json(method, path, *, params=None, body=None):
+        calls.append((params, body))
+        after = 0
+        if "filter" in body:
+            keyset = (
+                body["filter"]["and"][1] if "and" in body["filter"] else body["filter"]
+            )
+            after = keyset["id"]["gt"]
+        matches = [row for row in rows if row["id"] > after]
+        page = matches[params["offset"] : params["offset"] + params["limit"]]
+        return [{"uid": row["uid"], "id": row["id"]} for row in page]
+
+    monkeypatch.setattr("lamin_cli.hub._query.request_json", fake_request_json)
+
+    result = CliRunner().invoke(
+        hub,
+        ["list", "core", "artifact", "--all", "--select", "uid", "--page-size", "2"],
+    )
+
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    # id is only requested for paging
+    assert [json.loads(line) for line in lines] == [
+        {"uid": f"uid{i}"} for i in range(1, 6)
+    ]
+    assert len(calls) == 3
+    assert calls[0][1] == {
+        "select": ["uid", "id"],
+        "order_by": [{"field": "id", "descending": False}],
+    }
+    assert calls[2][1]["filter"] == {"id": {"gt": 4}}
+    assert all(params["offset"] == 0 for params, _ in calls)
+
+
+def test_rest_list_all_keyset_with_order_by_and_max_rows(
+    monkeypatch, patch_request_json
+):
+    calls = patch_request_json(
+        "_query",
+        lambda method, path, params, body: [
+            {"id": 10 + i, "created_at": "2024-01-01"} for i in range(params["limit"])
+        ],
+    )
+
+    result = CliRunner().invoke(
+        hub,
+        [
+            "list",
+            "core",
+            "artifact",
+            "--all",
+            "--filter",
+            '{"key":{"contains":"sample"}}',
+            "--order-by",
+            '[{"field":"created_at","descending":true}]',
+            "--page-size",
+            "2",
+            "--max-rows",
+            "3",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert len(result.output.splitlines()) == 3
+    assert [params["limit"] for _, _, params, _ in calls] == [2, 1]
+    assert calls[1][3]["filter"] == {
+        "and": [
+            {"key": {"contains": "sample"}},
+            {
+                "or": [
+                    {"created_at": {"lt": "2024-01-01"}},
+                    {
+                        "and": [
+                            {"created_at": {"eq": "2024-01-01"}},
+                            {"id": {"gt": 11}},
+                        ]
+                    },
+                ]
+            },
+        ]
+    }
+
+
+def test_rest_list_all_falls_back_to_offset(monkeypatch, patch_request_json):
+    rows = [{"uid": f"uid{i}"} for i in range(3)]
+    calls = patch_request_json(
+        "_query",
+        lambda method, path, params, body: rows[
+            params["offset"] : params["offset"] + params["limit"]
+        ],
+    )
+
+    result = CliRunner().invoke(
+        hub,
+        [
+            "list",
+            "core",
+            "artifact",
+            "--all",
+            "--order-by",
+            '[{"field":"run.created_at"}]',
+            "--page-size",
+            "2",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert [params["offset"] for _, _, params, _ in calls] == [0, 2]
+    assert "filter" not in calls[1][3]
+
+
+def test_rest_list_all_prefetch_keeps_pages_in_flight(patch_request_json):
+    import threading
+    import time
+
+    rows = [{"uid": f"uid{i}"} for i in range(7)]
+    in_flight = []
+    lock = threading.Lock()
+    active = 0
+
+    def handler(method, path, params, body):
+        nonlocal active
+        with lock:
+            active += 1
+            in_flight.append(active)
+        # later pages answer first, output must stay in order
+        time.sleep(0.05 / (1 + params["offset"]))
+        with lock:
+            active -= 1
+        return rows[params["offset"] : params["offset"] + params["limit"]]
+
+    # the first page is requested on its own
+    first_calls = patch_request_json("_query", handler)
+    calls = patch_request_json("_client", handler)
+
+    result = CliRunner().invoke(
+        hub,
+        [
+            "list",
+            "core",
+            "artifact",
+            "--all",
+            "--order-by",
+            '[{"field":"run.created_at"}]',
+            "--page-size",
+            "2",
+            "--prefetch",
+            "3",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert [json.loads(line) for line in result.output.splitlines()] == rows
+    assert max(in_flight) > 1
+    assert first_calls[0][3]["order_by"] == [
+        {"field": "run.created_at"},
+        {"field": "id", "descending": False},
+    ]
+    assert [params["offset"] for _, _, params, _ in first_calls] == [0]
+    # pages after the short last page may have been in flight, but are not printed
+    assert sorted(params["offset"] for _, _, params, _ in calls)[:3] == [2, 4, 6]
+
+
+@pytest.mark.parametrize(
+    "options",
+    [[], ["--order-by", '[{"field":"run.created_at"}]', "--prefetch", "3"]],
+)
+def test_rest_list_all_follows_a_server_page_cap(patch_request_json, options):
+    rows = [{"id": i} for i in range(1, 8)]
+
+    def handler(method, path, params, body):
+        after = body.get("filter", {}).get("id", {}).get("gt", 0)
+        matches = [row for row in rows if row["id"] > after]
+        # the server returns at most 3 rows, whatever the limit
+        return matches[params["offset"] :][: min(params["limit"], 3)]
+
+    patch_request_json("_query", handler)
+    patch_request_json("_client", handler)
+
+    result = CliRunner().invoke(
+        hub,
+        ["list", "core", "artifact", "--all", "--page-size", "5", *options],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert [json.loads(line) for line in result.output.splitlines()] == rows
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import json
+import os
 
 from click.testing import CliRunner
 from lamin_cli.hub import hub
@@ -128,13 +129,18 @@ def test_rest_schema_json_summary_includes_hidden(
 
 
 def test_rest_schema_uses_cache(monkeypatch, tmp_path, schema_payload):
+    from lamin_cli.hub._schema.utils import _read_cached_schema
+
     calls = []
 
-    def fake_request_json(method, path, *, params=None, body=None):
-        calls.append((method, path, params, body))
-        return schema_payload()
+    def fake_request_json_if_changed(method, path, *, etag, params=None, body=None):
+        calls.append((method, path, etag))
+        return schema_payload(), '"v1"'
 
-    monkeypatch.setattr("lamin_cli.hub._schema.utils.request_json", fake_request_json)
+    monkeypatch.setattr(
+        "lamin_cli.hub._schema.utils.request_json_if_changed",
+        fake_request_json_if_changed,
+    )
     monkeypatch.setattr(
         "lamin_cli.hub._schema.utils._current_instance", lambda: ("inst/1", "")
     )
@@ -149,20 +155,28 @@ def test_rest_schema_uses_cache(monkeypatch, tmp_path, schema_payload):
 
     assert first.exit_code == 0, first.output
     assert second.exit_code == 0, second.output
-    assert calls == [("get", "schema", None, None)]
+    assert calls == [("get", "schema", None)]
     assert json.loads(first.output) == json.loads(second.output)
+    # the first revalidation can be a conditional request
+    cached = _read_cached_schema(
+        tmp_path / "hub" / "schemas" / "inst_1" / "schema_1.idx"
+    )
+    assert cached.etag == '"v1"'
 
 
 def test_rest_schema_refresh_bypasses_cache(monkeypatch, tmp_path, schema_payload):
     calls = []
 
-    def fake_request_json(method, path, *, params=None, body=None):
-        calls.append((method, path, params, body))
+    def fake_request_json_if_changed(method, path, *, etag, params=None, body=None):
+        calls.append((method, path, etag))
         schema = schema_payload()
         schema["new"] = {}
-        return schema
+        return schema, None
 
-    monkeypatch.setattr("lamin_cli.hub._schema.utils.request_json", fake_request_json)
+    monkeypatch.setattr(
+        "lamin_cli.hub._schema.utils.request_json_if_changed",
+        fake_request_json_if_changed,
+    )
     monkeypatch.setattr(
         "lamin_cli.hub._schema.utils._current_instance", lambda: ("inst/1", "")
     )
@@ -181,7 +195,84 @@ def test_rest_schema_refresh_bypasses_cache(monkeypatch, tmp_path, schema_payloa
     )
 
     assert result.exit_code == 0, result.output
-    assert calls == [("get", "schema", None, None)]
+    assert calls == [("get", "schema", None)]
     assert any(
         module["module"] == "new" for module in json.loads(result.output)["modules"]
     )
+
+
+def test_rest_schema_cache_resolves_models_from_index(tmp_path, schema_payload):
+    from lamin_cli.hub._schema.utils import (
+        IndexedSchema,
+        _read_cached_schema,
+        _write_cached_schema,
+        resolve_model_metadata,
+        scope_schema,
+    )
+
+    path = tmp_path / "schema.idx"
+    _write_cached_schema(path, schema_payload())
+    schema = _read_cached_schema(path)
+
+    assert isinstance(schema, IndexedSchema)
+    assert resolve_model_metadata(schema, "core", "ARTIFACT") == (
+        "artifact",
+        schema_payload()["core"]["artifact"],
+    )
+    # only the resolved model was parsed
+    assert list(schema["core"]._models) == ["artifact"]
+    assert scope_schema(schema, None, None) == schema_payload()
+
+
+def test_rest_schema_cache_falls_back_to_instance_key(monkeypatch, tmp_path):
+    from lamin_cli.hub._schema.utils import _current_schema_cache_path
+
+    monkeypatch.setattr(
+        "lamin_cli.hub._schema.utils._current_instance", lambda: ("inst/1", "")
+    )
+    monkeypatch.setattr(
+        "lamin_cli.hub._schema.utils._current_instance_schema_id", lambda: None
+    )
+    monkeypatch.setenv("LAMIN_REST_SCHEMA_CACHE_DIR", str(tmp_path))
+
+    assert _current_schema_cache_path() == (
+        tmp_path / "hub" / "schemas" / "inst_1" / "latest.idx"
+    )
+
+
+def test_rest_schema_stale_cache_revalidates_in_background(
+    monkeypatch, tmp_path, schema_payload
+):
+    from lamin_cli.hub._schema import utils
+
+    path = tmp_path / "latest.idx"
+    utils._write_cached_schema(path, schema_payload(), etag='"v1"')
+    os.utime(path, (0, 0))
+    monkeypatch.setattr(utils, "_current_schema_cache_path", lambda: path)
+    monkeypatch.setattr(utils, "_revalidations", {})
+    probes = []
+    new_schema = {**schema_payload(), "new": {}}
+
+    def fake_request_json_if_changed(method, path, *, etag, params=None, body=None):
+        probes.append((method, path, etag))
+        return None if len(probes) == 1 else (new_schema, '"v2"')
+
+    monkeypatch.setattr(utils, "request_json_if_changed", fake_request_json_if_changed)
+
+    stale = utils.load_schema(refresh=False)
+    assert utils._revalidations[path].daemon
+    utils._revalidations.pop(path).join()
+
+    assert "new" not in stale
+    assert path.stat().st_mtime > 0
+    assert probes == [("get", "schema", '"v1"')]
+
+    os.utime(path, (0, 0))
+    utils.load_schema(refresh=False)
+    utils._revalidations.pop(path).join()
+    revalidated = utils.load_schema(refresh=False)
+
+    assert probes[-1] == ("get", "schema", '"v1"')
+    assert "new" in revalidated
+    assert revalidated.etag == '"v2"'
+    assert utils._revalidations == {}
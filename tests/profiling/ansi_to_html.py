@@ -0,0 +1,102 @@
+"""Benchmark `_ansi_to_html` on the colored logs in `tests/agents/ansi_logs`.
+
+Times the converter against the previous implementation, which looped over every
+SGR sequence, rebuilt the CSS of each and escaped every segment separately, on
+colored tool outputs and on plain text. Both must return the same HTML.
+"""
+
+import html
+import re
+import time
+from pathlib import Path
+
+from lamin_cli.agents.claude import (
+    _ANSI_BASE_COLORS,
+    _ANSI_BRIGHT_COLORS,
+    _ansi_to_html,
+)
+
+CORPUS = Path(__file__).parents[1] / "agents" / "ansi_logs"
+# a long Bash output of a session concatenates many logs
+N_COPIES = 20
+N_REPEATS = 20
+
+_ANSI_SGR = re.compile(r"\x1b\[([0-9;]*)m")
+
+
+def loop_ansi_to_html(text: str) -> str:
+    result: list[str] = []
+    style: dict[str, str] = {}
+    span_open = False
+    cursor = 0
+
+    def css(s: dict[str, str]) -> str:
+        parts = []
+        if "fg" in s:
+            parts.append(f"color:{s['fg']}")
+        if "bg" in s:
+            parts.append(f"background:{s['bg']}")
+        if s.get("bold"):
+            parts.append("font-weight:700")
+        return ";".join(parts)
+
+    for m in _ANSI_SGR.finditer(text):
+        result.append(html.escape(text[cursor : m.start()]))
+        cursor = m.end()
+        codes = [int(c) for c in m.group(1).split(";") if c] if m.group(1) else [0]
+        for c in codes:
+            if c == 0:
+                style = {}
+            elif c == 1:
+                style["bold"] = "1"
+            elif 30 <= c <= 37:
+                style["fg"] = _ANSI_BASE_COLORS[c - 30]
+            elif 90 <= c <= 97:
+                style["fg"] = _ANSI_BRIGHT_COLORS[c - 90]
+            elif 40 <= c <= 47:
+                style["bg"] = _ANSI_BASE_COLORS[c - 40]
+            elif c == 39:
+                style.pop("fg", None)
+            elif c == 49:
+                style.pop("bg", None)
+        new_css = css(style)
+        if span_open:
+            result.append("</span>")
+            span_open = False
+        if new_css:
+            result.append(f'<span style="{new_css}">')
+            span_open = True
+
+    result.append(html.escape(text[cursor:]))
+    if span_open:
+        result.append("</span>")
+    return "".join(result)
+
+
+def run(convert, texts: list[str]) -> float:
+    start = time.perf_counter()
+    for _ in range(N_REPEATS):
+        for text in texts:
+            convert(text)
+    return (time.perf_counter() - start) / N_REPEATS
+
+
+def main():
+    logs = {path.stem: path.read_text() for path in sorted(CORPUS.glob("*.log"))}
+    colored = [text * N_COPIES for text in logs.values()]
+    plain = [_ANSI_SGR.sub("", text) for text in colored]
+    for text in colored + plain:
+        assert _ansi_to_html(text) == loop_ansi_to_html(text)
+
+    size_mb = sum(len(text) for text in colored) / 1e6
+    print(f"{len(logs)} logs ({', '.join(logs)}), {size_mb:.1f} MB")
+    for label, texts in [("colored", colored), ("plain", plain)]:
+        loop = run(loop_ansi_to_html, texts)
+        table = run(_ansi_to_html, texts)
+        print(f"{label}, loop: {loop * 1000:.1f}ms")
+        print(f"{label}, table-driven: {table * 1000:.1f}ms")
+        print(f"{label}, speedup: {loop / table:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark the pooled hub client against a connection per request.
+
+Serves a stub of the list endpoint on localhost and sends the same requests
+through `lamindb_setup`'s `request_with_auth`, which opens a client per request,
+and through one `HubClient`. Latency over TLS and real networks only widens the gap.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+N_REQUESTS = 50
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        payload = json.dumps([{"uid": "abc123", "key": "sample.parquet"}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_per_request(api_url: str) -> float:
+    from lamindb_setup.core._hub_client import request_with_auth
+
+    url = f"{api_url}/instances/stub/modules/core/artifact"
+    start = time.perf_counter()
+    for _ in range(N_REQUESTS):
+        request_with_auth(url, "post", "token", False, json={"select": ["uid"]})
+    return time.perf_counter() - start
+
+
+def run_pooled(api_url: str) -> float:
+    from lamin_cli.hub._client import HubClient
+
+    client = HubClient(instance_id="stub", api_url=api_url, access_token="token")
+    start = time.perf_counter()
+    for _ in range(N_REQUESTS):
+        client.request_json("post", "modules/core/artifact", body={"select": ["uid"]})
+    elapsed = time.perf_counter() - start
+    client.close()
+    return elapsed
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        per_request = run_per_request(api_url)
+        pooled = run_pooled(api_url)
+    finally:
+        server.shutdown()
+        server.server_close()
+    print(f"{N_REQUESTS} requests, connection per request: {per_request:.3f}s")
+    print(f"{N_REQUESTS} requests, pooled HubClient: {pooled:.3f}s")
+    print(f"speedup: {per_request / pooled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
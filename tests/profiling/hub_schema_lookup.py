@@ -0,0 +1,88 @@
+"""Benchmark `lamin hub schema core artifact` on a cached multi-MB schema.
+
+Generates a synthetic schema with many modules, caches it as plain JSON and as the
+indexed cache of `lamin_cli.hub._schema.utils`, and times the command against
+both: parsing the whole JSON and scanning for the model, versus reading the
+index header and parsing one model.
+"""
+
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from click.testing import CliRunner
+
+N_MODULES = 30
+N_MODELS = 80
+N_FIELDS = 40
+N_REPEATS = 20
+
+
+def make_schema() -> dict:
+    def fields(n: int) -> dict:
+        return {
+            f"field_{i}": {
+                "type": "string",
+                "column_name": f"field_{i}",
+                "is_primary_key": False,
+                "is_editable": True,
+            }
+            for i in range(n)
+        }
+
+    schema = {
+        f"module_{m}": {
+            f"model_{i}": {
+                "class_name": f"Model{i}",
+                "table_name": f"module_{m}_model_{i}",
+                "fields": fields(N_FIELDS),
+            }
+            for i in range(N_MODELS)
+        }
+        for m in range(N_MODULES)
+    }
+    schema["core"] = {
+        "artifact": {"class_name": "Artifact", "fields": fields(N_FIELDS)},
+        **{f"model_{i}": {"class_name": f"Model{i}"} for i in range(N_MODELS)},
+    }
+    return schema
+
+
+def run(load_schema) -> float:
+    import lamin_cli.hub._schema as schema_command
+    from lamin_cli.hub import hub
+
+    original_load_schema = schema_command.load_schema
+    schema_command.load_schema = load_schema
+    try:
+        start = time.perf_counter()
+        for _ in range(N_REPEATS):
+            result = CliRunner().invoke(hub, ["schema", "core", "Artifact"])
+            assert result.exit_code == 0, result.output
+        return (time.perf_counter() - start) / N_REPEATS
+    finally:
+        schema_command.load_schema = original_load_schema
+
+
+def main():
+    from lamin_cli.hub._schema.utils import _read_cached_schema, _write_cached_schema
+
+    schema = make_schema()
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = Path(tmp) / "schema.json"
+        json_path.write_text(json.dumps(schema))
+        index_path = Path(tmp) / "schema.idx"
+        _write_cached_schema(index_path, schema)
+
+        plain = run(lambda refresh: json.loads(json_path.read_text()))
+        indexed = run(lambda refresh: _read_cached_schema(index_path))
+        size_mb = json_path.stat().st_size / 1e6
+    print(f"schema of {size_mb:.1f} MB")
+    print(f"lamin hub schema core Artifact, JSON cache: {plain * 1000:.1f}ms")
+    print(f"lamin hub schema core Artifact, indexed cache: {indexed * 1000:.1f}ms")
+    print(f"speedup: {plain / indexed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,63 @@
+"""Startup benchmark for `lamin_cli`.
+
+`laminprofiler check` profiles the package import below. Running this file with
+`--startup` times CLI invocations in fresh interpreters and fails if one exceeds
+its wall-time or import-count budget or imports `lamindb_setup`.
+"""
+
+import subprocess
+import sys
+import time
+
 import lamin_cli
+
+# command -> (wall time budget in seconds, budget for len(sys.modules))
+STARTUP_BUDGETS = {
+    "--version": (0.5, 300),
+    "--help": (0.6, 350),
+    "hub list --help": (0.6, 350),
+}
+N_REPEATS = 5
+
+_CHILD = """\
+import atexit, sys
+atexit.register(
+    lambda: print(len(sys.modules), "lamindb_setup" in sys.modules, file=sys.stderr)
+)
+from lamin_cli.__main__ import main
+main(prog_name="lamin")
+"""
+
+
+def run_command(command: str) -> tuple[float, int, bool]:
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD, *command.split()],
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    n_modules, imports_setup = result.stderr.strip().splitlines()[-1].split()
+    return elapsed, int(n_modules), imports_setup == "True"
+
+
+def benchmark_startup() -> list[str]:
+    failures = []
+    for command, (time_budget, modules_budget) in STARTUP_BUDGETS.items():
+        runs = [run_command(command) for _ in range(N_REPEATS)]
+        elapsed = min(run[0] for run in runs)
+        _, n_modules, imports_setup = runs[-1]
+        print(f"lamin {command}: {elapsed:.3f}s, {n_modules} modules")
+        if elapsed > time_budget:
+            failures.append(f"lamin {command}: {elapsed:.3f}s > {time_budget}s")
+        if n_modules > modules_budget:
+            failures.append(f"lamin {command}: {n_modules} > {modules_budget} modules")
+        if imports_setup:
+            failures.append(f"lamin {command}: imports lamindb_setup")
+    return failures
+
+
+if __name__ == "__main__" and "--startup" in sys.argv:
+    failures = benchmark_startup()
+    if failures:
+        sys.exit("startup budget exceeded:\n" + "\n".join(failures))